@@ -0,0 +1,32 @@
+"""add image_id to deployments
+
+Revision ID: 20261019_0001
+Revises: 076ae3b5902b
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0001"
+down_revision: Union[str, None] = "076ae3b5902b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Retain the built image on each deployment so it can be rolled back to."""
+    op.add_column(
+        "deployments",
+        sa.Column("image_id", sa.String(length=128), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Remove image_id column from deployments table."""
+    op.drop_column("deployments", "image_id")
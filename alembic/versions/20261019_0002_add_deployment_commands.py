@@ -0,0 +1,60 @@
+"""add deployment commands control channel
+
+Revision ID: 20261019_0002
+Revises: 20261019_0001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0002"
+down_revision: Union[str, None] = "20261019_0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Track the owning worker and add the worker command table."""
+    op.add_column(
+        "deployments",
+        sa.Column("worker_id", sa.String(length=100), nullable=True)
+    )
+    op.create_index("ix_deployments_worker_id", "deployments", ["worker_id"], unique=False)
+
+    op.create_table(
+        "deployment_commands",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True, nullable=False),
+        sa.Column("deployment_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("worker_id", sa.String(length=100), nullable=False),
+        sa.Column("command", sa.String(length=20), nullable=False),
+        sa.Column("payload", postgresql.JSONB, nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False, server_default="pending"),
+        sa.Column("result", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_deployment_commands_deployment_id", "deployment_commands", ["deployment_id"], unique=False
+    )
+    op.create_index(
+        "ix_deployment_commands_worker_status",
+        "deployment_commands",
+        ["worker_id", "status", "created_at"],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Drop the worker command table and worker_id column."""
+    op.drop_index("ix_deployment_commands_worker_status", table_name="deployment_commands")
+    op.drop_index("ix_deployment_commands_deployment_id", table_name="deployment_commands")
+    op.drop_table("deployment_commands")
+    op.drop_index("ix_deployments_worker_id", table_name="deployments")
+    op.drop_column("deployments", "worker_id")
@@ -0,0 +1,32 @@
+"""add deployment claim lease
+
+Revision ID: 20261019_0003
+Revises: 20261019_0002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0003"
+down_revision: Union[str, None] = "20261019_0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the lease used by workers to claim a deployment exactly once."""
+    op.add_column(
+        "deployments",
+        sa.Column("lease_expires_at", sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Remove lease_expires_at column from deployments table."""
+    op.drop_column("deployments", "lease_expires_at")
@@ -0,0 +1,38 @@
+"""add worker cache registry
+
+Revision ID: 20261019_0004
+Revises: 20261019_0003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0004"
+down_revision: Union[str, None] = "20261019_0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the table workers publish their layer cache summaries to."""
+    op.create_table(
+        "worker_cache",
+        sa.Column("worker_id", sa.String(length=100), primary_key=True, nullable=False),
+        sa.Column("queue_url", sa.String(length=512), nullable=True),
+        sa.Column("bloom", sa.LargeBinary(), nullable=False),
+        sa.Column("key_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_worker_cache_updated_at", "worker_cache", ["updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the worker cache registry."""
+    op.drop_index("ix_worker_cache_updated_at", table_name="worker_cache")
+    op.drop_table("worker_cache")
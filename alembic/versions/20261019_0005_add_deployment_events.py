@@ -0,0 +1,73 @@
+"""add partitioned deployment events
+
+Revision ID: 20261019_0005
+Revises: 20261019_0004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0005"
+down_revision: Union[str, None] = "20261019_0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Monthly partitions created up front; workers keep creating them after that
+MONTHS_AHEAD = 2
+
+
+def _month_start(day: date, offset: int) -> date:
+    """First day of the month ``offset`` months after ``day``'s month."""
+    month_index = day.year * 12 + (day.month - 1) + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    """Add the append-only event log and the per-deployment sequence counter."""
+    op.add_column(
+        "deployments",
+        sa.Column("log_seq", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+
+    # Declarative partitioning isn't expressible through op.create_table
+    op.execute(
+        """
+        CREATE TABLE deployment_events (
+            deployment_id UUID NOT NULL,
+            seq BIGINT NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() at time zone 'utc'),
+            level VARCHAR(10) NOT NULL DEFAULT 'info',
+            message TEXT NOT NULL,
+            worker_id VARCHAR(100),
+            PRIMARY KEY (deployment_id, seq, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("CREATE TABLE deployment_events_default PARTITION OF deployment_events DEFAULT")
+
+    today = date.today()
+    for offset in range(MONTHS_AHEAD + 1):
+        start = _month_start(today, offset)
+        end = _month_start(today, offset + 1)
+        op.execute(
+            f"CREATE TABLE deployment_events_{start.year:04d}_{start.month:02d} "
+            f"PARTITION OF deployment_events "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+    # Retention and "recent activity" scans; keyset reads use the primary key
+    op.create_index("ix_deployment_events_created_at", "deployment_events", ["created_at"], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the event log (partitions go with the parent table)."""
+    op.drop_index("ix_deployment_events_created_at", table_name="deployment_events")
+    op.execute("DROP TABLE deployment_events CASCADE")
+    op.drop_column("deployments", "log_seq")
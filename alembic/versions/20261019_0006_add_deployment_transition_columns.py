@@ -0,0 +1,37 @@
+"""add deployment transition columns
+
+Revision ID: 20261019_0006
+Revises: 20261019_0005
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0006"
+down_revision: Union[str, None] = "20261019_0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the columns workers set on build start, go-live and failure."""
+    op.add_column("deployments", sa.Column("build_started_at", sa.DateTime(), nullable=True))
+    op.add_column("deployments", sa.Column("deployed_at", sa.DateTime(), nullable=True))
+    op.add_column("deployments", sa.Column("error", sa.Text(), nullable=True))
+
+    # Workers used to write statuses outside DeploymentStatus
+    op.execute("UPDATE deployments SET status = 'live' WHERE status = 'running'")
+    op.execute("UPDATE deployments SET status = 'error' WHERE status = 'failed'")
+
+
+def downgrade() -> None:
+    """Remove the transition columns from deployments table."""
+    op.drop_column("deployments", "error")
+    op.drop_column("deployments", "deployed_at")
+    op.drop_column("deployments", "build_started_at")
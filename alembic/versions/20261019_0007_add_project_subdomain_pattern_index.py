@@ -0,0 +1,33 @@
+"""add project subdomain pattern index
+
+Revision ID: 20261019_0007
+Revises: 20261019_0006
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0007"
+down_revision: Union[str, None] = "20261019_0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index subdomains for prefix LIKE lookups regardless of collation."""
+    op.create_index(
+        "ix_projects_subdomain_pattern",
+        "projects",
+        ["subdomain"],
+        postgresql_ops={"subdomain": "varchar_pattern_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Drop the subdomain pattern index."""
+    op.drop_index("ix_projects_subdomain_pattern", table_name="projects")
@@ -0,0 +1,30 @@
+"""add deployment run config
+
+Revision ID: 20261019_0008
+Revises: 20261019_0007
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "20261019_0008"
+down_revision: Union[str, None] = "20261019_0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add the run configuration reused when rolling back to a deployment."""
+    op.add_column("deployments", sa.Column("run_config", postgresql.JSONB(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove run_config from deployments table."""
+    op.drop_column("deployments", "run_config")
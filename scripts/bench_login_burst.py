@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: does a burst of password logins slow down unrelated endpoints?
+
+Probes a cheap endpoint (GET /health/) at a steady rate, first on its own
+and then while a burst of concurrent password logins runs, and prints
+p50/p95/p99 probe latency for both phases. With bcrypt on the event loop
+the burst phase p99 jumps to roughly (logins / API workers) x 250ms; with
+the bounded hashing pool it should stay close to the baseline.
+
+Run the API with a high login throttle so the burst isn't rejected, e.g.
+
+    LOGIN_ATTEMPTS_PER_MINUTE=100000 uvicorn core.main:app --port 8000
+
+then
+
+    python scripts/bench_login_burst.py --url http://localhost:8000 --logins 200
+"""
+
+import argparse
+import asyncio
+import secrets
+import statistics
+import time
+from collections import Counter
+from typing import List
+
+import httpx
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def report(name: str, latencies: List[float]) -> None:
+    """Print latency percentiles in milliseconds."""
+    if not latencies:
+        print(f"   {name:<10} no samples")
+        return
+    ms = [value * 1000 for value in latencies]
+    print(
+        f"   {name:<10} n={len(ms):<5} "
+        f"p50={percentile(ms, 50):7.1f}ms  p95={percentile(ms, 95):7.1f}ms  "
+        f"p99={percentile(ms, 99):7.1f}ms  max={max(ms):7.1f}ms  mean={statistics.mean(ms):7.1f}ms"
+    )
+
+
+async def probe(client: httpx.AsyncClient, path: str, interval: float, stop: asyncio.Event) -> List[float]:
+    """Request ``path`` every ``interval`` seconds until stopped."""
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get(path)
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def login_burst(client: httpx.AsyncClient, email: str, password: str, count: int, concurrency: int) -> Counter:
+    """Fire ``count`` logins, ``concurrency`` at a time; count status codes."""
+    codes: Counter = Counter()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def login() -> None:
+        async with slots:
+            response = await client.post("/auth/login", json={"email": email, "password": password})
+            codes[response.status_code] += 1
+
+    await asyncio.gather(*(login() for _ in range(count)))
+    return codes
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL")
+    parser.add_argument("--logins", type=int, default=200, help="Logins in the burst")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent logins")
+    parser.add_argument("--probe-path", default="/health/", help="Unrelated endpoint to measure")
+    parser.add_argument("--probe-interval", type=float, default=0.02, help="Seconds between probes")
+    parser.add_argument("--baseline", type=float, default=5.0, help="Seconds of baseline probing")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🔐 Login burst vs. unrelated endpoint latency")
+    print("=" * 70)
+
+    limits = httpx.Limits(max_connections=args.concurrency + 10)
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=limits) as client:
+        email = f"bench-{secrets.token_hex(4)}@example.com"
+        password = "Bench" + secrets.token_hex(8)
+        response = await client.post("/auth/register", json={"email": email, "password": password})
+        if response.status_code != 201:
+            print(f"❌ Could not register benchmark user: {response.status_code} {response.text}")
+            return
+        print(f"✅ Registered {email}")
+
+        print(f"\n📏 Baseline: probing {args.probe_path} for {args.baseline:.0f}s...")
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, args.probe_path, args.probe_interval, stop))
+        await asyncio.sleep(args.baseline)
+        stop.set()
+        baseline = await probe_task
+
+        print(f"💥 Burst: {args.logins} logins ({args.concurrency} concurrent) while probing...")
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, args.probe_path, args.probe_interval, stop))
+        started = time.perf_counter()
+        codes = await login_burst(client, email, password, args.logins, args.concurrency)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        burst = await probe_task
+
+    print(f"\n📊 {args.probe_path} latency")
+    report("baseline", baseline)
+    report("burst", burst)
+    print(f"\n🔑 Logins: {dict(codes)} in {elapsed:.1f}s ({args.logins / elapsed:.1f}/s)")
+    if codes.get(429):
+        print("   ⚠️  429s: raise LOGIN_ATTEMPTS_PER_MINUTE for the benchmark")
+    if codes.get(503):
+        print("   ℹ️  503s: hashing queue full (PASSWORD_HASH_QUEUE), load was shed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
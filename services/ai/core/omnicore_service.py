@@ -201,7 +201,7 @@ class DprodOmniAgentService:
         @registry.register_tool("analyze_resource_usage")
         def analyze_resource_usage(deployment_id: str) -> str:
             """
-            Analyze resource usage for a deployment using Docker stats.
+            Analyze resource usage for a deployment using sampled Docker stats.
             
             Args:
                 deployment_id: UUID of the deployment
@@ -255,33 +255,48 @@ class DprodOmniAgentService:
                 # Use the first matching container (should only be one per project)
                 container = containers[0]
                 
-                # Get container stats (stream=False for single snapshot)
-                stats = container.stats(stream=False)
+                # Read from the background sampler; fall back to a one-off
+                # snapshot only if the container has not been sampled yet
+                from services.orchestrator.core.stats_sampler import get_stats_sampler, parse_stats
                 
-                # Calculate CPU percentage
-                cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - \
-                           stats['precpu_stats']['cpu_usage']['total_usage']
-                system_delta = stats['cpu_stats']['system_cpu_usage'] - \
-                              stats['precpu_stats']['system_cpu_usage']
-                cpu_count = stats['cpu_stats']['online_cpus']
-                cpu_percent = (cpu_delta / system_delta) * cpu_count * 100.0 if system_delta > 0 else 0.0
+                sampler = get_stats_sampler(client)
+                usage = sampler.summary(container.id)
+                sampler.track(container.id)
+                
+                if usage:
+                    cpu_percent = usage['cpu_percent']['avg']
+                    cpu_p95 = usage['cpu_percent']['p95']
+                    cpu_count = usage['cpu_count']
+                    memory_usage = usage['memory_bytes']['latest']
+                    memory_limit = usage['memory_limit_bytes']
+                    memory_percent = usage['memory_percent']['avg']
+                    memory_p95 = usage['memory_percent']['p95']
+                    sample = {
+                        key: usage[key] for key in (
+                            'network_rx_bytes', 'network_tx_bytes',
+                            'block_read_bytes', 'block_write_bytes'
+                        )
+                    }
+                    sample_window = usage['window_seconds']
+                else:
+                    sample = parse_stats(container.stats(stream=False))
+                    cpu_percent = cpu_p95 = sample['cpu_percent']
+                    cpu_count = sample['cpu_count']
+                    memory_usage = sample['memory_bytes']
+                    memory_limit = sample['memory_limit_bytes']
+                    memory_percent = memory_p95 = sample['memory_percent']
+                    sample_window = 0
                 
-                # Calculate Memory usage
-                memory_usage = stats['memory_stats']['usage']
-                memory_limit = stats['memory_stats']['limit']
-                memory_percent = (memory_usage / memory_limit) * 100.0 if memory_limit > 0 else 0.0
                 memory_usage_mb = memory_usage / (1024 * 1024)
                 memory_limit_mb = memory_limit / (1024 * 1024)
                 
                 # Network I/O
-                network_stats = stats.get('networks', {})
-                network_rx_mb = sum(net['rx_bytes'] for net in network_stats.values()) / (1024 * 1024)
-                network_tx_mb = sum(net['tx_bytes'] for net in network_stats.values()) / (1024 * 1024)
+                network_rx_mb = sample['network_rx_bytes'] / (1024 * 1024)
+                network_tx_mb = sample['network_tx_bytes'] / (1024 * 1024)
                 
                 # Block I/O
-                block_stats = stats.get('blkio_stats', {}).get('io_service_bytes_recursive', [])
-                block_read_mb = sum(item['value'] for item in block_stats if item['op'] == 'Read') / (1024 * 1024) if block_stats else 0
-                block_write_mb = sum(item['value'] for item in block_stats if item['op'] == 'Write') / (1024 * 1024) if block_stats else 0
+                block_read_mb = sample['block_read_bytes'] / (1024 * 1024)
+                block_write_mb = sample['block_write_bytes'] / (1024 * 1024)
                 
                 # Generate AI-powered suggestions
                 suggestions = []
@@ -310,8 +325,10 @@ class DprodOmniAgentService:
                     "deployment_id": deployment_id,
                     "container_name": container.name,
                     "status": container.status,
+                    "sample_window_seconds": sample_window,
                     "cpu": {
                         "usage_percent": round(cpu_percent, 2),
+                        "p95_percent": round(cpu_p95, 2),
                         "cpu_count": cpu_count,
                         "status": "high" if cpu_percent > 80 else "low" if cpu_percent < 10 else "optimal"
                     },
@@ -319,6 +336,7 @@ class DprodOmniAgentService:
                         "usage_mb": round(memory_usage_mb, 2),
                         "limit_mb": round(memory_limit_mb, 2),
                         "usage_percent": round(memory_percent, 2),
+                        "p95_percent": round(memory_p95, 2),
                         "status": "high" if memory_percent > 85 else "low" if memory_percent < 30 else "optimal"
                     },
                     "network": {
@@ -1,14 +1,18 @@
 """Main FastAPI application for Dprod API."""
 
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 
 from .utils.config import settings
+from .utils.docker_pool import DockerPool
+from .v1.auth.password_handler import PasswordHasherBusy, shutdown_password_hasher
 from .v1 import api_router
 
 
@@ -18,12 +22,72 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # Startup
     print("🚀 Starting Dprod API Server...")
     
+    # Local Docker mode: one client for every request, the stats sampler,
+    # the log multiplexer and image GC
+    gc_task = None
+    app.state.docker_pool = None
+    if not os.getenv("SQS_QUEUE_URL"):
+        docker_pool = None
+        try:
+            docker_pool = DockerPool(settings.docker_socket_path, settings.docker_pool_size)
+            # The client connects lazily; without a daemon, Docker routes answer 503
+            await docker_pool.run(docker_pool.client.ping)
+            app.state.docker_pool = docker_pool
+        except Exception as e:
+            print(f"⚠️  Docker unavailable, container stats sampler and image GC disabled: {e}")
+            if docker_pool is not None:
+                docker_pool.close()
+        
+        if app.state.docker_pool is not None:
+            from services.orchestrator.core.stats_sampler import get_stats_sampler
+            from services.orchestrator.core.log_multiplexer import get_log_multiplexer
+            from services.shared.core.docker_gc import DockerGarbageCollector
+            get_stats_sampler(docker_pool.client)
+            get_log_multiplexer(docker_pool.client)
+            try:
+                gc_task = asyncio.create_task(DockerGarbageCollector(docker_pool.client).run_forever())
+            except ValueError as e:
+                print(f"⚠️  Image GC disabled: {e}")
+    
+    # Shared deployment registry: subscribe to cross-process cache invalidations
+    from .v1.services.deployment_service import get_deployment_registry
+    await get_deployment_registry().start()
+    
+    # Authenticated principals: memory lookups, optionally shared through Redis
+    from .v1.auth.principal_cache import get_principal_cache
+    await get_principal_cache().start()
+    
+    # Push deployment status changes to streaming clients over one LISTEN connection
+    from .v1.services.status_broker import get_status_broker
+    await get_status_broker().start()
+    
     print(f"🌐 API Server running on http://localhost:{settings.port}")
     
     yield
     
     # Shutdown
     print("🛑 Shutting down Dprod API Server...")
+    
+    if gc_task:
+        gc_task.cancel()
+    
+    await get_deployment_registry().stop()
+    await get_status_broker().stop()
+    await get_principal_cache().stop()
+    shutdown_password_hasher()
+    
+    # Let in-flight local deployments finish
+    from .v1.services.job_executor import get_deploy_executor
+    await get_deploy_executor().shutdown()
+    
+    from services.orchestrator.core.stats_sampler import stop_stats_sampler
+    stop_stats_sampler()
+    
+    from services.orchestrator.core.log_multiplexer import stop_log_multiplexer
+    stop_log_multiplexer()
+    
+    if app.state.docker_pool:
+        app.state.docker_pool.close()
 
 
 # Create FastAPI app
@@ -56,6 +120,16 @@ if os.getenv("ALLOW_ALL_HOSTS", "false").lower() != "true":
 app.include_router(api_router.router)
 
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy) -> JSONResponse:
+    """Shed password work instead of queueing it without bound."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Authentication is busy, retry shortly"},
+        headers={"Retry-After": "1"}
+    )
+
+
 def main() -> None:
     """Main entry point for the API server."""
     import uvicorn
@@ -23,12 +23,33 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     
+    # Password hashing runs on a bounded pool; logins are throttled per client IP
+    password_hash_workers: int = 2
+    password_hash_queue: int = 32
+    login_attempts_per_minute: int = 10
+    trust_forwarded_for: bool = False  # behind a load balancer that sets X-Forwarded-For
+    forwarded_for_hops: int = 1  # trusted proxies appending to X-Forwarded-For
+    
+    # Authenticated-principal cache
+    auth_cache_ttl: int = 60  # seconds
+    auth_cache_size: int = 10000
+    auth_cache_redis: bool = False  # share entries across replicas via redis_url
+    
     # CORS
     allowed_origins: List[str] = ["http://localhost:3000", "http://localhost:8080"]
     allowed_hosts: List[str] = ["localhost", "127.0.0.1"]
     
     # Docker Configuration
     docker_socket_path: str = "/var/run/docker.sock"
+    docker_pool_size: int = 10
+    
+    # Local-mode deployments run in a bounded background executor
+    deploy_concurrency: int = 2
+    deploy_max_pending: int = 20
+    
+    # Status streaming (GET /deployments/{id}/status/stream)
+    status_stream_queue_size: int = 16
+    status_stream_heartbeat: int = 15  # seconds
     
     # File Upload
     max_file_size: int = 100 * 1024 * 1024  # 100MB
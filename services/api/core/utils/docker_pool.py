@@ -0,0 +1,58 @@
+"""App-scoped Docker client shared by every request."""
+
+import asyncio
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, Request, status
+
+
+class DockerPool:
+    """One Docker client with a bounded HTTP connection pool.
+
+    Creating ``docker.from_env()`` per request opens a new socket and
+    negotiates the API version every time. This client is created once in
+    the lifespan. Its blocking calls are offloaded to threads through
+    run(), capped at the connection pool size so a burst of requests
+    queues here instead of stalling the event loop.
+    """
+
+    def __init__(self, socket_path: str, max_pool_size: int = 10):
+        """
+        Initialize Docker pool.
+
+        Args:
+            socket_path: Docker daemon socket
+            max_pool_size: Connections kept to the daemon (and concurrent calls)
+        """
+        import docker
+
+        self.client = docker.DockerClient(
+            base_url=f"unix://{socket_path}",
+            max_pool_size=max_pool_size
+        )
+        self._slots = asyncio.Semaphore(max_pool_size)
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call a blocking Docker SDK function in a worker thread."""
+        async with self._slots:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    def close(self) -> None:
+        """Close the client's connections."""
+        self.client.close()
+
+
+def get_docker_pool(request: Request) -> Optional[DockerPool]:
+    """Dependency: the app's Docker pool, or None when Docker is unavailable."""
+    return getattr(request.app.state, "docker_pool", None)
+
+
+def require_docker_pool(request: Request) -> DockerPool:
+    """Dependency: the app's Docker pool; 503 when Docker is unavailable."""
+    pool = get_docker_pool(request)
+    if pool is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Docker unavailable"
+        )
+    return pool
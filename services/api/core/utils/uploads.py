@@ -0,0 +1,198 @@
+"""Streaming handling of uploaded source archives."""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+
+from fastapi import HTTPException, Request, status
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from .config import settings
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+# Boundaries, part headers and small form fields around the archive
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Documents the multipart body for routes that parse it with spool_upload
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
+
+@dataclass
+class SpooledUpload:
+    """An upload written to local disk."""
+    path: Path
+    sha256: str
+    size: int
+    detached: bool = False
+
+    def detach(self) -> Path:
+        """Take ownership of the file; it is no longer deleted on exit."""
+        self.detached = True
+        return self.path
+
+
+def _too_large(max_size: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Upload exceeds the {max_size // (1024 * 1024)}MB limit"
+    )
+
+
+def _bad_upload(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail)
+
+
+class _FilePartParser:
+    """Feeds a multipart body through python-multipart, keeping one file field.
+
+    Data of the wanted field is collected per fed chunk so the caller can
+    write it off the event loop; every other part is discarded.
+    """
+
+    def __init__(self, boundary: bytes, field: str):
+        self.field = field
+        self.found = False
+        self.data: List[bytes] = []
+        self._in_field = False
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        """Parse a chunk and return the wanted field's data found in it."""
+        self._parser.write(chunk)
+        data, self.data = self.data, []
+        return data
+
+    def finalize(self) -> None:
+        self._parser.finalize()
+
+    def _on_part_begin(self) -> None:
+        self._in_field = False
+        self._disposition = b""
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_field:
+            self.data.append(data[start:end])
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("latin-1")
+        if name == self.field and b"filename" in options:
+            if self.found:
+                raise _bad_upload(f"Only one '{self.field}' file is accepted")
+            self.found = True
+            self._in_field = True
+
+
+@asynccontextmanager
+async def spool_upload(
+    request: Request,
+    field: str = "file",
+    max_size: Optional[int] = None,
+    directory: Optional[str] = None
+) -> AsyncIterator[SpooledUpload]:
+    """Stream a multipart file field from the request body to disk, hashing as it goes.
+
+    The body is read straight from ``request.stream()`` instead of letting
+    Starlette parse the form first, so the size limit caps the bytes
+    received and written: a ``Content-Length`` over the limit is rejected
+    before anything is read, and a body that crosses it is cut off with 413
+    and the partial file removed. The file field is written once, to the
+    file this yields; it is deleted when the context exits unless detached.
+
+    Args:
+        request: Request with a ``multipart/form-data`` body
+        field: Name of the file field
+        max_size: Size limit in bytes (defaults to settings.max_file_size)
+        directory: Where to spool (defaults to settings.upload_path)
+
+    Yields:
+        The spooled upload
+    """
+    max_size = max_size or settings.max_file_size
+    max_body = max_size + MULTIPART_OVERHEAD
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise _bad_upload("Expected a multipart/form-data upload")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_body:
+        raise _too_large(max_size)
+
+    directory = directory or settings.upload_path
+    os.makedirs(directory, exist_ok=True)
+    fd, name = tempfile.mkstemp(suffix=".tar.gz", dir=directory)
+    path = Path(name)
+    upload = None
+
+    try:
+        parser = _FilePartParser(options[b"boundary"], field)
+        digest = hashlib.sha256()
+        received = 0
+        size = 0
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > max_body:
+                    raise _too_large(max_size)
+                data = b"".join(parser.feed(chunk))
+                if data:
+                    size += len(data)
+                    if size > max_size:
+                        raise _too_large(max_size)
+                    digest.update(data)
+                    await asyncio.to_thread(out.write, data)
+            parser.finalize()
+
+        if not parser.found:
+            raise _bad_upload(f"Missing '{field}' file in upload")
+
+        upload = SpooledUpload(path=path, sha256=digest.hexdigest(), size=size)
+        yield upload
+    finally:
+        if upload is None or not upload.detached:
+            path.unlink(missing_ok=True)
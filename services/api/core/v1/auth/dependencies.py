@@ -4,12 +4,12 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status, Header
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from jose import JWTError, jwt
 
 from ...db.database import get_db
 from services.shared.core.models import User
 from ...utils.config import settings
+from .principal_cache import user_for_api_key, user_for_token
 
 security = HTTPBearer(auto_error=False)
 
@@ -19,14 +19,15 @@ async def get_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     x_api_key: Optional[str] = Header(None)
 ) -> User:
-    """Get current authenticated user from JWT token or API key."""
+    """Get current authenticated user from JWT token or API key.
+    
+    Principals are cached (see principal_cache), so repeated calls with
+    the same credential don't touch the database.
+    """
     
     # Try API key header first
     if x_api_key:
-        result = await db.execute(
-            select(User).where(User.api_key == x_api_key)
-        )
-        user = result.scalar_one_or_none()
+        user = await user_for_api_key(x_api_key, db)
         if user:
             return user
     
@@ -42,10 +43,7 @@ async def get_current_user(
                     detail="Invalid token"
                 )
             
-            result = await db.execute(
-                select(User).where(User.email == email)
-            )
-            user = result.scalar_one_or_none()
+            user = await user_for_token(email, payload.get("exp"), db)
             if user:
                 return user
         except (JWTError, Exception):
@@ -0,0 +1,99 @@
+"""Per-client-IP throttling of password logins."""
+
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from fastapi import HTTPException, Request, status
+
+from ...utils.config import settings
+
+
+class LoginThrottle:
+    """Sliding-window limit on password attempts per client IP.
+
+    Every attempt is counted, successful or not, because each one costs a
+    bcrypt verification. Checked before any password work is done.
+    """
+
+    def __init__(self, max_attempts: int = 10, window: int = 60, max_clients: int = 10000):
+        """
+        Initialize login throttle.
+
+        Args:
+            max_attempts: Attempts allowed per IP within ``window``
+            window: Window length in seconds
+            max_clients: IPs tracked before the idle ones are pruned
+        """
+        self.max_attempts = max_attempts
+        self.window = window
+        self.max_clients = max_clients
+        self._attempts: Dict[str, Deque[float]] = {}
+
+    def hit(self, client_ip: str) -> Optional[int]:
+        """Record an attempt.
+
+        Returns:
+            None if allowed, otherwise seconds until the next attempt is allowed
+        """
+        now = time.monotonic()
+        attempts = self._attempts.setdefault(client_ip, deque())
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+
+        if len(attempts) >= self.max_attempts:
+            return max(1, int(attempts[0] + self.window - now) + 1)
+
+        attempts.append(now)
+        if len(self._attempts) > self.max_clients:
+            self._prune(now)
+        return None
+
+    def _prune(self, now: float) -> None:
+        """Forget clients without attempts in the current window."""
+        for client_ip in list(self._attempts):
+            attempts = self._attempts[client_ip]
+            if not attempts or attempts[-1] <= now - self.window:
+                del self._attempts[client_ip]
+
+
+def client_ip(request: Request) -> str:
+    """Client address, taken from X-Forwarded-For only behind a trusted proxy.
+
+    Each proxy appends the address it saw, so entries left of those the
+    ``forwarded_for_hops`` trusted proxies added are client-supplied and
+    could be rotated to dodge the throttle; the entry the outermost trusted
+    proxy appended is used instead of the leftmost.
+    """
+    if settings.trust_forwarded_for:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            entries = [entry.strip() for entry in forwarded.split(",") if entry.strip()]
+            if entries:
+                return entries[max(len(entries) - max(settings.forwarded_for_hops, 1), 0)]
+    return request.client.host if request.client else "unknown"
+
+
+_login_throttle: Optional[LoginThrottle] = None
+
+
+def get_login_throttle() -> LoginThrottle:
+    """Get the process-wide login throttle."""
+    global _login_throttle
+    if _login_throttle is None:
+        _login_throttle = LoginThrottle(
+            max_attempts=settings.login_attempts_per_minute,
+            window=60
+        )
+    return _login_throttle
+
+
+async def throttle_login(request: Request) -> None:
+    """Dependency: 429 once a client exceeds its password attempts."""
+    retry_after = get_login_throttle().hit(client_ip(request))
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
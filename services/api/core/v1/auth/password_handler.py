@@ -1,7 +1,13 @@
 """Password handling utilities."""
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 import bcrypt
 
+from ...utils.config import settings
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
@@ -23,3 +29,80 @@ def get_password_hash(password: str) -> str:
 def hash_password(password: str) -> str:
     """Hash a password (alias for get_password_hash)."""
     return get_password_hash(password)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash operations are already waiting."""
+    pass
+
+
+class PasswordHasher:
+    """Run bcrypt on a dedicated, bounded thread pool.
+
+    A bcrypt round costs ~250ms of CPU; run inline it stalls every other
+    request on the event loop. Here at most ``workers`` hashes run at once
+    and at most ``max_queue`` more wait, beyond which callers are refused
+    instead of piling up. bcrypt releases the GIL, so the threads run in
+    parallel with the event loop.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 32):
+        """
+        Initialize password hasher.
+
+        Args:
+            workers: Threads hashing concurrently
+            max_queue: Operations allowed to wait for a thread
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dprod-bcrypt")
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Operations running or waiting."""
+        return self._pending
+
+    async def _run(self, func, *args):
+        if self._pending >= self.workers + self.max_queue:
+            raise PasswordHasherBusy(f"{self._pending} password operations pending")
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash off the event loop."""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        """Hash a password off the event loop."""
+        return await self._run(get_password_hash, password)
+
+    def shutdown(self) -> None:
+        """Stop the pool once queued operations finish."""
+        self._executor.shutdown(wait=False)
+
+
+_password_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get the process-wide password hasher."""
+    global _password_hasher
+    if _password_hasher is None:
+        _password_hasher = PasswordHasher(
+            workers=settings.password_hash_workers,
+            max_queue=settings.password_hash_queue
+        )
+    return _password_hasher
+
+
+def shutdown_password_hasher() -> None:
+    """Stop the password hasher; the next get_password_hasher() starts a new pool."""
+    global _password_hasher
+    if _password_hasher is not None:
+        _password_hasher.shutdown()
+        _password_hasher = None
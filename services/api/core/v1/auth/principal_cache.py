@@ -0,0 +1,259 @@
+"""Cache of authenticated principals so auth is a memory lookup."""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.shared.core.models import User
+from ...utils.config import settings
+
+# Credentials never leave the database: cached principals carry no password hash or API key
+CACHED_FIELDS = ("id", "email", "status", "created_at", "updated_at")
+
+
+def _snapshot(user: User) -> Dict[str, Any]:
+    return {name: getattr(user, name) for name in CACHED_FIELDS}
+
+
+def _encode(values: Dict[str, Any]) -> str:
+    return json.dumps({
+        name: value.isoformat() if isinstance(value, datetime) else str(value) if isinstance(value, UUID) else value
+        for name, value in values.items()
+    })
+
+
+def _decode(raw: str) -> Dict[str, Any]:
+    values = json.loads(raw)
+    values["id"] = UUID(values["id"])
+    for name in ("created_at", "updated_at"):
+        if values.get(name):
+            values[name] = datetime.fromisoformat(values[name])
+    return values
+
+
+class PrincipalCache:
+    """TTL + LRU cache from credential to user.
+
+    Keys are ``key:<sha256 of the API key>`` or ``jwt:<sub>:<exp>``, so
+    raw credentials are never stored. Each hit returns a fresh, detached
+    ``User`` built from the cached columns. Entries are dropped when they
+    expire (JWT entries never outlive the token), and invalidate_user()
+    drops them on API key regeneration, password changes and status
+    changes.
+
+    With ``redis_url`` set, entries are also shared with other API
+    replicas, and invalidations are broadcast to them over pub/sub.
+    """
+
+    PREFIX = "dprod:principal:"
+    USER_PREFIX = "dprod:principal-keys:"
+    CHANNEL = "dprod:principals:invalidate"
+
+    def __init__(
+        self,
+        ttl: int = 60,
+        max_entries: int = 10000,
+        redis_url: Optional[str] = None
+    ):
+        """
+        Initialize principal cache.
+
+        Args:
+            ttl: Seconds a principal is trusted without re-reading the user
+            max_entries: Entries kept in memory (least recently used evicted)
+            redis_url: Redis URL for the shared tier (memory only if omitted)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.redis_url = redis_url
+        # key -> (expires_at, cached column values)
+        self._entries: OrderedDict = OrderedDict()
+        self._by_user: Dict[str, Set[str]] = {}
+        self._redis = None
+        self._listener_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def api_key_key(api_key: str) -> str:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()
+
+    @staticmethod
+    def token_key(subject: str, expires: Any) -> str:
+        return f"jwt:{subject}:{expires}"
+
+    async def start(self) -> None:
+        """Connect the shared tier and subscribe to invalidations."""
+        if not self.redis_url or self._listener_task:
+            return
+        try:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+            pubsub = self._redis.pubsub()
+            await pubsub.subscribe(self.CHANNEL)
+            self._listener_task = asyncio.create_task(self._listen(pubsub))
+            print("🔑 Principal cache sharing entries through Redis")
+        except Exception as e:
+            self._redis = None
+            print(f"⚠️  Principal cache Redis tier disabled (memory only): {e}")
+
+    async def stop(self) -> None:
+        """Stop listening and close the Redis connection."""
+        if self._listener_task:
+            self._listener_task.cancel()
+            self._listener_task = None
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+    async def get(self, key: str) -> Optional[User]:
+        """Cached principal for a credential key, or None."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, values = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                return User(**values)
+            self._drop(key)
+
+        if self._redis:
+            try:
+                raw = await self._redis.get(self.PREFIX + key)
+                if raw:
+                    ttl = await self._redis.ttl(self.PREFIX + key)
+                    values = _decode(raw)
+                    self._store(key, values, ttl if ttl and ttl > 0 else self.ttl)
+                    return User(**values)
+            except Exception as e:
+                print(f"⚠️  Principal cache Redis read failed: {e}")
+        return None
+
+    async def put(self, key: str, user: User, ttl: Optional[float] = None) -> None:
+        """Cache a principal for at most ``ttl`` seconds (default: the cache TTL)."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        values = _snapshot(user)
+        self._store(key, values, ttl)
+
+        if self._redis:
+            try:
+                user_keys = self.USER_PREFIX + str(user.id)
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    pipe.set(self.PREFIX + key, _encode(values), ex=max(1, int(ttl)))
+                    pipe.sadd(user_keys, key)
+                    pipe.expire(user_keys, self.ttl)
+                    await pipe.execute()
+            except Exception as e:
+                print(f"⚠️  Principal cache Redis write failed: {e}")
+
+    async def invalidate_user(self, user_id: Any) -> None:
+        """Forget every cached principal of a user, here and on other replicas."""
+        user_id = str(user_id)
+        self._drop_user(user_id)
+
+        if self._redis:
+            try:
+                user_keys = self.USER_PREFIX + user_id
+                keys = await self._redis.smembers(user_keys)
+                if keys:
+                    await self._redis.delete(*(self.PREFIX + key for key in keys))
+                await self._redis.delete(user_keys)
+                await self._redis.publish(self.CHANNEL, user_id)
+            except Exception as e:
+                print(f"⚠️  Failed to publish principal invalidation: {e}")
+
+    def clear(self) -> None:
+        """Drop everything held in memory."""
+        self._entries.clear()
+        self._by_user.clear()
+
+    def _store(self, key: str, values: Dict[str, Any], ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, values)
+        self._entries.move_to_end(key)
+        self._by_user.setdefault(str(values["id"]), set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            user_id = str(entry[1]["id"])
+            keys = self._by_user.get(user_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    self._by_user.pop(user_id, None)
+
+    def _drop_user(self, user_id: str) -> None:
+        for key in self._by_user.pop(user_id, set()):
+            self._entries.pop(key, None)
+
+    async def _listen(self, pubsub) -> None:
+        """Apply invalidations published by other replicas."""
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    self._drop_user(message["data"])
+        except asyncio.CancelledError:
+            await pubsub.unsubscribe(self.CHANNEL)
+            raise
+        except Exception as e:
+            # Without invalidations, entries can't be trusted beyond this replica
+            print(f"⚠️  Principal cache listener stopped: {e}")
+            self.clear()
+
+
+_principal_cache: Optional[PrincipalCache] = None
+
+
+def get_principal_cache() -> PrincipalCache:
+    """Get the process-wide principal cache."""
+    global _principal_cache
+    if _principal_cache is None:
+        _principal_cache = PrincipalCache(
+            ttl=settings.auth_cache_ttl,
+            max_entries=settings.auth_cache_size,
+            redis_url=settings.redis_url if settings.auth_cache_redis else None
+        )
+    return _principal_cache
+
+
+async def user_for_api_key(api_key: str, db: AsyncSession) -> Optional[User]:
+    """Resolve an API key through the cache."""
+    cache = get_principal_cache()
+    key = cache.api_key_key(api_key)
+    user = await cache.get(key)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(User).where(User.api_key == api_key))
+    user = result.scalar_one_or_none()
+    if user is not None:
+        await cache.put(key, user)
+    return user
+
+
+async def user_for_token(email: str, expires: Optional[int], db: AsyncSession) -> Optional[User]:
+    """Resolve a verified JWT subject through the cache."""
+    cache = get_principal_cache()
+    key = cache.token_key(email, expires)
+    user = await cache.get(key)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalar_one_or_none()
+    if user is not None:
+        # Never trust the entry past the token's own expiry
+        ttl = expires - time.time() if expires else None
+        await cache.put(key, user, ttl)
+    return user
@@ -3,11 +3,14 @@ from typing import Union
 
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...db.database import get_db
 from ...utils.config import settings
 from ...v1.auth.jwt_handler import verify_token
+from ...v1.auth.principal_cache import user_for_api_key, user_for_token
+from ...v1.auth.login_throttle import throttle_login
 from ...v1.schemas.auth_schema import (
     UserRegisterRequest,
     UserLoginRequest,
@@ -35,7 +38,8 @@ security = HTTPBearer()
 )
 async def register_user(
     user_data: UserRegisterRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    _: None = Depends(throttle_login)
 ):
     """
     Register a new user account.
@@ -76,7 +80,8 @@ async def register_user(
 )
 async def login_with_password(
     login_data: UserLoginRequest,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    _: None = Depends(throttle_login)
 ):
     """
     Login with email and password.
@@ -171,10 +176,10 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"}
             )
         )
-        user = await AuthService.get_user_by_email(email, db)
+        user = await user_for_token(email, jwt.get_unverified_claims(token).get("exp"), db)
     except:
         # If not a valid JWT, try as API key
-        user = await AuthService.get_user_by_api_key(token, db)
+        user = await user_for_api_key(token, db)
     
     if not user:
         raise HTTPException(
@@ -1,15 +1,38 @@
 """Deployment management endpoints."""
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from ...db.database import get_db
+from ...db.database import get_db, AsyncSessionLocal
+from ...utils.config import settings
+from ...utils.uploads import spool_upload, UPLOAD_REQUEST_BODY
+from ...utils.docker_pool import DockerPool, get_docker_pool, require_docker_pool
 from ...v1.auth.dependencies import get_current_user
-from ...v1.services.deployment_service import DeploymentService
-from services.shared.core.models import Project, Deployment, User
-from services.shared.core.schemas import DeploymentCreate, DeploymentResponse
+from ...v1.services.deployment_service import DeploymentService, run_local_deployment
+from ...v1.services.job_executor import get_deploy_executor, ExecutorFullError
+from ...v1.services.status_broker import get_status_broker, RESYNC
+from services.shared.core.models import Project, Deployment, DeploymentStatus, User
+from services.shared.core.exceptions import RollbackUnavailableError
+from services.shared.core.schemas import (
+    DeploymentCreate,
+    DeploymentResponse,
+    DeploymentAccepted,
+    DeploymentEventPage,
+    DeploymentEventResponse,
+)
+from services.shared.core.deployment_events import (
+    MAX_EVENTS_PAGE,
+    events_after,
+    events_tail,
+    format_events,
+)
+from services.shared.core.status_events import FINAL_STATUSES, status_payload
+from services.orchestrator.core.stats_sampler import DEFAULT_BUFFER_SIZE
 
 router = APIRouter()
 
@@ -17,14 +40,27 @@ router = APIRouter()
 # deployment_service = DeploymentService()  # OLD: shared instance
 
 
-@router.post("/projects/{project_id}", response_model=DeploymentResponse)
+@router.post(
+    "/projects/{project_id}",
+    response_model=DeploymentAccepted,
+    status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=UPLOAD_REQUEST_BODY
+)
 async def create_deployment(
     project_id: str,
-    file: UploadFile = File(...),
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Create a new deployment for a project."""
+    """Accept a new deployment for a project.
+    
+    Returns 202 once the deployment is queued (SQS) or handed to the
+    in-process deploy executor (local Docker mode); follow ``status_url``
+    or its ``/status/stream`` for progress. The source archive is the
+    multipart ``file`` field, read from the body only after auth and the
+    ownership check.
+    """
     # Create deployment service with DB session for AI-enhanced detection
     deployment_service = DeploymentService(db_session=db)
     # Verify project ownership
@@ -42,33 +78,170 @@ async def create_deployment(
             detail="Project not found"
         )
     
-    # Read uploaded file
-    content = await file.read()
+    executor = get_deploy_executor()
+    if deployment_service.runs_locally and not executor.has_capacity():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many deployments in progress, retry shortly",
+            headers={"Retry-After": "30"}
+        )
+    
+    # Stream the upload to disk; oversized archives are rejected with 413
+    async with spool_upload(request) as upload:
+        # Create deployment record
+        new_deployment = Deployment(
+            project_id=project.id,
+            status="created"
+        )
+        
+        db.add(new_deployment)
+        await db.commit()
+        await db.refresh(new_deployment)
+        
+        if deployment_service.runs_locally:
+            # Build in the background; the job owns the spooled archive from here
+            try:
+                executor.submit(
+                    f"deploy {new_deployment.id}",
+                    run_local_deployment(
+                        str(project.id),
+                        str(new_deployment.id),
+                        upload.detach(),
+                        source_sha256=upload.sha256
+                    )
+                )
+            except ExecutorFullError:
+                upload.detached = False
+                new_deployment.status = "error"
+                new_deployment.logs = "Deploy queue full"
+                await db.commit()
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many deployments in progress, retry shortly",
+                    headers={"Retry-After": "30"}
+                )
+            return _accepted(request, response, new_deployment)
+        
+        # SQS mode: detection and enqueueing are quick, workers do the build
+        try:
+            deployment_info = await deployment_service.deploy_project(
+                project,
+                upload.path,
+                deployment_id=str(new_deployment.id),
+                source_sha256=upload.sha256
+            )
+            
+            # Kept for rollbacks, which start the image with the same config
+            new_deployment.run_config = deployment_info.get("config")
+            
+            # Queued deployments are owned by the worker that claims them
+            if deployment_info.get("status") != DeploymentStatus.QUEUED.value:
+                # Update deployment with results
+                new_deployment.status = "live"
+                new_deployment.url = deployment_info.get("url")
+                new_deployment.container_id = deployment_info.get("container_id")
+                new_deployment.image_id = deployment_info.get("image_id")
+            
+            await db.commit()
+            await db.refresh(new_deployment)
+            
+        except Exception as e:
+            # Update deployment with error
+            new_deployment.status = "error"
+            new_deployment.logs = str(e)
+            
+            await db.commit()
+            await db.refresh(new_deployment)
     
-    # Create deployment record
+    return _accepted(request, response, new_deployment)
+
+
+def _accepted(request: Request, response: Response, deployment: Deployment) -> DeploymentAccepted:
+    """202 body and Location header pointing at the deployment."""
+    status_url = str(request.url_for("get_deployment", deployment_id=str(deployment.id)))
+    response.headers["Location"] = status_url
+    return DeploymentAccepted(
+        **DeploymentResponse.from_orm(deployment).model_dump(),
+        status_url=status_url
+    )
+
+
+@router.post("/{deployment_id}/rollback", response_model=DeploymentResponse)
+async def rollback_deployment(
+    deployment_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Roll a project back to the image of a previous deployment without rebuilding."""
+    # Get target deployment with project ownership check
+    result = await db.execute(
+        select(Deployment, Project)
+        .join(Project, Deployment.project_id == Project.id)
+        .where(
+            Deployment.id == deployment_id,
+            Project.user_id == current_user.id
+        )
+    )
+    row = result.one_or_none()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deployment not found"
+        )
+    
+    target, project = row
+    
+    if not target.image_id:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Deployment has no retained image to roll back to"
+        )
+    
+    deployment_service = DeploymentService(db_session=db)
+    
+    # Create deployment record for the rollback
     new_deployment = Deployment(
         project_id=project.id,
-        status="created"
+        status="created",
+        commit_hash=target.commit_hash,
+        image_id=target.image_id,
+        run_config=target.run_config
     )
     
     db.add(new_deployment)
     await db.commit()
     await db.refresh(new_deployment)
     
-    # Trigger actual deployment process
     try:
-        deployment_info = await deployment_service.deploy_project(project, content)
+        deployment_info = await deployment_service.rollback_project(
+            project,
+            target.image_id,
+            deployment_id=str(new_deployment.id),
+            worker_id=target.worker_id,
+            run_config=target.run_config
+        )
         
-        # Update deployment with results
-        new_deployment.status = "live"
-        new_deployment.url = deployment_info.get("url")
-        new_deployment.container_id = deployment_info.get("container_id")
+        # Queued rollbacks are owned by the worker that claims them
+        if deployment_info.get("status") != DeploymentStatus.QUEUED.value:
+            new_deployment.status = "live"
+            new_deployment.url = deployment_info.get("url")
+            new_deployment.container_id = deployment_info.get("container_id")
+            new_deployment.logs = f"Rolled back to deployment {target.id}"
+            
+            await db.commit()
+        await db.refresh(new_deployment)
         
+    except RollbackUnavailableError as e:
+        new_deployment.status = "error"
+        new_deployment.error = str(e)
         await db.commit()
-        await db.refresh(new_deployment)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
         
     except Exception as e:
-        # Update deployment with error
         new_deployment.status = "error"
         new_deployment.logs = str(e)
         
@@ -78,6 +251,56 @@ async def create_deployment(
     return DeploymentResponse.from_orm(new_deployment)
 
 
+async def _control_project(project_id: str, command: str, current_user: User, db: AsyncSession) -> Dict[str, Any]:
+    """Stop or restart the live deployment of a project the user owns."""
+    result = await db.execute(
+        select(Project).where(
+            Project.id == project_id,
+            Project.user_id == current_user.id
+        )
+    )
+    if not result.scalar_one_or_none():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    
+    deployment_service = DeploymentService(db_session=db)
+    if command == "stop":
+        accepted = await deployment_service.stop_deployment(project_id)
+    else:
+        accepted = await deployment_service.restart_deployment(project_id)
+    
+    if not accepted:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Project has no live deployment to {command}"
+        )
+    
+    # With workers the command is queued on the owning worker's control channel
+    return {"project_id": project_id, "command": command, "accepted": True}
+
+
+@router.post("/projects/{project_id}/stop", status_code=status.HTTP_202_ACCEPTED)
+async def stop_project_deployment(
+    project_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stop a project's live deployment."""
+    return await _control_project(project_id, "stop", current_user, db)
+
+
+@router.post("/projects/{project_id}/restart", status_code=status.HTTP_202_ACCEPTED)
+async def restart_project_deployment(
+    project_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Restart a project's live deployment."""
+    return await _control_project(project_id, "restart", current_user, db)
+
+
 @router.get("/projects/{project_id}", response_model=List[DeploymentResponse])
 async def list_deployments(
     project_id: str,
@@ -136,12 +359,100 @@ async def get_deployment(
     return DeploymentResponse.from_orm(deployment)
 
 
+async def _read_status(deployment_id: str) -> Optional[Dict[str, Any]]:
+    """Current status snapshot, read with a short-lived session."""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Deployment).where(Deployment.id == deployment_id)
+        )
+        deployment = result.scalar_one_or_none()
+    if deployment is None:
+        return None
+    return status_payload(
+        deployment.id,
+        deployment.status,
+        updated_at=deployment.updated_at,
+        url=deployment.url,
+        error=deployment.error
+    )
+
+
+@router.get("/{deployment_id}/status/stream")
+async def stream_deployment_status(
+    deployment_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream status changes as server-sent events.
+    
+    Sends the current status, then one ``status`` event per change, and
+    closes once the deployment is live, failed or stopped. Changes are
+    pushed from Postgres NOTIFY, so a watching client costs no queries.
+    """
+    # Get deployment with project ownership check
+    result = await db.execute(
+        select(Deployment.id)
+        .join(Project, Deployment.project_id == Project.id)
+        .where(
+            Deployment.id == deployment_id,
+            Project.user_id == current_user.id
+        )
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deployment not found"
+        )
+    # Don't hold a pooled connection for the lifetime of the stream
+    await db.close()
+    
+    broker = get_status_broker()
+    
+    async def events():
+        async with broker.subscribe(deployment_id) as queue:
+            # Read after subscribing so no change falls between the two
+            current = await _read_status(deployment_id)
+            if current is None:
+                return
+            yield f"event: status\ndata: {json.dumps(current)}\n\n"
+            
+            while current["status"] not in FINAL_STATUSES:
+                try:
+                    message = await asyncio.wait_for(
+                        queue.get(),
+                        timeout=settings.status_stream_heartbeat
+                    )
+                except asyncio.TimeoutError:
+                    if broker.connected:
+                        yield ": keep-alive\n\n"
+                        continue
+                    # No LISTEN connection: degrade to polling
+                    message = RESYNC
+                
+                if message.get("resync"):
+                    message = await _read_status(deployment_id)
+                    if message is None:
+                        return
+                    if message["status"] == current["status"]:
+                        continue
+                
+                current = message
+                yield f"event: status\ndata: {json.dumps(current)}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{deployment_id}/logs")
 async def get_deployment_logs(
     deployment_id: str,
-    tail: int = 100,
+    tail: int = Query(100, ge=1, le=2000, description="Number of most recent lines"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    docker_pool: Optional[DockerPool] = Depends(get_docker_pool)
 ):
     """Get deployment logs."""
     # Get deployment with project ownership check
@@ -161,37 +472,194 @@ async def get_deployment_logs(
             detail="Deployment not found"
         )
     
+    # Build/deploy output recorded by the worker; older rows only have the text column
+    stored_logs = format_events(await events_tail(db, deployment.id, limit=tail)) or deployment.logs or ""
+    
     # Try to get real-time logs from Docker container
-    logs_output = deployment.logs or ""
+    logs_output = stored_logs
     
-    if deployment.container_id:
+    if deployment.container_id and docker_pool is None:
+        # Docker not available, use stored logs
+        logs_output = stored_logs or "Docker unavailable"
+    elif deployment.container_id:
+        import docker
+        from services.orchestrator.core.log_multiplexer import get_log_multiplexer
+        multiplexer = get_log_multiplexer(docker_pool.client)
+        
         try:
-            import docker
-            client = docker.from_env()
+            # Served from the follow buffer when someone is tailing this container,
+            # otherwise one pooled Docker call off the event loop
+            container_logs = await docker_pool.run(
+                multiplexer.tail, deployment.container_id, tail
+            )
             
-            try:
-                container = client.containers.get(deployment.container_id)
-                
-                # Get container logs (last N lines)
-                container_logs = container.logs(
-                    tail=tail,
-                    timestamps=True,
-                    stderr=True,
-                    stdout=True
-                ).decode('utf-8')
-                
-                logs_output = container_logs if container_logs else "No logs from container"
-                
-            except docker.errors.NotFound:
-                logs_output = deployment.logs or "Container no longer exists"
-            except Exception as e:
-                logs_output = deployment.logs or f"Error fetching container logs: {str(e)}"
-                
+            logs_output = container_logs if container_logs else "No logs from container"
+            
+        except docker.errors.NotFound:
+            logs_output = stored_logs or "Container no longer exists"
         except Exception as e:
-            # Docker not available, use stored logs
-            logs_output = deployment.logs or f"Docker unavailable: {str(e)}"
+            logs_output = stored_logs or f"Error fetching container logs: {str(e)}"
     
     return {
         "deployment_id": deployment.id,
         "logs": logs_output or "No logs available"
     }
+
+
+@router.get("/{deployment_id}/logs/stream")
+async def stream_deployment_logs(
+    deployment_id: str,
+    cursor: Optional[str] = Query(None, description="Resume after this event id"),
+    tail: int = Query(100, ge=0, le=2000),
+    last_event_id: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    docker_pool: DockerPool = Depends(require_docker_pool)
+):
+    """Follow container logs as server-sent events.
+    
+    Each line is sent with its cursor (``<epoch>-<offset>``) as the event
+    ``id``; reconnecting with ``Last-Event-ID`` (or ``?cursor=``) resumes
+    after it. A cursor from an older log stream gets a fresh tail. All
+    followers of a container share one Docker log stream.
+    """
+    # Get deployment with project ownership check
+    result = await db.execute(
+        select(Deployment.container_id)
+        .join(Project, Deployment.project_id == Project.id)
+        .where(
+            Deployment.id == deployment_id,
+            Project.user_id == current_user.id
+        )
+    )
+    row = result.one_or_none()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deployment not found"
+        )
+    
+    container_id = row.container_id
+    if not container_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deployment has no running container"
+        )
+    # Don't hold a pooled connection for the lifetime of the stream
+    await db.close()
+    
+    from services.orchestrator.core.log_multiplexer import get_log_multiplexer, LogCursor
+    multiplexer = get_log_multiplexer(docker_pool.client)
+    
+    after = LogCursor.parse(cursor or last_event_id)
+    
+    async def events():
+        previous = after
+        async for line_cursor, line in multiplexer.follow(container_id, after=after, tail=tail):
+            if line_cursor is None:
+                yield ": keep-alive\n\n"
+                continue
+            if previous is not None and line_cursor.epoch == previous.epoch \
+                    and line_cursor.offset > previous.offset + 1:
+                yield f"event: gap\ndata: {line_cursor.offset - previous.offset - 1}\n\n"
+            previous = line_cursor
+            text = line.rstrip("\r")
+            yield f"id: {line_cursor}\ndata: {text}\n\n"
+        yield "event: end\ndata: container stopped\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/{deployment_id}/events", response_model=DeploymentEventPage)
+async def get_deployment_events(
+    deployment_id: str,
+    after_seq: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_EVENTS_PAGE),
+    tail: Optional[int] = Query(None, ge=1, le=MAX_EVENTS_PAGE),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Page through build/deploy events.
+    
+    Pass the returned ``next_seq`` as ``after_seq`` to continue (or to poll
+    for new lines). ``tail`` returns the last N events instead.
+    """
+    # Get deployment with project ownership check
+    result = await db.execute(
+        select(Deployment.id)
+        .join(Project, Deployment.project_id == Project.id)
+        .where(
+            Deployment.id == deployment_id,
+            Project.user_id == current_user.id
+        )
+    )
+    found_id = result.scalar_one_or_none()
+    
+    if not found_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deployment not found"
+        )
+    
+    if tail is not None:
+        events = await events_tail(db, found_id, limit=tail)
+    else:
+        events = await events_after(db, found_id, after_seq=after_seq, limit=limit)
+    
+    return DeploymentEventPage(
+        deployment_id=found_id,
+        events=[DeploymentEventResponse.from_orm(event) for event in events],
+        next_seq=events[-1].seq if events else after_seq
+    )
+
+
+@router.get("/{deployment_id}/stats")
+async def get_deployment_stats(
+    deployment_id: str,
+    window: int = Query(60, ge=1, le=DEFAULT_BUFFER_SIZE, description="Recent samples to aggregate"),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    docker_pool: DockerPool = Depends(require_docker_pool)
+):
+    """Get sampled resource usage for a deployment's container."""
+    # Get deployment with project ownership check
+    result = await db.execute(
+        select(Deployment)
+        .join(Project, Deployment.project_id == Project.id)
+        .where(
+            Deployment.id == deployment_id,
+            Project.user_id == current_user.id
+        )
+    )
+    deployment = result.scalar_one_or_none()
+    
+    if not deployment:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deployment not found"
+        )
+    
+    if not deployment.container_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Deployment has no running container"
+        )
+    
+    from services.orchestrator.core.stats_sampler import get_stats_sampler
+    sampler = get_stats_sampler(docker_pool.client)
+    
+    # Served from memory; a container seen for the first time starts sampling now
+    usage = sampler.summary(deployment.container_id, window=window)
+    if usage is None:
+        sampler.track(deployment.container_id)
+    
+    return {
+        "deployment_id": deployment.id,
+        "stats": usage,
+        "message": None if usage else "No samples collected yet, retry shortly"
+    }
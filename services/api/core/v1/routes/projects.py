@@ -4,14 +4,18 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 
 from ...db.database import get_db
 from ...v1.auth.dependencies import get_current_user
 from services.shared.core.models import Project, User
 from services.shared.core.schemas import ProjectCreate, ProjectResponse
+from services.shared.core.subdomains import allocate_subdomain
 
 router = APIRouter()
 
+SUBDOMAIN_ATTEMPTS = 3
+
 
 @router.post("/", response_model=ProjectResponse)
 async def create_project(
@@ -20,32 +24,31 @@ async def create_project(
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new project."""
-    # Generate subdomain
-    import re
-    subdomain = re.sub(r'[^a-z0-9-]', '-', project_data.name.lower())
-    subdomain = re.sub(r'-+', '-', subdomain).strip('-')
-    
-    # Ensure subdomain is unique
-    counter = 1
-    original_subdomain = subdomain
-    while True:
-        result = await db.execute(
-            select(Project).where(Project.subdomain == subdomain)
+    # Read before any rollback expires the user's attributes
+    user_id = current_user.id
+
+    # Allocate a subdomain; a concurrent create may win the same name first
+    for _ in range(SUBDOMAIN_ATTEMPTS):
+        subdomain = await allocate_subdomain(db, project_data.name)
+        new_project = Project(
+            user_id=user_id,
+            name=project_data.name,
+            subdomain=subdomain,
+            type=project_data.type
         )
-        if not result.scalar_one_or_none():
+
+        db.add(new_project)
+        try:
+            await db.commit()
             break
-        subdomain = f"{original_subdomain}-{counter}"
-        counter += 1
-    
-    new_project = Project(
-        user_id=current_user.id,
-        name=project_data.name,
-        subdomain=subdomain,
-        type=project_data.type
-    )
-    
-    db.add(new_project)
-    await db.commit()
+        except IntegrityError:
+            await db.rollback()
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Could not allocate a subdomain, please retry"
+        )
+
     await db.refresh(new_project)
     
     return ProjectResponse.from_orm(new_project)
@@ -11,7 +11,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from services.shared.core.models import User, UserStatus
 from services.shared.core.exceptions import AuthenticationError
 from ...v1.auth.jwt_handler import create_access_token
-from ...v1.auth.password_handler import hash_password, verify_password
+from ...v1.auth.password_handler import get_password_hasher
+from ...v1.auth.principal_cache import get_principal_cache
 from ...utils.config import settings
 
 
@@ -50,8 +51,8 @@ class AuthService:
         # Generate secure API key
         api_key = secrets.token_urlsafe(32)
         
-        # Hash password (bcrypt with 12 rounds by default - secure but fast)
-        hashed_password = hash_password(password)
+        # Hash password (bcrypt with 12 rounds, on the bounded hashing pool)
+        hashed_password = await get_password_hasher().hash(password)
         
         # Create user
         new_user = User(
@@ -102,8 +103,8 @@ class AuthService:
         if not user:
             raise AuthenticationError("Invalid credentials")
         
-        # Verify password (constant-time comparison)
-        if not verify_password(password, user.password_hash):
+        # Verify password (constant-time comparison, off the event loop)
+        if not await get_password_hasher().verify(password, user.password_hash):
             raise AuthenticationError("Invalid credentials")
         
         # Check user status
@@ -245,16 +246,19 @@ class AuthService:
             raise AuthenticationError("User not found")
         
         # Verify current password
-        if not verify_password(current_password, user.password_hash):
+        if not await get_password_hasher().verify(current_password, user.password_hash):
             raise AuthenticationError("Invalid current password")
         
         # Update password
-        user.password_hash = hash_password(new_password)
+        user.password_hash = await get_password_hasher().hash(new_password)
         user.updated_at = datetime.utcnow()
         
         await db.commit()
         await db.refresh(user)
         
+        # Tokens issued before the change must be re-checked
+        await get_principal_cache().invalidate_user(user.id)
+        
         return user
 
     @staticmethod
@@ -288,4 +292,7 @@ class AuthService:
         await db.commit()
         await db.refresh(user)
         
+        # The old key must stop working on every replica
+        await get_principal_cache().invalidate_user(user.id)
+        
         return user, new_api_key
@@ -6,7 +6,8 @@ from typing import Dict, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from services.shared.core.models import Project, Deployment, DeploymentStatus
-from services.shared.core.exceptions import DeploymentError
+from services.shared.core.exceptions import DeploymentError, RollbackUnavailableError
+from services.shared.core.status_events import notify_status
 
 # Import our services
 import sys
@@ -16,6 +17,23 @@ from services.detector.core.detector import ProjectDetector
 from services.detector.core.ai_detector import AIEnhancedDetector
 from services.orchestrator.core.deployment_manager import DeploymentManager
 from services.orchestrator.core.sqs_deployment_manager import SQSDeploymentManager
+from services.orchestrator.core.deployment_registry import DeploymentRegistry
+from ...db.database import AsyncSessionLocal
+from ...utils.config import settings
+
+
+_deployment_registry: Optional[DeploymentRegistry] = None
+
+
+def get_deployment_registry() -> DeploymentRegistry:
+    """Get the process-wide deployment registry shared by all requests."""
+    global _deployment_registry
+    if _deployment_registry is None:
+        _deployment_registry = DeploymentRegistry(
+            session_factory=AsyncSessionLocal,
+            redis_url=settings.redis_url
+        )
+    return _deployment_registry
 
 
 class DeploymentService:
@@ -52,7 +70,7 @@ class DeploymentService:
         self.sqs_queue_url = os.getenv("SQS_QUEUE_URL")
         if self.sqs_queue_url:
             print("📥 Using SQS-based deployment (production mode)")
-            self.deployment_manager = SQSDeploymentManager()
+            self.deployment_manager = SQSDeploymentManager(session_factory=AsyncSessionLocal)
         else:
             print("🐳 Using local Docker deployment (development mode)")
             # Defer creating DeploymentManager (requires local Docker) until used
@@ -61,14 +79,18 @@ class DeploymentService:
     async def deploy_project(
         self,
         project: Project,
-        source_code: bytes
+        source_path: Path,
+        deployment_id: Optional[str] = None,
+        source_sha256: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Deploy a project from source code.
         
         Args:
             project: Project database model
-            source_code: Compressed source code bytes
+            source_path: Path of the compressed source archive
+            deployment_id: ID of the deployment row tracking this deploy
+            source_sha256: SHA-256 of the archive, if already computed
             
         Returns:
             Dict containing deployment information
@@ -78,13 +100,15 @@ class DeploymentService:
             
             # Lazily create the local deployment manager if needed
             if self.deployment_manager is None:
-                self.deployment_manager = DeploymentManager()
+                self.deployment_manager = DeploymentManager(get_deployment_registry())
 
             # Deploy using the deployment manager (SQS or local Docker)
             deployment_info = await self.deployment_manager.deploy_project(
                 project=project,
-                source_code=source_code,
-                detection_engine=self.detector
+                source_path=source_path,
+                detection_engine=self.detector,
+                deployment_id=deployment_id,
+                source_sha256=source_sha256
             )
             
             return deployment_info
@@ -93,6 +117,45 @@ class DeploymentService:
             print(f"❌ Deployment failed: {e}")
             raise DeploymentError(f"Deployment failed: {e}")
     
+    async def rollback_project(
+        self,
+        project: Project,
+        image_id: str,
+        deployment_id: Optional[str] = None,
+        worker_id: Optional[str] = None,
+        run_config: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Roll a project back to a previously built image without rebuilding.
+        
+        Args:
+            project: Project database model
+            image_id: Image ID retained on a previous deployment
+            deployment_id: ID of the deployment row tracking the rollback
+            worker_id: Worker that built the image (queued mode)
+            run_config: Run configuration stored with the previous deployment
+            
+        Returns:
+            Dict containing deployment information
+        """
+        try:
+            if self.deployment_manager is None:
+                self.deployment_manager = DeploymentManager(get_deployment_registry())
+            
+            return await self.deployment_manager.rollback_project(
+                project=project,
+                image_id=image_id,
+                deployment_id=deployment_id,
+                worker_id=worker_id,
+                run_config=run_config
+            )
+            
+        except RollbackUnavailableError:
+            raise
+        except Exception as e:
+            print(f"❌ Rollback failed: {e}")
+            raise DeploymentError(f"Rollback failed: {e}")
+    
     async def get_deployment_status(self, project_id: str) -> Dict[str, Any]:
         """Get deployment status for a project."""
         return await self.deployment_manager.get_deployment_status(project_id)
@@ -105,6 +168,10 @@ class DeploymentService:
         """Stop a deployment."""
         return await self.deployment_manager.stop_deployment(project_id)
     
+    async def restart_deployment(self, project_id: str) -> bool:
+        """Restart a deployment."""
+        return await self.deployment_manager.restart_deployment(project_id)
+    
     async def list_deployments(self) -> Dict[str, Dict[str, Any]]:
         """List all active deployments."""
         return await self.deployment_manager.list_deployments()
@@ -112,3 +179,56 @@ class DeploymentService:
     async def health_check(self, project_id: str) -> bool:
         """Perform health check on a deployment."""
         return await self.deployment_manager.health_check(project_id)
+    
+    @property
+    def runs_locally(self) -> bool:
+        """Whether deployments build in this process (no SQS workers)."""
+        return not self.sqs_queue_url
+
+
+async def run_local_deployment(
+    project_id: str,
+    deployment_id: str,
+    source_path: Path,
+    source_sha256: Optional[str] = None
+) -> None:
+    """Build and start a local-mode deployment outside the request.
+
+    Runs on the deploy executor with its own database session and owns
+    ``source_path``, which is removed when the job ends.
+    """
+    try:
+        async with AsyncSessionLocal() as session:
+            project = await session.get(Project, project_id)
+            deployment = await session.get(Deployment, deployment_id)
+            if project is None or deployment is None:
+                return
+            
+            deployment.status = DeploymentStatus.BUILDING.value
+            await notify_status(session, deployment_id, deployment.status)
+            await session.commit()
+            
+            try:
+                deployment_info = await DeploymentService(db_session=session).deploy_project(
+                    project,
+                    source_path,
+                    deployment_id=deployment_id,
+                    source_sha256=source_sha256
+                )
+                # The registry marked the row live; pick up what it wrote
+                await session.refresh(deployment)
+                deployment.status = DeploymentStatus.LIVE.value
+                deployment.url = deployment_info.get("url")
+                deployment.container_id = deployment_info.get("container_id")
+                deployment.image_id = deployment_info.get("image_id")
+                deployment.run_config = deployment_info.get("config")
+                
+            except Exception as e:
+                deployment.status = DeploymentStatus.ERROR.value
+                deployment.error = str(e)
+                deployment.logs = str(e)
+                await notify_status(session, deployment_id, deployment.status, error=str(e)[:500])
+            
+            await session.commit()
+    finally:
+        source_path.unlink(missing_ok=True)
@@ -0,0 +1,98 @@
+"""Bounded in-process executor for long-running API work."""
+
+import asyncio
+from typing import Coroutine, Optional, Set
+
+from ...utils.config import settings
+
+
+class ExecutorFullError(Exception):
+    """Raised when the executor has no room for another job."""
+    pass
+
+
+class JobExecutor:
+    """Run coroutines in the background with a concurrency cap.
+
+    At most ``concurrency`` jobs run at once; up to ``max_pending`` jobs
+    (running plus waiting) are accepted before submit() refuses more, so a
+    burst of requests can't pile up unbounded work in the API process.
+    """
+
+    def __init__(self, concurrency: int = 2, max_pending: int = 20):
+        """
+        Initialize job executor.
+
+        Args:
+            concurrency: Jobs run at the same time
+            max_pending: Jobs accepted (running plus waiting)
+        """
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def pending(self) -> int:
+        """Jobs accepted and not yet finished."""
+        return len(self._tasks)
+
+    def has_capacity(self) -> bool:
+        """Whether submit() would accept another job."""
+        return len(self._tasks) < self.max_pending
+
+    def submit(self, name: str, job: Coroutine) -> asyncio.Task:
+        """Schedule a job.
+
+        Args:
+            name: Label used in logs
+            job: Coroutine to run
+
+        Returns:
+            The task running the job
+
+        Raises:
+            ExecutorFullError: If max_pending jobs are already accepted
+        """
+        if not self.has_capacity():
+            job.close()
+            raise ExecutorFullError(f"{self.pending} jobs already pending")
+
+        task = asyncio.create_task(self._run(name, job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, name: str, job: Coroutine) -> None:
+        async with self._semaphore:
+            try:
+                await job
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Background job {name} failed: {e}")
+
+    async def shutdown(self, timeout: float = 30) -> None:
+        """Wait for running jobs, cancelling whatever is left after ``timeout``."""
+        if not self._tasks:
+            return
+        print(f"⏳ Waiting for {len(self._tasks)} background job(s)...")
+        _, still_running = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in still_running:
+            task.cancel()
+        if still_running:
+            await asyncio.gather(*still_running, return_exceptions=True)
+
+
+_deploy_executor: Optional[JobExecutor] = None
+
+
+def get_deploy_executor() -> JobExecutor:
+    """Get the process-wide executor for local-mode deployments."""
+    global _deploy_executor
+    if _deploy_executor is None:
+        _deploy_executor = JobExecutor(
+            concurrency=settings.deploy_concurrency,
+            max_pending=settings.deploy_max_pending
+        )
+    return _deploy_executor
@@ -0,0 +1,155 @@
+"""Fan out deployment status notifications to streaming subscribers."""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+from services.shared.core.status_events import status_channel
+from ...utils.config import settings
+
+# Pushed to subscribers after a reconnect: notifications may have been missed
+RESYNC = {"resync": True}
+
+
+class StatusBroker:
+    """Share one LISTEN connection between every status subscriber.
+
+    Each subscribed deployment is a topic: the broker LISTENs on its
+    channel while at least one client watches it and UNLISTENs when the
+    last one leaves. Notifications are copied into one bounded queue per
+    subscriber. A subscriber that falls behind loses the oldest updates
+    rather than stalling the others, which is fine for status, where only
+    the latest value matters.
+    """
+
+    RECONNECT_DELAY = 5
+
+    def __init__(self, database_url: str, queue_size: int = 16):
+        """
+        Initialize status broker.
+
+        Args:
+            database_url: SQLAlchemy database URL (only Postgres is supported)
+            queue_size: Updates buffered per subscriber before dropping the oldest
+        """
+        self.dsn = database_url.replace("postgresql+asyncpg://", "postgresql://", 1)
+        self.enabled = self.dsn.startswith(("postgresql://", "postgres://"))
+        self.queue_size = queue_size
+        self._conn = None
+        self._topics: Dict[str, Set[asyncio.Queue]] = {}
+        self._lock = asyncio.Lock()
+        self._supervisor_task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        """Whether notifications are currently being received."""
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def start(self) -> None:
+        """Open the LISTEN connection and keep it alive."""
+        if not self.enabled or self._supervisor_task:
+            return
+        self._supervisor_task = asyncio.create_task(self._supervise())
+
+    async def stop(self) -> None:
+        """Close the LISTEN connection."""
+        if self._supervisor_task:
+            self._supervisor_task.cancel()
+            self._supervisor_task = None
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    @asynccontextmanager
+    async def subscribe(self, deployment_id: str) -> AsyncIterator[asyncio.Queue]:
+        """Receive status payloads of one deployment while the context is open."""
+        channel = status_channel(deployment_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        async with self._lock:
+            subscribers = self._topics.setdefault(channel, set())
+            subscribers.add(queue)
+            if len(subscribers) == 1:
+                await self._listen(channel)
+        try:
+            yield queue
+        finally:
+            async with self._lock:
+                subscribers = self._topics.get(channel, set())
+                subscribers.discard(queue)
+                if not subscribers:
+                    self._topics.pop(channel, None)
+                    await self._unlisten(channel)
+
+    async def _supervise(self) -> None:
+        """Connect, re-LISTEN on every topic and reconnect when the connection drops."""
+        import asyncpg
+
+        while True:
+            if not self.connected:
+                try:
+                    conn = await asyncpg.connect(self.dsn)
+                    async with self._lock:
+                        self._conn = conn
+                        for channel in self._topics:
+                            await conn.add_listener(channel, self._on_notify)
+                    print("📡 Status broker listening for deployment updates")
+                    # Anything sent while we were disconnected is lost
+                    for subscribers in self._topics.values():
+                        for queue in subscribers:
+                            self._offer(queue, RESYNC)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._conn = None
+                    print(f"⚠️  Status broker connection failed, retrying: {e}")
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+    async def _listen(self, channel: str) -> None:
+        if not self.connected:
+            return
+        try:
+            await self._conn.add_listener(channel, self._on_notify)
+        except Exception as e:
+            print(f"⚠️  Failed to LISTEN on {channel}: {e}")
+
+    async def _unlisten(self, channel: str) -> None:
+        if not self.connected:
+            return
+        try:
+            await self._conn.remove_listener(channel, self._on_notify)
+        except Exception as e:
+            print(f"⚠️  Failed to UNLISTEN on {channel}: {e}")
+
+    def _on_notify(self, connection, pid, channel: str, payload: str) -> None:
+        """asyncpg callback: copy the notification to every subscriber of the topic."""
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        for queue in self._topics.get(channel, ()):
+            self._offer(queue, message)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: dict) -> None:
+        """Enqueue without blocking, dropping the oldest update when full."""
+        if queue.full():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+        queue.put_nowait(message)
+
+
+_status_broker: Optional[StatusBroker] = None
+
+
+def get_status_broker() -> StatusBroker:
+    """Get the process-wide status broker."""
+    global _status_broker
+    if _status_broker is None:
+        _status_broker = StatusBroker(
+            settings.database_url,
+            queue_size=settings.status_stream_queue_size
+        )
+    return _status_broker
@@ -10,30 +10,41 @@ from typing import Dict, Any, Optional
 from services.shared.core.models import Project
 from services.shared.core.schemas import ProjectConfig
 from services.shared.core.exceptions import DeploymentError, BuildError
+from services.shared.core.artifact_store import safe_extract
 from .docker_manager import DockerManager
+from .deployment_registry import DeploymentRegistry
 
 
 class DeploymentManager:
     """Manages the complete deployment lifecycle."""
     
-    def __init__(self):
-        """Initialize deployment manager."""
+    def __init__(self, registry: Optional[DeploymentRegistry] = None):
+        """
+        Initialize deployment manager.
+        
+        Args:
+            registry: Shared deployment registry (in-memory only if omitted)
+        """
         self.docker_manager = DockerManager()
-        self.active_deployments: Dict[str, Dict[str, Any]] = {}
+        self.registry = registry or DeploymentRegistry()
     
     async def deploy_project(
         self,
         project: Project,
-        source_code: bytes,
-        detection_engine
+        source_path: Path,
+        detection_engine,
+        deployment_id: Optional[str] = None,
+        source_sha256: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Deploy a project from source code.
         
         Args:
             project: Project database model
-            source_code: Compressed source code bytes
+            source_path: Path of the compressed source archive
             detection_engine: Project detection engine (can be AI-enhanced)
+            deployment_id: ID of the deployment row tracking this deploy
+            source_sha256: SHA-256 of the archive, if already computed
             
         Returns:
             Dict containing deployment information
@@ -46,7 +57,7 @@ class DeploymentManager:
                 build_context = Path(temp_dir)
                 
                 # Extract source code
-                await self._extract_source_code(source_code, build_context)
+                await self._extract_source_code(source_path, build_context)
                 
                 # Detect project type and generate config
                 # Check if this is an AI-enhanced detector
@@ -87,7 +98,7 @@ class DeploymentManager:
                 
                 # Build Docker image
                 image_id = await self.docker_manager.build_image(
-                    project, source_code, config, build_context
+                    project, config, build_context
                 )
                 
                 # Run container
@@ -98,27 +109,15 @@ class DeploymentManager:
                 # Get container info
                 container_info = await self.docker_manager.get_container_info(container_id)
                 
-                # Generate URL - always use Dprod's default domain for free users
-                subdomain = getattr(project, 'subdomain', None) or project.name.lower().replace('_', '-')
-                
-                # Generate URL based on environment
-                import os
-                is_development = os.getenv('NODE_ENV', 'development') != 'production'
+                # Blue/green: retire previous containers once the new one is up
+                await self.docker_manager.swap_containers(project, container_id)
                 
-                if is_development:
-                    # Development: use localhost with port
-                    if container_info.get("ports"):
-                        first_port = list(container_info["ports"].values())[0]
-                        url = f"http://localhost:{first_port}"
-                    else:
-                        url = f"http://localhost:3000"
-                else:
-                    # Production: Dprod's default domain (free tier)
-                    url = f"https://{subdomain}.dprod.app"
+                url = self._generate_url(project, container_info)
                 
                 # Store deployment info
                 deployment_info = {
                     "project_id": str(project.id),
+                    "deployment_id": deployment_id,
                     "container_id": container_id,
                     "image_id": image_id,
                     "status": "live",
@@ -130,7 +129,7 @@ class DeploymentManager:
                     "decision_id": decision_id  # For outcome verification
                 }
                 
-                self.active_deployments[str(project.id)] = deployment_info
+                await self.registry.put(str(project.id), deployment_info)
                 
                 print(f"✅ Deployment successful: {deployment_info['url']}")
                 
@@ -152,12 +151,94 @@ class DeploymentManager:
             print(f"❌ Deployment failed: {e}")
             raise DeploymentError(f"Deployment failed: {e}")
     
+    async def rollback_project(
+        self,
+        project: Project,
+        image_id: str,
+        deployment_id: Optional[str] = None,
+        worker_id: Optional[str] = None,
+        run_config: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Roll a project back to a previously built image.
+        
+        Skips extraction, detection and build: the container is started from
+        the retained image and swapped in, so recovery time is bounded by
+        container start time.
+        
+        Args:
+            project: Project database model
+            image_id: Image ID retained on a previous deployment
+            deployment_id: ID of the deployment row tracking the rollback
+            worker_id: Unused; local images live on this host
+            run_config: Configuration the image was originally run with
+            
+        Returns:
+            Dict containing deployment information
+        """
+        try:
+            print(f"⏪ Rolling back {project.name} to image {image_id[:19]}")
+            
+            if run_config:
+                config = ProjectConfig(**run_config)
+            else:
+                # Deployed before run configs were stored: environment is unknown
+                print("⚠️  No stored run configuration, starting from image defaults")
+                config = await self.docker_manager.config_from_image(image_id)
+            container_id = await self.docker_manager.run_container(
+                project, image_id, config
+            )
+            container_info = await self.docker_manager.get_container_info(container_id)
+            await self.docker_manager.swap_containers(project, container_id)
+            
+            deployment_info = {
+                "project_id": str(project.id),
+                "deployment_id": deployment_id,
+                "container_id": container_id,
+                "image_id": image_id,
+                "status": "live",
+                "url": self._generate_url(project, container_info),
+                "ports": container_info.get("ports", {}),
+                "created_at": container_info.get("created"),
+                "config": config.dict(),
+                "rollback": True
+            }
+            
+            await self.registry.put(str(project.id), deployment_info)
+            
+            print(f"✅ Rollback successful: {deployment_info['url']}")
+            return deployment_info
+            
+        except Exception as e:
+            print(f"❌ Rollback failed: {e}")
+            raise DeploymentError(f"Rollback failed: {e}")
+    
+    def _generate_url(self, project: Project, container_info: Dict[str, Any]) -> str:
+        """Generate the public URL for a deployed container."""
+        # Always use Dprod's default domain for free users
+        subdomain = getattr(project, 'subdomain', None) or project.name.lower().replace('_', '-')
+        
+        # Generate URL based on environment
+        import os
+        is_development = os.getenv('NODE_ENV', 'development') != 'production'
+        
+        if is_development:
+            # Development: use localhost with port
+            if container_info.get("ports"):
+                first_port = list(container_info["ports"].values())[0]
+                return f"http://localhost:{first_port}"
+            return f"http://localhost:3000"
+        
+        # Production: Dprod's default domain (free tier)
+        return f"https://{subdomain}.dprod.app"
+    
     async def get_deployment_status(self, project_id: str) -> Dict[str, Any]:
         """Get deployment status for a project."""
-        if project_id not in self.active_deployments:
+        deployment = await self.registry.get(project_id)
+        if deployment is None:
             return {"status": "not_found", "project_id": project_id}
         
-        deployment = self.active_deployments[project_id]
+        deployment = deployment.copy()
         container_id = deployment["container_id"]
         
         try:
@@ -176,10 +257,10 @@ class DeploymentManager:
     
     async def get_deployment_logs(self, project_id: str) -> str:
         """Get deployment logs for a project."""
-        if project_id not in self.active_deployments:
+        deployment = await self.registry.get(project_id)
+        if deployment is None:
             return f"No deployment found for project {project_id}"
         
-        deployment = self.active_deployments[project_id]
         container_id = deployment["container_id"]
         
         try:
@@ -191,32 +272,40 @@ class DeploymentManager:
     
     async def stop_deployment(self, project_id: str) -> bool:
         """Stop a deployment."""
-        if project_id not in self.active_deployments:
+        deployment = await self.registry.get(project_id)
+        if deployment is None:
             return False
         
-        deployment = self.active_deployments[project_id]
         container_id = deployment["container_id"]
         
         try:
             success = await self.docker_manager.stop_container(container_id)
             if success:
-                del self.active_deployments[project_id]
+                await self.registry.remove(project_id)
             return success
             
         except Exception as e:
             print(f"❌ Failed to stop deployment: {e}")
             return False
     
+    async def restart_deployment(self, project_id: str) -> bool:
+        """Restart a deployment's container."""
+        deployment = await self.registry.get(project_id)
+        if deployment is None:
+            return False
+        
+        return await self.docker_manager.restart_container(deployment["container_id"])
+    
     async def list_deployments(self) -> Dict[str, Dict[str, Any]]:
         """List all active deployments."""
-        return self.active_deployments.copy()
+        return await self.registry.list()
     
     async def health_check(self, project_id: str) -> bool:
         """Perform health check on a deployment."""
-        if project_id not in self.active_deployments:
+        deployment = await self.registry.get(project_id)
+        if deployment is None:
             return False
         
-        deployment = self.active_deployments[project_id]
         container_id = deployment["container_id"]
         
         try:
@@ -226,20 +315,13 @@ class DeploymentManager:
         except Exception:
             return False
     
-    async def _extract_source_code(self, source_code: bytes, target_dir: Path) -> None:
-        """Extract compressed source code to target directory."""
+    async def _extract_source_code(self, source_path: Path, target_dir: Path) -> None:
+        """Extract a compressed source archive to target directory."""
+        def extract() -> None:
+            with tarfile.open(source_path, 'r:gz') as tar:
+                safe_extract(tar, target_dir)
+        
         try:
-            # Write compressed data to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.tar.gz', delete=False) as temp_file:
-                temp_file.write(source_code)
-                temp_file_path = temp_file.name
-            
-            # Extract tar.gz file
-            with tarfile.open(temp_file_path, 'r:gz') as tar:
-                tar.extractall(target_dir)
-            
-            # Clean up temporary file
-            Path(temp_file_path).unlink()
-            
+            await asyncio.to_thread(extract)
         except Exception as e:
             raise BuildError(f"Failed to extract source code: {e}")
\ No newline at end of file
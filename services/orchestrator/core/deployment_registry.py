@@ -0,0 +1,239 @@
+"""Shared, persistent registry of live deployments."""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, Any, Optional
+
+from sqlalchemy import select, update
+
+from services.shared.core.models import Deployment, DeploymentStatus
+from services.shared.core.status_events import notify_status
+
+
+class DeploymentRegistry:
+    """Registry of live deployments backed by Postgres.
+
+    Reads go through an in-process cache so status lookups are O(1) dict
+    hits. Every write is persisted to the ``deployments`` table and
+    broadcast on a Redis pub/sub channel, so other API workers and replicas
+    drop their cached copy and re-read from the database on next access.
+    A short TTL bounds staleness if Redis is unavailable.
+    """
+
+    CHANNEL = "dprod:deployments:invalidate"
+
+    def __init__(
+        self,
+        session_factory=None,
+        redis_url: Optional[str] = None,
+        cache_ttl: int = 60
+    ):
+        """
+        Initialize deployment registry.
+
+        Args:
+            session_factory: Async session factory; None keeps state in memory only
+            redis_url: Redis URL for cross-process cache invalidation
+            cache_ttl: Seconds a cached entry is trusted without invalidation
+        """
+        self.session_factory = session_factory
+        self.redis_url = redis_url
+        self.cache_ttl = cache_ttl
+        self.instance_id = uuid.uuid4().hex
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._cached_at: Dict[str, float] = {}
+        self._redis = None
+        self._listener_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Subscribe to invalidation messages from other processes."""
+        if not self.redis_url or self._listener_task:
+            return
+        try:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+            pubsub = self._redis.pubsub()
+            await pubsub.subscribe(self.CHANNEL)
+            self._listener_task = asyncio.create_task(self._listen(pubsub))
+            print("📡 Deployment registry listening for invalidations")
+        except Exception as e:
+            self._redis = None
+            print(f"⚠️  Deployment registry invalidation disabled (cache TTL {self.cache_ttl}s): {e}")
+
+    async def stop(self) -> None:
+        """Stop listening and close the Redis connection."""
+        if self._listener_task:
+            self._listener_task.cancel()
+            self._listener_task = None
+        if self._redis:
+            await self._redis.close()
+            self._redis = None
+
+    async def get(self, project_id: str) -> Optional[Dict[str, Any]]:
+        """Get the live deployment of a project (cache first, then database)."""
+        cached = self._cache.get(project_id)
+        if cached is not None and (
+            self.session_factory is None
+            or time.monotonic() - self._cached_at[project_id] < self.cache_ttl
+        ):
+            return cached
+
+        if self.session_factory is None:
+            return None
+
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Deployment)
+                .where(
+                    Deployment.project_id == project_id,
+                    Deployment.status == DeploymentStatus.LIVE.value
+                )
+                .order_by(Deployment.created_at.desc())
+                .limit(1)
+            )
+            deployment = result.scalar_one_or_none()
+
+        if deployment is None:
+            self._evict(project_id)
+            return None
+
+        info = self._to_info(deployment)
+        self._store(project_id, info)
+        return info
+
+    async def put(self, project_id: str, info: Dict[str, Any]) -> None:
+        """Register the live deployment of a project.
+
+        The deployment row named by ``info["deployment_id"]`` becomes the
+        project's live deployment; any previously live rows are marked stopped.
+        """
+        deployment_id = info.get("deployment_id")
+        if self.session_factory is not None and deployment_id:
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    update(Deployment)
+                    .where(
+                        Deployment.project_id == project_id,
+                        Deployment.status == DeploymentStatus.LIVE.value,
+                        Deployment.id != deployment_id
+                    )
+                    .values(status=DeploymentStatus.STOPPED.value)
+                    .returning(Deployment.id)
+                )
+                for stopped_id in result.scalars().all():
+                    await notify_status(session, stopped_id, DeploymentStatus.STOPPED.value)
+                await session.execute(
+                    update(Deployment)
+                    .where(Deployment.id == deployment_id)
+                    .values(
+                        status=DeploymentStatus.LIVE.value,
+                        container_id=info.get("container_id"),
+                        image_id=info.get("image_id"),
+                        url=info.get("url")
+                    )
+                )
+                await notify_status(session, deployment_id, DeploymentStatus.LIVE.value, url=info.get("url"))
+                await session.commit()
+
+        self._store(project_id, info)
+        await self._publish(project_id)
+
+    async def remove(self, project_id: str) -> None:
+        """Mark a project's live deployment as stopped."""
+        if self.session_factory is not None:
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    update(Deployment)
+                    .where(
+                        Deployment.project_id == project_id,
+                        Deployment.status == DeploymentStatus.LIVE.value
+                    )
+                    .values(status=DeploymentStatus.STOPPED.value)
+                    .returning(Deployment.id)
+                )
+                for stopped_id in result.scalars().all():
+                    await notify_status(session, stopped_id, DeploymentStatus.STOPPED.value)
+                await session.commit()
+
+        self._evict(project_id)
+        await self._publish(project_id)
+
+    async def list(self) -> Dict[str, Dict[str, Any]]:
+        """List the live deployment of every project."""
+        if self.session_factory is None:
+            return {project_id: info.copy() for project_id, info in self._cache.items()}
+
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Deployment)
+                .where(Deployment.status == DeploymentStatus.LIVE.value)
+                .order_by(Deployment.created_at)
+            )
+            deployments = result.scalars().all()
+
+        # Later rows win, so each project maps to its newest live deployment
+        live = {str(d.project_id): self._to_info(d) for d in deployments}
+        for project_id, info in live.items():
+            self._store(project_id, info)
+        return live
+
+    def invalidate(self, project_id: str) -> None:
+        """Drop a project from the local cache."""
+        self._evict(project_id)
+
+    def _store(self, project_id: str, info: Dict[str, Any]) -> None:
+        self._cache[project_id] = info
+        self._cached_at[project_id] = time.monotonic()
+
+    def _evict(self, project_id: str) -> None:
+        self._cache.pop(project_id, None)
+        self._cached_at.pop(project_id, None)
+
+    async def _publish(self, project_id: str) -> None:
+        """Tell other processes to drop their cached entry."""
+        if not self._redis:
+            return
+        try:
+            await self._redis.publish(
+                self.CHANNEL,
+                json.dumps({"project_id": project_id, "origin": self.instance_id})
+            )
+        except Exception as e:
+            print(f"⚠️  Failed to publish registry invalidation: {e}")
+
+    async def _listen(self, pubsub) -> None:
+        """Apply invalidations published by other processes."""
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    payload = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                if payload.get("origin") != self.instance_id:
+                    self._evict(payload.get("project_id"))
+        except asyncio.CancelledError:
+            await pubsub.unsubscribe(self.CHANNEL)
+            raise
+        except Exception as e:
+            # Without invalidations, fall back to TTL expiry
+            print(f"⚠️  Deployment registry listener stopped: {e}")
+            self._cache.clear()
+            self._cached_at.clear()
+
+    @staticmethod
+    def _to_info(deployment: Deployment) -> Dict[str, Any]:
+        """Convert a deployment row into the registry's info dict."""
+        return {
+            "project_id": str(deployment.project_id),
+            "deployment_id": str(deployment.id),
+            "container_id": deployment.container_id,
+            "image_id": deployment.image_id,
+            "status": deployment.status,
+            "url": deployment.url,
+            "created_at": deployment.created_at.isoformat() if deployment.created_at else None,
+        }
@@ -7,9 +7,10 @@ from pathlib import Path
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 
-from services.shared.core.models import Project
+from services.shared.core.models import Project, ProjectType
 from services.shared.core.schemas import ProjectConfig
 from services.shared.core.exceptions import ContainerError, ResourceLimitError
+from .stats_sampler import get_stats_sampler
 
 
 class DockerManager:
@@ -23,6 +24,7 @@ class DockerManager:
             self.client.ping()  # Test connection
             
             self.docker_available = True
+            self.stats_sampler = get_stats_sampler(self.client)
             print("✅ Docker connection established")
             
         except Exception as e:
@@ -33,7 +35,6 @@ class DockerManager:
     async def build_image(
         self, 
         project: Project, 
-        source_code: bytes, 
         config: ProjectConfig,
         build_context: Path
     ) -> str:
@@ -42,7 +43,6 @@ class DockerManager:
         
         Args:
             project: Project database model
-            source_code: Compressed source code bytes
             config: Project configuration
             build_context: Path to build context
             
@@ -70,7 +70,12 @@ class DockerManager:
                 tag=image_tag,
                 rm=True,
                 forcerm=True,
-                labels={"dprod": "true", "project": project.name}
+                labels={
+                    "dprod": "true",
+                    "project": project.name,
+                    "project_id": str(project.id),
+                    "project_type": config.type.value
+                }
             )
             
             print(f"✅ Image built successfully: {image.id}")
@@ -159,6 +164,7 @@ class DockerManager:
             
             # Run container
             container = self.client.containers.run(**container_config)
+            self.stats_sampler.track(container.id)
             
             print(f"✅ Container started: {container.id}")
             return container.id
@@ -167,6 +173,88 @@ class DockerManager:
             print(f"❌ Failed to start container: {e}")
             raise ContainerError(f"Container start failed: {e}")
     
+    async def config_from_image(self, image_id: str) -> ProjectConfig:
+        """
+        Reconstruct a run configuration from a previously built image.
+        
+        Fallback for deployments without a stored run configuration: start
+        command and port come from the image, but the runtime environment
+        passed to the original container is not recoverable.
+        
+        Args:
+            image_id: Docker image ID
+            
+        Returns:
+            Project configuration for run_container
+        """
+        try:
+            image = self.client.images.get(image_id)
+        except docker.errors.ImageNotFound:
+            raise ContainerError(f"Image no longer exists: {image_id}")
+        except Exception as e:
+            raise ContainerError(f"Failed to inspect image: {e}")
+        
+        image_config = image.attrs.get("Config") or {}
+        labels = image_config.get("Labels") or {}
+        
+        exposed_ports = list((image_config.get("ExposedPorts") or {}).keys())
+        port = int(exposed_ports[0].split("/")[0]) if exposed_ports else 3000
+        
+        try:
+            project_type = ProjectType(labels.get("project_type", ProjectType.UNKNOWN.value))
+        except ValueError:
+            project_type = ProjectType.UNKNOWN
+        
+        return ProjectConfig(
+            type=project_type,
+            start_command=" ".join(image_config.get("Cmd") or []),
+            port=port,
+            environment={},
+            install_path=image_config.get("WorkingDir") or "/app"
+        )
+    
+    async def swap_containers(
+        self,
+        project: Project,
+        container_id: str,
+        timeout: int = 30
+    ) -> List[str]:
+        """
+        Blue/green swap: retire the project's other containers once the new one runs.
+        
+        Args:
+            project: Project database model
+            container_id: ID of the newly started (green) container
+            timeout: Seconds to wait for the new container to be running
+            
+        Returns:
+            IDs of the retired containers
+        """
+        container = self.client.containers.get(container_id)
+        for _ in range(timeout):
+            container.reload()
+            if container.status == "running":
+                break
+            if container.status in ("exited", "dead"):
+                raise ContainerError(f"New container exited during start: {container_id}")
+            await asyncio.sleep(1)
+        else:
+            raise ContainerError(f"New container not running after {timeout}s: {container_id}")
+        
+        retired = []
+        previous = self.client.containers.list(
+            filters={"label": f"project_id={project.id}"}
+        )
+        for old in previous:
+            if old.id == container.id:
+                continue
+            if await self.stop_container(old.id):
+                retired.append(old.id)
+        
+        if retired:
+            print(f"🔁 Swapped {project.name} to {container_id[:12]}, retired {len(retired)} container(s)")
+        return retired
+    
     async def get_container_info(self, container_id: str) -> Dict[str, Any]:
         """Get container information."""
         try:
@@ -204,6 +292,18 @@ class DockerManager:
             print(f"❌ Failed to stop container: {e}")
             return False
     
+    async def restart_container(self, container_id: str) -> bool:
+        """Restart container."""
+        try:
+            container = self.client.containers.get(container_id)
+            container.restart()
+            print(f"🔄 Container restarted: {container_id}")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Failed to restart container: {e}")
+            return False
+    
     async def get_container_logs(self, container_id: str) -> str:
         """Get container logs."""
         try:
@@ -214,6 +314,10 @@ class DockerManager:
         except Exception as e:
             raise ContainerError(f"Failed to get container logs: {e}")
     
+    async def get_resource_usage(self, container_id: str) -> Optional[Dict[str, Any]]:
+        """Get sampled resource usage for a container from the stats sampler."""
+        return self.stats_sampler.summary(container_id)
+    
     async def list_containers(self) -> List[Dict[str, Any]]:
         """List all Dprod containers."""
         try:
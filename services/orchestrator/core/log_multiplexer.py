@@ -0,0 +1,333 @@
+"""Shared follow streams of container logs with resumable offsets."""
+
+import asyncio
+import calendar
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import docker
+
+DEFAULT_RING_SIZE = 2000  # lines retained per container
+DEFAULT_LINGER = 30  # seconds a stream stays open after its last subscriber leaves
+DEFAULT_BACKFILL = 100  # lines fetched when a stream opens
+
+
+class LogCursor(NamedTuple):
+    """Position in a container's log: the stream's epoch and a line offset.
+
+    Offsets restart at 1 whenever a stream is reopened after being reaped,
+    so a cursor is only meaningful within the epoch that issued it.
+    """
+    epoch: str
+    offset: int
+
+    def __str__(self) -> str:
+        return f"{self.epoch}-{self.offset}"
+
+    @classmethod
+    def parse(cls, value: Optional[str]) -> Optional["LogCursor"]:
+        """Parse ``<epoch>-<offset>``; None if malformed."""
+        epoch, _, offset = (value or "").rpartition("-")
+        if not epoch or not offset.isdigit():
+            return None
+        return cls(epoch, int(offset))
+
+
+class LogRing:
+    """Bounded buffer of log lines numbered with ever-increasing offsets.
+
+    Offsets keep counting across evictions, so a reader that fell behind
+    can tell how many lines it missed.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_RING_SIZE):
+        """Initialize log ring.
+
+        Args:
+            capacity: Maximum number of lines retained
+        """
+        self._lines: deque = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.next_offset = 1
+
+    def append(self, line: str) -> int:
+        """Append a line and return its offset."""
+        with self._lock:
+            offset = self.next_offset
+            self._lines.append((offset, line))
+            self.next_offset += 1
+            return offset
+
+    def since(self, offset: int) -> Tuple[List[Tuple[int, str]], int]:
+        """Lines after ``offset``.
+
+        Returns:
+            Tuple of (list of (offset, line), number of lines already evicted)
+        """
+        with self._lock:
+            if not self._lines:
+                return [], 0
+            first = self._lines[0][0]
+            skipped = max(0, first - offset - 1)
+            start = max(0, offset + 1 - first)
+            return [self._lines[i] for i in range(start, len(self._lines))], skipped
+
+    def tail(self, count: int) -> List[Tuple[int, str]]:
+        """Last ``count`` lines."""
+        with self._lock:
+            return list(self._lines)[-count:] if count > 0 else []
+
+
+class ContainerLogStream:
+    """One ``logs(follow=True)`` connection feeding a ring and its subscribers."""
+
+    def __init__(self, client: docker.DockerClient, container_id: str, capacity: int, backfill: int):
+        self.client = client
+        self.container_id = container_id
+        self.backfill = backfill
+        self.epoch = uuid.uuid4().hex[:8]
+        self.ring = LogRing(capacity)
+        self.subscribers = 0
+        self.idle_since: Optional[float] = None
+        self._wakeups: Dict[asyncio.Event, asyncio.AbstractEventLoop] = {}
+        self._stream = None
+        self._thread: Optional[threading.Thread] = None
+        self._last_timestamp = ""
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def open(self) -> None:
+        """Start following unless already running."""
+        with self._lock:
+            if self.alive:
+                return
+            self._thread = threading.Thread(
+                target=self._follow,
+                name=f"dprod-logs-{self.container_id[:12]}",
+                daemon=True
+            )
+            self._thread.start()
+
+    def close(self) -> None:
+        """Drop the Docker connection; the follow thread exits."""
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def watch(self, event: asyncio.Event) -> None:
+        with self._lock:
+            self._wakeups[event] = asyncio.get_running_loop()
+
+    def unwatch(self, event: asyncio.Event) -> None:
+        with self._lock:
+            self._wakeups.pop(event, None)
+
+    def _follow(self) -> None:
+        """Read the Docker log stream line by line into the ring."""
+        try:
+            container = self.client.containers.get(self.container_id)
+            if self._last_timestamp:
+                # Reopened: resume where the previous connection stopped
+                since = calendar.timegm(time.strptime(self._last_timestamp[:19], "%Y-%m-%dT%H:%M:%S"))
+                self._stream = container.logs(stream=True, follow=True, timestamps=True, since=since)
+            else:
+                self._stream = container.logs(stream=True, follow=True, timestamps=True, tail=self.backfill)
+
+            pending = b""
+            for chunk in self._stream:
+                pending += chunk
+                *lines, pending = pending.split(b"\n")
+                for raw in lines:
+                    self._publish(raw.decode("utf-8", errors="replace"))
+            if pending:
+                # Last line without a trailing newline
+                self._publish(pending.decode("utf-8", errors="replace"))
+        except docker.errors.NotFound:
+            pass
+        except Exception as e:
+            print(f"⚠️  Log stream for {self.container_id[:12]} ended: {e}")
+        finally:
+            self._stream = None
+            self._notify()
+
+    def _publish(self, line: str) -> None:
+        timestamp = line.split(" ", 1)[0]
+        if timestamp and timestamp <= self._last_timestamp:
+            return  # Already seen before a reconnect
+        self._last_timestamp = timestamp or self._last_timestamp
+        self.ring.append(line)
+        self._notify()
+
+    def _notify(self) -> None:
+        with self._lock:
+            wakeups = list(self._wakeups.items())
+        for event, loop in wakeups:
+            loop.call_soon_threadsafe(event.set)
+
+
+class LogMultiplexer:
+    """Fan out container logs so each container has at most one follow stream.
+
+    Subscribers read from a shared ring with their own cursor; a client
+    that reconnects passes the last cursor it saw and continues without
+    gaps as long as the same stream still holds those lines. A cursor from
+    an earlier stream (reaped and reopened since) gets a fresh tail.
+    """
+
+    def __init__(
+        self,
+        client: docker.DockerClient,
+        capacity: int = DEFAULT_RING_SIZE,
+        linger: int = DEFAULT_LINGER,
+        backfill: int = DEFAULT_BACKFILL
+    ):
+        """Initialize log multiplexer.
+
+        Args:
+            client: Docker client shared with the caller
+            capacity: Lines retained per container
+            linger: Seconds to keep an unwatched stream open for reconnects
+            backfill: Lines fetched when a stream opens
+        """
+        self.client = client
+        self.capacity = capacity
+        self.linger = linger
+        self.backfill = backfill
+        self._streams: Dict[str, ContainerLogStream] = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, container_id: str) -> ContainerLogStream:
+        with self._lock:
+            self._reap_locked()
+            stream = self._streams.get(container_id)
+            if stream is None:
+                stream = ContainerLogStream(self.client, container_id, self.capacity, self.backfill)
+                self._streams[container_id] = stream
+            stream.subscribers += 1
+            stream.idle_since = None
+        stream.open()
+        return stream
+
+    def _release(self, stream: ContainerLogStream) -> None:
+        with self._lock:
+            stream.subscribers -= 1
+            if stream.subscribers == 0:
+                stream.idle_since = time.monotonic()
+                threading.Timer(self.linger + 1, self._reap).start()
+
+    def _reap(self) -> None:
+        with self._lock:
+            self._reap_locked()
+
+    def _reap_locked(self) -> None:
+        """Close streams nobody has watched for ``linger`` seconds."""
+        now = time.monotonic()
+        for container_id, stream in list(self._streams.items()):
+            if stream.idle_since is not None and now - stream.idle_since >= self.linger:
+                stream.close()
+                del self._streams[container_id]
+
+    async def follow(
+        self,
+        container_id: str,
+        after: Optional[LogCursor] = None,
+        tail: int = DEFAULT_BACKFILL,
+        heartbeat: float = 15
+    ):
+        """Yield ``(cursor, line)`` as lines arrive; ``(None, None)`` on idle heartbeats.
+
+        Args:
+            container_id: Container to follow
+            after: Resume after this cursor (default: start with the last ``tail`` lines)
+            tail: Lines replayed when not resuming
+            heartbeat: Seconds without output before yielding a heartbeat
+
+        A gap in offsets within one epoch means lines were evicted from the
+        ring before this reader got to them.
+        """
+        stream = self._acquire(container_id)
+        wakeup = asyncio.Event()
+        stream.watch(wakeup)
+        try:
+            if after is None or after.epoch != stream.epoch or after.offset >= stream.ring.next_offset:
+                # Fresh follow, or a cursor from a stream that has since been closed
+                backlog = stream.ring.tail(tail)
+                cursor = backlog[0][0] - 1 if backlog else stream.ring.next_offset - 1
+            else:
+                cursor = after.offset
+
+            while True:
+                wakeup.clear()
+                lines, _ = stream.ring.since(cursor)
+                for offset, line in lines:
+                    cursor = offset
+                    yield LogCursor(stream.epoch, offset), line
+                if lines:
+                    continue
+                if not stream.alive:
+                    return
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield None, None
+        finally:
+            stream.unwatch(wakeup)
+            self._release(stream)
+
+    def tail(self, container_id: str, count: int = 100) -> str:
+        """Last ``count`` lines, from the ring when the container is followed.
+
+        The ring only reaches back ``backfill`` lines from when following
+        started (and at most its capacity), so a longer tail than it holds
+        is read from Docker.
+        """
+        with self._lock:
+            stream = self._streams.get(container_id)
+        if stream is not None and stream.alive:
+            lines = stream.ring.tail(count)
+            if len(lines) >= count:
+                return "\n".join(line for _, line in lines)
+        container = self.client.containers.get(container_id)
+        return container.logs(tail=count, timestamps=True, stderr=True, stdout=True).decode("utf-8")
+
+    def stop(self) -> None:
+        """Close every follow stream."""
+        with self._lock:
+            for stream in self._streams.values():
+                stream.close()
+            self._streams.clear()
+
+
+_multiplexer: Optional[LogMultiplexer] = None
+_multiplexer_lock = threading.Lock()
+
+
+def get_log_multiplexer(client: Optional[docker.DockerClient] = None) -> LogMultiplexer:
+    """Return the per-host log multiplexer, creating it on first use.
+
+    Args:
+        client: Docker client to use if the multiplexer does not exist yet
+    """
+    global _multiplexer
+    with _multiplexer_lock:
+        if _multiplexer is None:
+            if client is None:
+                client = docker.DockerClient(base_url='unix://var/run/docker.sock')
+            _multiplexer = LogMultiplexer(client)
+        return _multiplexer
+
+
+def stop_log_multiplexer() -> None:
+    """Close all follow streams if the multiplexer was created."""
+    with _multiplexer_lock:
+        if _multiplexer is not None:
+            _multiplexer.stop()
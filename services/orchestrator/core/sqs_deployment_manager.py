@@ -1,7 +1,6 @@
 """SQS-based deployment manager for hybrid architecture."""
 
 import asyncio
-import base64
 import json
 import os
 import tempfile
@@ -9,25 +8,87 @@ import tarfile
 from pathlib import Path
 from typing import Dict, Any, Optional
 
-import boto3
 from botocore.exceptions import ClientError
+from datetime import datetime, timedelta
 
-from services.shared.core.models import Project, ProjectType
+from sqlalchemy import select, func
+
+from services.shared.core.models import (
+    Project,
+    ProjectType,
+    Deployment,
+    DeploymentCommand,
+    DeploymentStatus,
+    CommandStatus,
+    WorkerCache,
+)
 from services.shared.core.schemas import ProjectConfig
-from services.shared.core.exceptions import DeploymentError, BuildError
+from services.shared.core.exceptions import DeploymentError, BuildError, RollbackUnavailableError
+from services.shared.core.artifact_store import get_artifact_store, safe_extract
+from services.shared.core.job_queue import get_job_queue
+from services.shared.core.build_cache import BloomFilter, cache_keys
+from services.shared.core.deployment_events import events_tail, format_events
 
 
 class SQSDeploymentManager:
     """Manages deployments via SQS queue for EC2 workers."""
     
-    def __init__(self):
-        """Initialize SQS deployment manager."""
+    # Worker statuses that mean the container is serving traffic
+    LIVE_STATUSES = (DeploymentStatus.LIVE.value, "running")
+    
+    # Statuses of deployments still waiting for or holding a worker
+    IN_FLIGHT_STATUSES = (
+        DeploymentStatus.CREATED.value,
+        DeploymentStatus.QUEUED.value,
+        DeploymentStatus.BUILDING.value,
+        DeploymentStatus.DEPLOYING.value,
+    )
+    
+    # Queue priorities, highest first
+    PRIORITY_HIGH = "high"
+    PRIORITY_NORMAL = "normal"
+    PRIORITY_LOW = "low"
+    
+    def __init__(self, session_factory=None):
+        """
+        Initialize SQS deployment manager.
+        
+        Args:
+            session_factory: Async session factory for reading worker-reported state
+        """
         self.sqs_queue_url = os.getenv("SQS_QUEUE_URL")
         if not self.sqs_queue_url:
             raise ValueError("SQS_QUEUE_URL environment variable is required")
         
+        # Optional priority queues; without them everything shares SQS_QUEUE_URL
+        self.queue_urls = {
+            self.PRIORITY_HIGH: os.getenv("SQS_HIGH_PRIORITY_QUEUE_URL") or self.sqs_queue_url,
+            self.PRIORITY_NORMAL: self.sqs_queue_url,
+            self.PRIORITY_LOW: os.getenv("SQS_LOW_PRIORITY_QUEUE_URL") or self.sqs_queue_url,
+        }
+        # Users with this many deployments in flight are demoted to the low queue
+        self.bulk_deploy_threshold = int(os.getenv("BULK_DEPLOY_THRESHOLD", "3"))
+        
+        # Cache affinity: seconds a routed build waits for its worker before
+        # any worker may take it, and how old a cache summary may be
+        self.affinity_timeout = min(int(os.getenv("AFFINITY_TIMEOUT", "30")), 900)
+        self.worker_stale_seconds = int(os.getenv("WORKER_STALE_SECONDS", "300"))
+        # Minimum seconds between container log refreshes per deployment
+        self.logs_refresh_interval = int(os.getenv("LOGS_REFRESH_INTERVAL", "10"))
+        self._logs_requested: Dict[str, datetime] = {}
+        
         # Get AWS region from queue URL or environment
         self.aws_region = os.getenv("AWS_REGION", "us-east-1")
+        self.session_factory = session_factory
+        
+        # Source archives travel through the artifact store, not the message
+        self.artifact_store = get_artifact_store()
+        
+        # Queue backend (SQS by default; redis/memory for local runs and benchmarks)
+        self.queue_backend = os.getenv("QUEUE_BACKEND", "sqs").lower()
+        self.job_queue = get_job_queue(self.queue_backend)
+        
+        print(f"📥 Queued Deployment Manager initialized ({self.queue_backend}): {self.sqs_queue_url}")
     
     def _generate_dockerfile(self, config: ProjectConfig) -> str:
         """Generate Dockerfile based on project type and configuration."""
@@ -100,25 +161,24 @@ EXPOSE {config.port}
 # Start command
 CMD {config.start_command or 'bash'}
 """
-        
-        # Initialize SQS client
-        self.sqs_client = boto3.client('sqs', region_name=self.aws_region)
-        
-        print(f"📥 SQS Deployment Manager initialized: {self.sqs_queue_url}")
     
     async def deploy_project(
         self,
         project: Project,
-        source_code: bytes,
-        detection_engine
+        source_path: Path,
+        detection_engine,
+        deployment_id: Optional[str] = None,
+        source_sha256: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Deploy a project by queuing it to SQS.
         
         Args:
             project: Project database model
-            source_code: Compressed source code bytes
+            source_path: Path of the compressed source archive
             detection_engine: Project detection engine (can be AI-enhanced)
+            deployment_id: ID of the deployment row tracking this deploy
+            source_sha256: SHA-256 of the archive, if already computed
             
         Returns:
             Dict containing deployment information
@@ -131,7 +191,7 @@ CMD {config.start_command or 'bash'}
                 build_context = Path(temp_dir)
                 
                 # Extract source code
-                await self._extract_source_code(source_code, build_context)
+                await self._extract_source_code(source_path, build_context)
                 
                 # Detect project type and generate config
                 is_ai_detector = hasattr(detection_engine, 'detect_project') and \
@@ -168,8 +228,11 @@ CMD {config.start_command or 'bash'}
                 
                 print(f"📋 Project config: {config}")
                 
-                # Prepare project files as base64
-                project_files = await self._encode_project_files(build_context)
+                # Claim check: upload the archive once, enqueue only its hash and URI
+                artifact_sha256, artifact_uri = await asyncio.to_thread(
+                    self.artifact_store.put_file, source_path, source_sha256
+                )
+                print(f"📦 Stored source archive: {artifact_uri}")
                 
                 # Generate dockerfile content if needed
                 dockerfile_content = None
@@ -185,19 +248,32 @@ CMD {config.start_command or 'bash'}
                 
                 # Prepare deployment job message
                 job_message = {
-                    "deployment_id": str(project.id),
+                    "deployment_id": deployment_id or str(project.id),
+                    "project_id": str(project.id),
+                    "user_id": str(project.user_id),
+                    "priority": await self._deploy_priority(project, deployment_id),
                     "project_name": project.name,
-                    "project_files": project_files,
+                    "artifact_uri": artifact_uri,
+                    "artifact_sha256": artifact_sha256,
                     "dockerfile_content": dockerfile_content,
                     "environment": config.environment if hasattr(config, 'environment') else {},
-                    "ports": config.ports if hasattr(config, 'ports') else {"3000": 3000},
+                    # Random host port: old and new containers overlap during the swap
+                    "ports": {str(config.port): None},
                     "config": config.dict() if hasattr(config, 'dict') else config,
                     "ai_verified": ai_verified,
                     "decision_id": decision_id
                 }
                 
-                # Send to SQS
-                await self._send_to_sqs(job_message)
+                # Prefer the worker whose layer cache best matches this build
+                affinity_queue = await self._affinity_queue(
+                    cache_keys(build_context, dockerfile_content)
+                )
+                if affinity_queue:
+                    await self._send_to_sqs(job_message, queue_url=affinity_queue)
+                    # Fallback copy for any worker; the deployment claim lets only one run it
+                    await self._send_to_sqs(job_message, delay_seconds=self.affinity_timeout)
+                else:
+                    await self._send_to_sqs(job_message)
                 
                 # Generate URL (will be updated by worker once deployed)
                 subdomain = getattr(project, 'subdomain', None) or project.name.lower().replace('_', '-')
@@ -205,6 +281,7 @@ CMD {config.start_command or 'bash'}
                 
                 deployment_info = {
                     "project_id": str(project.id),
+                    "deployment_id": deployment_id,
                     "status": "queued",
                     "url": url,
                     "message": "Deployment queued successfully. Worker will process shortly.",
@@ -233,124 +310,383 @@ CMD {config.start_command or 'bash'}
             print(f"❌ Deployment queueing failed: {e}")
             raise DeploymentError(f"Failed to queue deployment: {e}")
     
-    async def _send_to_sqs(self, job_message: Dict[str, Any]) -> None:
-        """Send deployment job to SQS queue."""
+    async def rollback_project(
+        self,
+        project: Project,
+        image_id: str,
+        deployment_id: Optional[str] = None,
+        worker_id: Optional[str] = None,
+        run_config: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a rollback to a previously built image.
+        
+        Images only exist on the worker that built them, so the job goes to
+        that worker's own queue; it starts a container from the image and
+        swaps it in, skipping extraction, detection and build.
+        
+        Args:
+            project: Project database model
+            image_id: Image ID retained on a previous deployment
+            deployment_id: ID of the deployment row tracking the rollback
+            worker_id: Worker that built the image
+            run_config: Configuration the image was originally run with
+            
+        Returns:
+            Dict containing deployment information
+            
+        Raises:
+            RollbackUnavailableError: If that worker is no longer running
+        """
         try:
-            # Convert to JSON
-            message_body = json.dumps(job_message)
+            queue_url = await self._worker_queue(worker_id) if worker_id else None
+            if not queue_url:
+                raise RollbackUnavailableError(
+                    f"Worker {worker_id or '(unknown)'} that built image {image_id[:19]} "
+                    "is no longer available; redeploy instead"
+                )
             
-            # Send message
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.sqs_client.send_message(
-                    QueueUrl=self.sqs_queue_url,
-                    MessageBody=message_body,
-                    MessageAttributes={
-                        'deployment_id': {
-                            'StringValue': job_message['deployment_id'],
-                            'DataType': 'String'
-                        },
-                        'project_name': {
-                            'StringValue': job_message['project_name'],
-                            'DataType': 'String'
-                        }
-                    }
+            print(f"⏪ Queueing rollback for {project.name} to image {image_id[:19]} on {worker_id}")
+            
+            job_message = {
+                "deployment_id": deployment_id or str(project.id),
+                "project_id": str(project.id),
+                "user_id": str(project.user_id),
+                # Rollbacks are incident response: never wait behind bulk deploys
+                "priority": self.PRIORITY_HIGH,
+                "project_name": project.name,
+                "image_id": image_id,
+                "rollback": True
+            }
+            if run_config:
+                # Same environment and port as the original run; the worker
+                # falls back to the image's exposed ports without them
+                job_message["environment"] = run_config.get("environment") or {}
+                if run_config.get("port"):
+                    job_message["ports"] = {str(run_config["port"]): None}
+                job_message["config"] = run_config
+            
+            await self._send_to_sqs(job_message, queue_url=queue_url)
+            
+            subdomain = getattr(project, 'subdomain', None) or project.name.lower().replace('_', '-')
+            
+            return {
+                "project_id": str(project.id),
+                "deployment_id": deployment_id,
+                "image_id": image_id,
+                "status": "queued",
+                "url": f"https://{subdomain}.dprod.app",
+                "message": "Rollback queued successfully. Worker will process shortly.",
+                "rollback": True
+            }
+            
+        except RollbackUnavailableError:
+            raise
+        except Exception as e:
+            print(f"❌ Rollback queueing failed: {e}")
+            raise DeploymentError(f"Failed to queue rollback: {e}")
+    
+    async def _deploy_priority(self, project: Project, deployment_id: Optional[str]) -> str:
+        """Pick the queue for a deploy based on how much its owner already has in flight.
+        
+        A user's first deployments stay interactive; once they pass the bulk
+        threshold further deploys go to the low-priority queue so one tenant
+        pushing many deploys cannot starve everyone else.
+        """
+        if self.session_factory is None:
+            return self.PRIORITY_NORMAL
+        
+        async with self.session_factory() as session:
+            query = (
+                select(func.count(Deployment.id))
+                .join(Project, Deployment.project_id == Project.id)
+                .where(
+                    Project.user_id == project.user_id,
+                    Deployment.status.in_(self.IN_FLIGHT_STATUSES)
                 )
             )
-            
-            message_id = response.get('MessageId')
-            print(f"📤 Message sent to SQS: {message_id}")
+            if deployment_id:
+                query = query.where(Deployment.id != deployment_id)
+            in_flight = (await session.execute(query)).scalar_one()
+        
+        if in_flight >= self.bulk_deploy_threshold:
+            print(f"🐢 User has {in_flight} deployments in flight, queueing at low priority")
+            return self.PRIORITY_LOW
+        return self.PRIORITY_NORMAL
+    
+    async def _worker_queue(self, worker_id: str) -> Optional[str]:
+        """Queue URL of a live worker, or None if it is gone or has no queue."""
+        if self.session_factory is None:
+            return None
+        
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(WorkerCache.queue_url).where(
+                    WorkerCache.worker_id == worker_id,
+                    WorkerCache.queue_url.isnot(None),
+                    WorkerCache.updated_at >= datetime.utcnow() - timedelta(seconds=self.worker_stale_seconds)
+                )
+            )
+            return result.scalar_one_or_none()
+    
+    async def _affinity_queue(self, keys) -> Optional[str]:
+        """Find the queue of the live worker most likely to have this build's layers cached.
+        
+        Returns:
+            The worker's queue URL, or None when no worker has a cache hit
+        """
+        if self.session_factory is None or not keys:
+            return None
+        
+        try:
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    select(WorkerCache).where(
+                        WorkerCache.queue_url.isnot(None),
+                        WorkerCache.updated_at >= datetime.utcnow() - timedelta(seconds=self.worker_stale_seconds)
+                    )
+                )
+                workers = result.scalars().all()
+        except Exception as e:
+            print(f"⚠️  Cache affinity lookup failed: {e}")
+            return None
+        
+        best_score, best_worker = 0, None
+        for worker in workers:
+            score = BloomFilter(data=worker.bloom).score(keys)
+            if score > best_score:
+                best_score, best_worker = score, worker
+        
+        if best_worker is None:
+            return None
+        print(f"🎯 Routing build to worker {best_worker.worker_id} (cache score {best_score})")
+        return best_worker.queue_url
+    
+    async def _send_to_sqs(
+        self,
+        job_message: Dict[str, Any],
+        queue_url: Optional[str] = None,
+        delay_seconds: int = 0
+    ) -> None:
+        """Send deployment job to the queue backend.
+        
+        Args:
+            job_message: Job body
+            queue_url: Explicit queue (defaults to the queue matching the job's priority)
+            delay_seconds: Seconds before the message becomes visible
+        """
+        priority = job_message.get("priority", self.PRIORITY_NORMAL)
+        queue_url = queue_url or self.queue_urls.get(priority, self.sqs_queue_url)
+        try:
+            message_id = await self.job_queue.send(
+                queue_url,
+                json.dumps(job_message),
+                delay_seconds=delay_seconds,
+                attributes={
+                    'deployment_id': job_message['deployment_id'],
+                    'priority': priority,
+                    'project_name': job_message['project_name']
+                }
+            )
+            print(f"📤 Message sent to {self.queue_backend} ({priority}): {message_id}")
             
         except ClientError as e:
             error_code = e.response['Error']['Code']
             error_message = e.response['Error']['Message']
             raise DeploymentError(f"SQS error ({error_code}): {error_message}")
         except Exception as e:
-            raise DeploymentError(f"Failed to send message to SQS: {e}")
+            raise DeploymentError(f"Failed to send message to {self.queue_backend}: {e}")
     
-    async def _encode_project_files(self, build_context: Path) -> Dict[str, str]:
-        """Encode project files as base64 for SQS message."""
-        files = {}
-        
-        for file_path in build_context.rglob('*'):
-            if file_path.is_file():
-                # Get relative path
-                rel_path = file_path.relative_to(build_context)
-                
-                # Read and encode file
-                try:
-                    with open(file_path, 'rb') as f:
-                        content = f.read()
-                        encoded = base64.b64encode(content).decode('utf-8')
-                        files[str(rel_path)] = encoded
-                except Exception as e:
-                    print(f"⚠️  Failed to encode file {rel_path}: {e}")
-        
-        print(f"📦 Encoded {len(files)} files for deployment")
-        return files
-    
-    async def _extract_source_code(self, source_code: bytes, target_dir: Path) -> None:
-        """Extract compressed source code to target directory."""
+    async def _extract_source_code(self, source_path: Path, target_dir: Path) -> None:
+        """Extract a compressed source archive to target directory."""
+        def extract() -> None:
+            with tarfile.open(source_path, 'r:gz') as tar:
+                safe_extract(tar, target_dir)
+        
         try:
-            # Write compressed data to temporary file
-            with tempfile.NamedTemporaryFile(suffix='.tar.gz', delete=False) as temp_file:
-                temp_file.write(source_code)
-                temp_file_path = temp_file.name
-            
-            # Extract tar.gz file
-            with tarfile.open(temp_file_path, 'r:gz') as tar:
-                tar.extractall(target_dir)
-            
-            # Clean up temporary file
-            Path(temp_file_path).unlink()
-            
+            await asyncio.to_thread(extract)
         except Exception as e:
             raise BuildError(f"Failed to extract source code: {e}")
     
     async def get_deployment_status(self, project_id: str) -> Dict[str, Any]:
         """Get deployment status for a project.
         
-        Note: Status is now tracked in the database by workers.
-        This method queries the database instead of local state.
+        Served from the state workers write to the database; never waits
+        on a worker round trip.
         """
-        # TODO: Query database for deployment status
+        deployment = await self._get_latest_deployment(project_id)
+        if deployment is None:
+            return {"status": "not_found", "project_id": project_id}
+        
         return {
-            "status": "pending",
             "project_id": project_id,
-            "message": "Check database for deployment status"
+            "deployment_id": str(deployment.id),
+            "status": deployment.status,
+            "container_id": deployment.container_id,
+            "image_id": deployment.image_id,
+            "worker_id": deployment.worker_id,
+            "url": deployment.url,
+            "updated_at": deployment.updated_at.isoformat() if deployment.updated_at else None
         }
     
-    async def get_deployment_logs(self, project_id: str) -> str:
+    async def get_deployment_logs(self, project_id: str, tail: int = 100) -> str:
         """Get deployment logs for a project.
         
-        Note: Logs are now tracked in the database by workers.
+        Returns the last ``tail`` build events plus the most recent container log tail
+        reported by the owning worker, and asks that worker for a fresh tail
+        in the background. Refreshes are rate-limited per deployment, so
+        polling this read path inserts at most one command per
+        ``logs_refresh_interval``.
         """
-        # TODO: Query database for deployment logs
-        return "Check database for deployment logs"
+        deployment = await self._get_latest_deployment(project_id)
+        if deployment is None:
+            return f"No deployment found for project {project_id}"
+        
+        async with self.session_factory() as session:
+            events = await events_tail(session, deployment.id, limit=tail)
+        logs = format_events(events) or deployment.logs or ""
+        
+        if deployment.worker_id and deployment.container_id:
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    select(DeploymentCommand)
+                    .where(
+                        DeploymentCommand.deployment_id == deployment.id,
+                        DeploymentCommand.command == "logs"
+                    )
+                    .order_by(DeploymentCommand.created_at.desc())
+                    .limit(1)
+                )
+                last_tail = result.scalar_one_or_none()
+            
+            if last_tail and last_tail.status == CommandStatus.DONE.value and last_tail.result:
+                logs = f"{logs}\n{last_tail.result}" if logs else last_tail.result
+            
+            # Refresh unless a tail request is in flight or was made recently
+            now = datetime.utcnow()
+            refresh_after = now - timedelta(seconds=self.logs_refresh_interval)
+            key = str(deployment.id)
+            requested_at = self._logs_requested.get(key)
+            in_flight = last_tail is not None and last_tail.status in (
+                CommandStatus.PENDING.value, CommandStatus.CLAIMED.value
+            )
+            recent = (last_tail is not None and last_tail.created_at > refresh_after) or \
+                (requested_at is not None and requested_at > refresh_after)
+            if not in_flight and not recent:
+                # Claimed before awaiting so concurrent readers don't all send one
+                self._logs_requested[key] = now
+                for stale in [k for k, at in self._logs_requested.items() if at <= refresh_after]:
+                    del self._logs_requested[stale]
+                await self._send_command(deployment, "logs", {"tail": tail})
+        
+        return logs or "No logs available yet"
     
     async def stop_deployment(self, project_id: str) -> bool:
         """Stop a deployment.
         
-        Note: Stopping deployments requires communicating with workers.
-        This would need a separate queue or database flag.
+        Queues a stop command for the worker owning the container. Returns
+        True once the command is accepted; the worker marks the deployment
+        stopped when it has been carried out.
         """
-        # TODO: Implement deployment stop via worker communication
-        print(f"⚠️  Stop deployment not yet implemented for SQS-based deployments")
-        return False
+        return await self._command_live_deployment(project_id, "stop")
+    
+    async def restart_deployment(self, project_id: str) -> bool:
+        """Restart a deployment's container on its owning worker."""
+        return await self._command_live_deployment(project_id, "restart")
     
     async def list_deployments(self) -> Dict[str, Dict[str, Any]]:
-        """List all active deployments.
+        """List all active deployments."""
+        if self.session_factory is None:
+            return {}
         
-        Note: Deployments are now tracked in the database.
-        """
-        # TODO: Query database for all deployments
-        return {}
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Deployment)
+                .where(Deployment.status.in_(self.LIVE_STATUSES))
+                .order_by(Deployment.created_at)
+            )
+            deployments = result.scalars().all()
+        
+        return {
+            str(deployment.project_id): {
+                "project_id": str(deployment.project_id),
+                "deployment_id": str(deployment.id),
+                "status": deployment.status,
+                "container_id": deployment.container_id,
+                "worker_id": deployment.worker_id,
+                "url": deployment.url
+            }
+            for deployment in deployments
+        }
     
     async def health_check(self, project_id: str) -> bool:
         """Perform health check on a deployment.
         
-        Note: Health status is now tracked in the database by workers.
+        Note: Health status is tracked in the database by workers.
+        """
+        deployment = await self._get_latest_deployment(project_id)
+        return deployment is not None and deployment.status in self.LIVE_STATUSES
+    
+    async def _get_latest_deployment(self, project_id: str) -> Optional[Deployment]:
+        """Get the most recent deployment row for a project."""
+        if self.session_factory is None:
+            return None
+        
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Deployment)
+                .where(Deployment.project_id == project_id)
+                .order_by(Deployment.created_at.desc())
+                .limit(1)
+            )
+            return result.scalar_one_or_none()
+    
+    async def _command_live_deployment(self, project_id: str, command: str) -> bool:
+        """Send a control command for a project's live deployment.
+        
+        The target is the newest live row with an owning worker, not the
+        newest row: a build queued or failing after it must not hide it.
         """
-        # TODO: Query database for deployment health
-        return False
+        if self.session_factory is None:
+            return False
+        
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(Deployment)
+                .where(
+                    Deployment.project_id == project_id,
+                    Deployment.status.in_(self.LIVE_STATUSES),
+                    Deployment.worker_id.isnot(None)
+                )
+                .order_by(Deployment.created_at.desc())
+                .limit(1)
+            )
+            deployment = result.scalar_one_or_none()
+        
+        if deployment is None:
+            return False
+        
+        if not deployment.container_id:
+            print(f"⚠️  Deployment {deployment.id} has no container, cannot {command}")
+            return False
+        
+        await self._send_command(deployment, command)
+        return True
+    
+    async def _send_command(
+        self,
+        deployment: Deployment,
+        command: str,
+        payload: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Insert a command for the worker that owns the deployment."""
+        async with self.session_factory() as session:
+            session.add(DeploymentCommand(
+                deployment_id=deployment.id,
+                worker_id=deployment.worker_id,
+                command=command,
+                payload=payload or {}
+            ))
+            await session.commit()
+        
+        print(f"📨 Sent {command} command to worker {deployment.worker_id}")
@@ -0,0 +1,325 @@
+"""Background container stats sampler with in-memory time-series buffers."""
+
+import math
+import threading
+import time
+from array import array
+from typing import Dict, Any, Optional, List, Tuple
+
+import docker
+
+# One sample per second from the Docker stats stream -> 10 minutes of history
+DEFAULT_BUFFER_SIZE = 600
+DEFAULT_DISCOVERY_INTERVAL = 30  # seconds
+
+
+class RingBuffer:
+    """Fixed-size ring buffer of floats backed by a contiguous array."""
+
+    def __init__(self, capacity: int = DEFAULT_BUFFER_SIZE):
+        """Initialize ring buffer.
+
+        Args:
+            capacity: Maximum number of samples retained
+        """
+        self.capacity = capacity
+        self._data = array('d', [0.0] * capacity)
+        self._head = 0  # Next write position
+        self._count = 0
+        self._writes = 0
+        # (writes, size, sorted window): sorted at most once per sample
+        self._sorted: Optional[Tuple[int, Optional[int], List[float]]] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, value: float) -> None:
+        """Append a sample, overwriting the oldest one when full."""
+        self._data[self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        self._writes += 1
+
+    def latest(self) -> Optional[float]:
+        """Return the most recent sample."""
+        if not self._count:
+            return None
+        return self._data[(self._head - 1) % self.capacity]
+
+    def window(self, size: Optional[int] = None) -> List[float]:
+        """Return the most recent samples in chronological order.
+
+        Args:
+            size: Number of samples (defaults to everything retained)
+        """
+        size = self._count if size is None else min(size, self._count)
+        start = (self._head - size) % self.capacity
+        if start + size <= self.capacity:
+            return self._data[start:start + size].tolist()
+        return (self._data[start:] + self._data[:self._head]).tolist()
+
+    def percentile(self, pct: float, size: Optional[int] = None) -> Optional[float]:
+        """Return a percentile (nearest-rank) over the most recent samples.
+
+        The sorted window is cached until the next sample, so repeated reads
+        between samples don't re-sort.
+        """
+        cached = self._sorted
+        if cached is not None and cached[0] == self._writes and cached[1] == size:
+            values = cached[2]
+        else:
+            values = sorted(self.window(size))
+            self._sorted = (self._writes, size, values)
+        if not values:
+            return None
+        rank = max(0, min(len(values) - 1, math.ceil(pct / 100.0 * len(values)) - 1))
+        return values[rank]
+
+
+class ContainerSeries:
+    """Time series of resource samples for a single container."""
+
+    METRICS = (
+        "cpu_percent",
+        "memory_bytes",
+        "memory_percent",
+        "network_rx_bytes",
+        "network_tx_bytes",
+        "block_read_bytes",
+        "block_write_bytes",
+    )
+
+    def __init__(self, container_id: str, capacity: int = DEFAULT_BUFFER_SIZE):
+        self.container_id = container_id
+        self.timestamps = RingBuffer(capacity)
+        self.buffers = {name: RingBuffer(capacity) for name in self.METRICS}
+        self.memory_limit_bytes = 0.0
+        self.cpu_count = 0
+        self._lock = threading.Lock()
+
+    def add(self, sample: Dict[str, float]) -> None:
+        """Record one parsed stats sample."""
+        with self._lock:
+            self.timestamps.append(time.time())
+            for name, buffer in self.buffers.items():
+                buffer.append(sample.get(name, 0.0))
+            self.memory_limit_bytes = sample.get("memory_limit_bytes", self.memory_limit_bytes)
+            self.cpu_count = int(sample.get("cpu_count", self.cpu_count))
+
+    def summary(self, window: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Summarize the most recent samples.
+
+        Args:
+            window: Number of recent samples to aggregate (defaults to all)
+
+        Returns:
+            Summary dict, or None if nothing has been sampled yet (or the window is empty)
+        """
+        with self._lock:
+            if not len(self.timestamps) or (window is not None and window < 1):
+                return None
+
+            def describe(name: str) -> Dict[str, float]:
+                buffer = self.buffers[name]
+                values = buffer.window(window)
+                return {
+                    "latest": buffer.latest(),
+                    "avg": sum(values) / len(values),
+                    "p50": buffer.percentile(50, window),
+                    "p95": buffer.percentile(95, window),
+                    "max": max(values),
+                }
+
+            timestamps = self.timestamps.window(window)
+            return {
+                "container_id": self.container_id,
+                "samples": len(timestamps),
+                "window_seconds": round(timestamps[-1] - timestamps[0], 1),
+                "cpu_count": self.cpu_count,
+                "cpu_percent": describe("cpu_percent"),
+                "memory_bytes": describe("memory_bytes"),
+                "memory_percent": describe("memory_percent"),
+                "memory_limit_bytes": self.memory_limit_bytes,
+                "network_rx_bytes": self.buffers["network_rx_bytes"].latest(),
+                "network_tx_bytes": self.buffers["network_tx_bytes"].latest(),
+                "block_read_bytes": self.buffers["block_read_bytes"].latest(),
+                "block_write_bytes": self.buffers["block_write_bytes"].latest(),
+            }
+
+
+def parse_stats(stats: Dict[str, Any]) -> Dict[str, float]:
+    """Convert a raw Docker stats payload into flat numeric metrics."""
+    cpu_stats = stats.get('cpu_stats', {})
+    precpu_stats = stats.get('precpu_stats', {})
+    cpu_delta = cpu_stats.get('cpu_usage', {}).get('total_usage', 0) - \
+        precpu_stats.get('cpu_usage', {}).get('total_usage', 0)
+    system_delta = cpu_stats.get('system_cpu_usage', 0) - \
+        precpu_stats.get('system_cpu_usage', 0)
+    cpu_count = cpu_stats.get('online_cpus') or \
+        len(cpu_stats.get('cpu_usage', {}).get('percpu_usage') or []) or 1
+    cpu_percent = (cpu_delta / system_delta) * cpu_count * 100.0 if system_delta > 0 else 0.0
+
+    memory_stats = stats.get('memory_stats', {})
+    memory_usage = memory_stats.get('usage', 0)
+    memory_limit = memory_stats.get('limit', 0)
+    memory_percent = (memory_usage / memory_limit) * 100.0 if memory_limit > 0 else 0.0
+
+    networks = stats.get('networks') or {}
+    block_stats = (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []
+
+    return {
+        "cpu_percent": cpu_percent,
+        "cpu_count": cpu_count,
+        "memory_bytes": float(memory_usage),
+        "memory_limit_bytes": float(memory_limit),
+        "memory_percent": memory_percent,
+        "network_rx_bytes": float(sum(net.get('rx_bytes', 0) for net in networks.values())),
+        "network_tx_bytes": float(sum(net.get('tx_bytes', 0) for net in networks.values())),
+        "block_read_bytes": float(sum(item['value'] for item in block_stats if item.get('op') == 'Read')),
+        "block_write_bytes": float(sum(item['value'] for item in block_stats if item.get('op') == 'Write')),
+    }
+
+
+class ContainerStatsSampler:
+    """Keeps one streaming stats connection per dprod-labelled container.
+
+    Readers (AI tools, rightsizing, API) get samples from memory instead of
+    paying the ~2s cost of ``container.stats(stream=False)`` per call.
+    """
+
+    def __init__(
+        self,
+        client: docker.DockerClient,
+        capacity: int = DEFAULT_BUFFER_SIZE,
+        discovery_interval: int = DEFAULT_DISCOVERY_INTERVAL
+    ):
+        """Initialize stats sampler.
+
+        Args:
+            client: Docker client shared with the caller
+            capacity: Samples retained per container
+            discovery_interval: Seconds between container discovery passes
+        """
+        self.client = client
+        self.capacity = capacity
+        self.discovery_interval = discovery_interval
+        self._series: Dict[str, ContainerSeries] = {}
+        self._streams: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._discovery_thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the background discovery loop."""
+        if self._discovery_thread and self._discovery_thread.is_alive():
+            return
+        self._stop.clear()
+        self._discovery_thread = threading.Thread(
+            target=self._discover_loop,
+            name="dprod-stats-discovery",
+            daemon=True
+        )
+        self._discovery_thread.start()
+        print("📈 Container stats sampler started")
+
+    def stop(self) -> None:
+        """Stop sampling. Stream threads exit after their next sample."""
+        self._stop.set()
+
+    def track(self, container_id: str) -> None:
+        """Start streaming stats for a container if not already tracked."""
+        with self._lock:
+            stream = self._streams.get(container_id)
+            if stream and stream.is_alive():
+                return
+            self._series.setdefault(container_id, ContainerSeries(container_id, self.capacity))
+            stream = threading.Thread(
+                target=self._stream_stats,
+                args=(container_id,),
+                name=f"dprod-stats-{container_id[:12]}",
+                daemon=True
+            )
+            self._streams[container_id] = stream
+        stream.start()
+
+    def get_series(self, container_id: str) -> Optional[ContainerSeries]:
+        """Return the sampled series for a container."""
+        with self._lock:
+            series = self._series.get(container_id)
+            if series is None:
+                # Allow lookups by short ID
+                for full_id, candidate in self._series.items():
+                    if full_id.startswith(container_id):
+                        series = candidate
+                        break
+        return series
+
+    def summary(self, container_id: str, window: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Return aggregated usage for a container, or None if not sampled yet."""
+        series = self.get_series(container_id)
+        return series.summary(window) if series else None
+
+    def _discover_loop(self) -> None:
+        """Track new dprod containers and forget the ones that are gone."""
+        while not self._stop.is_set():
+            try:
+                containers = self.client.containers.list(filters={"label": "dprod=true"})
+                running = {container.id for container in containers}
+                for container_id in running:
+                    self.track(container_id)
+                with self._lock:
+                    for container_id in list(self._series):
+                        stream = self._streams.get(container_id)
+                        if container_id not in running and not (stream and stream.is_alive()):
+                            self._series.pop(container_id, None)
+                            self._streams.pop(container_id, None)
+            except Exception as e:
+                print(f"⚠️  Stats discovery failed: {e}")
+            self._stop.wait(self.discovery_interval)
+
+    def _stream_stats(self, container_id: str) -> None:
+        """Consume the Docker stats stream for one container."""
+        with self._lock:
+            series = self._series.get(container_id)
+        if series is None:
+            return  # Forgotten by discovery before the thread started
+        try:
+            container = self.client.containers.get(container_id)
+            for stats in container.stats(stream=True, decode=True):
+                if self._stop.is_set():
+                    break
+                series.add(parse_stats(stats))
+        except docker.errors.NotFound:
+            pass
+        except Exception as e:
+            print(f"⚠️  Stats stream for {container_id[:12]} ended: {e}")
+
+
+_sampler: Optional[ContainerStatsSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_stats_sampler(client: Optional[docker.DockerClient] = None) -> ContainerStatsSampler:
+    """Return the per-host stats sampler, creating and starting it on first use.
+
+    Args:
+        client: Docker client to use if the sampler does not exist yet
+    """
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            if client is None:
+                client = docker.DockerClient(base_url='unix://var/run/docker.sock')
+            _sampler = ContainerStatsSampler(client)
+            _sampler.start()
+        return _sampler
+
+
+def stop_stats_sampler() -> None:
+    """Stop the per-host stats sampler if it was started."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is not None:
+            _sampler.stop()
+            _sampler = None
@@ -0,0 +1,224 @@
+"""Content-addressed blob store for deployment source archives (claim-check)."""
+
+import hashlib
+import io
+import os
+import posixpath
+import shutil
+import tarfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+DEFAULT_ARTIFACT_STORE_URL = "file:///tmp/dprod/artifacts"
+
+
+def file_sha256(path: Path) -> str:
+    """Hash a file in chunks without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UnsafeArchiveError(ValueError):
+    """A source archive member would be written outside the target directory."""
+
+
+def _safe_members(tar: tarfile.TarFile) -> Iterator[tarfile.TarInfo]:
+    """Yield regular files and directories; reject anything that could escape."""
+    for member in tar:
+        name = member.name
+        parts = posixpath.normpath(name).split("/")
+        if name.startswith(("/", "\\")) or ".." in parts or (len(name) > 1 and name[1] == ":"):
+            raise UnsafeArchiveError(f"Archive member escapes the target directory: {name}")
+        if not (member.isfile() or member.isdir()):
+            raise UnsafeArchiveError(f"Archive member is not a regular file or directory: {name}")
+        yield member
+
+
+def safe_extract(tar: tarfile.TarFile, target_dir) -> None:
+    """Extract an untrusted archive (also works on streamed ``r|`` archives).
+
+    Members are validated before anything is written: absolute paths,
+    ``..`` components, links and device files raise UnsafeArchiveError.
+    The ``data`` filter is applied as well where tarfile supports it.
+    """
+    if hasattr(tarfile, "data_filter"):
+        tar.extractall(target_dir, members=_safe_members(tar), filter="data")
+    else:
+        tar.extractall(target_dir, members=_safe_members(tar))
+
+
+class HashingReader(io.RawIOBase):
+    """File-like wrapper that hashes everything read through it."""
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self._digest = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        self._digest.update(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+    def hexdigest(self) -> str:
+        """Hash of everything read so far (drains the remaining stream first)."""
+        for chunk in iter(lambda: self._stream.read(CHUNK_SIZE), b''):
+            self._digest.update(chunk)
+        return self._digest.hexdigest()
+
+    def close(self) -> None:
+        self._stream.close()
+        super().close()
+
+
+class ArtifactStore(ABC):
+    """Stores source archives once and hands out a URI to enqueue instead."""
+
+    @abstractmethod
+    def put_file(self, path: Path, digest: Optional[str] = None) -> Tuple[str, str]:
+        """Store a file.
+
+        Args:
+            path: Path of the archive to store
+            digest: SHA-256 of the file if the caller already hashed it
+
+        Returns:
+            Tuple of (sha256 hex digest, artifact URI)
+        """
+        pass
+
+    @abstractmethod
+    def put_bytes(self, data: bytes) -> Tuple[str, str]:
+        """Store an in-memory archive."""
+        pass
+
+    @abstractmethod
+    def open(self, uri: str) -> BinaryIO:
+        """Open an artifact for streaming reads."""
+        pass
+
+    @abstractmethod
+    def delete(self, uri: str) -> None:
+        """Delete an artifact."""
+        pass
+
+
+class LocalArtifactStore(ArtifactStore):
+    """Filesystem-backed store for development and tests."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def put_file(self, path: Path, digest: Optional[str] = None) -> Tuple[str, str]:
+        digest = digest or file_sha256(path)
+        target = self.root / f"{digest}.tar.gz"
+        if not target.exists():
+            tmp = target.with_suffix(".partial")
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, target)
+        return digest, f"file://{target}"
+
+    def put_bytes(self, data: bytes) -> Tuple[str, str]:
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.root / f"{digest}.tar.gz"
+        if not target.exists():
+            tmp = target.with_suffix(".partial")
+            tmp.write_bytes(data)
+            os.replace(tmp, target)
+        return digest, f"file://{target}"
+
+    def open(self, uri: str) -> BinaryIO:
+        return open(urlparse(uri).path, 'rb')
+
+    def delete(self, uri: str) -> None:
+        Path(urlparse(uri).path).unlink(missing_ok=True)
+
+
+class S3ArtifactStore(ArtifactStore):
+    """S3 (or MinIO-compatible) store for production."""
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        region: Optional[str] = None,
+        endpoint_url: Optional[str] = None
+    ):
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.s3 = boto3.client('s3', region_name=region, endpoint_url=endpoint_url)
+
+    def _key(self, digest: str) -> str:
+        name = f"{digest}.tar.gz"
+        return f"{self.prefix}/{name}" if self.prefix else name
+
+    def _exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.s3.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    def put_file(self, path: Path, digest: Optional[str] = None) -> Tuple[str, str]:
+        digest = digest or file_sha256(path)
+        key = self._key(digest)
+        # Content-addressed: identical sources are uploaded once
+        if not self._exists(key):
+            self.s3.upload_file(str(path), self.bucket, key)
+        return digest, f"s3://{self.bucket}/{key}"
+
+    def put_bytes(self, data: bytes) -> Tuple[str, str]:
+        digest = hashlib.sha256(data).hexdigest()
+        key = self._key(digest)
+        if not self._exists(key):
+            self.s3.upload_fileobj(io.BytesIO(data), self.bucket, key)
+        return digest, f"s3://{self.bucket}/{key}"
+
+    def open(self, uri: str) -> BinaryIO:
+        parsed = urlparse(uri)
+        response = self.s3.get_object(Bucket=parsed.netloc, Key=parsed.path.lstrip("/"))
+        return response['Body']
+
+    def delete(self, uri: str) -> None:
+        parsed = urlparse(uri)
+        self.s3.delete_object(Bucket=parsed.netloc, Key=parsed.path.lstrip("/"))
+
+
+def get_artifact_store(url: Optional[str] = None) -> ArtifactStore:
+    """Create an artifact store from a URL.
+
+    Supported forms:
+    - ``s3://bucket/prefix`` (set ``ARTIFACT_STORE_ENDPOINT`` for MinIO)
+    - ``file:///path/to/dir``
+
+    Args:
+        url: Store URL (defaults to the ARTIFACT_STORE_URL environment variable)
+    """
+    url = url or os.getenv("ARTIFACT_STORE_URL", DEFAULT_ARTIFACT_STORE_URL)
+    parsed = urlparse(url)
+
+    if parsed.scheme == "s3":
+        return S3ArtifactStore(
+            bucket=parsed.netloc,
+            prefix=parsed.path,
+            region=os.getenv("AWS_REGION", "us-east-1"),
+            endpoint_url=os.getenv("ARTIFACT_STORE_ENDPOINT") or None
+        )
+    if parsed.scheme == "file":
+        return LocalArtifactStore(parsed.path)
+
+    raise ValueError(f"Unsupported artifact store URL: {url}")
@@ -0,0 +1,116 @@
+"""Build-cache summaries used to route builds to workers with warm layer caches."""
+
+import hashlib
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+# Files whose content decides the dependency-install layers
+DEPENDENCY_MANIFESTS = (
+    "package-lock.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "package.json",
+    "requirements.txt",
+    "poetry.lock",
+    "Pipfile.lock",
+    "go.sum",
+)
+
+# A shared dependency layer saves far more build time than a shared base image
+CACHE_KEY_WEIGHTS = {"deps": 3, "base": 1}
+
+_FROM_RE = re.compile(r"^\s*FROM\s+(?:--\S+\s+)*(\S+)(?:\s+AS\s+(\S+))?", re.IGNORECASE | re.MULTILINE)
+
+
+def normalize_image_ref(ref: str) -> str:
+    """Normalize an image reference so Dockerfile FROM lines match local tags."""
+    if "@" in ref:
+        return ref
+    name = ref.rsplit("/", 1)[-1]
+    return ref if ":" in name else f"{ref}:latest"
+
+
+def base_image_keys(dockerfile_content: Optional[str]) -> List[str]:
+    """Cache keys for the external base images a Dockerfile builds on."""
+    if not dockerfile_content:
+        return []
+    keys = []
+    stages = set()
+    for match in _FROM_RE.finditer(dockerfile_content):
+        image, alias = match.group(1), match.group(2)
+        if image.lower() != "scratch" and image.lower() not in stages:
+            keys.append(f"base:{normalize_image_ref(image)}")
+        if alias:
+            stages.add(alias.lower())
+    return keys
+
+
+def dependency_keys(build_context: Path) -> List[str]:
+    """Cache keys for the dependency manifests present in a build context."""
+    keys = []
+    for name in DEPENDENCY_MANIFESTS:
+        path = build_context / name
+        if path.is_file():
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+            keys.append(f"deps:{name}:{digest}")
+    return keys
+
+
+def cache_keys(build_context: Path, dockerfile_content: Optional[str]) -> List[str]:
+    """All cache keys a build of this context would benefit from."""
+    return base_image_keys(dockerfile_content) + dependency_keys(build_context)
+
+
+def key_weight(key: str) -> int:
+    """Expected benefit of a cache hit on a key."""
+    return CACHE_KEY_WEIGHTS.get(key.split(":", 1)[0], 1)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over cache keys.
+
+    Workers publish one of these instead of their full image list: 1KB
+    holds a few hundred keys at a ~2% false-positive rate, and a false
+    positive only costs a cold build on the chosen worker.
+    """
+
+    def __init__(self, size_bits: int = 8192, hash_count: int = 5, data: Optional[bytes] = None):
+        """
+        Args:
+            size_bits: Number of bits in the filter
+            hash_count: Number of bit positions per key
+            data: Serialized bits from to_bytes()
+        """
+        self.size_bits = size_bits
+        self.hash_count = hash_count
+        self.bits = bytearray(data) if data is not None else bytearray((size_bits + 7) // 8)
+
+    @classmethod
+    def from_keys(cls, keys: Iterable[str], **kwargs) -> "BloomFilter":
+        """Build a filter containing the given keys."""
+        bloom = cls(**kwargs)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return ((h1 + i * h2) % self.size_bits for i in range(self.hash_count))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self._positions(key))
+
+    def score(self, keys: Iterable[str]) -> int:
+        """Weighted number of keys (probably) present in the filter."""
+        return sum(key_weight(key) for key in keys if key in self)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.bits)
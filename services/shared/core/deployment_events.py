@@ -0,0 +1,145 @@
+"""Append-only deployment event log (build and deploy output).
+
+Events live in ``deployment_events``, range-partitioned by month on
+``created_at``. Each deployment hands out its own gap-free sequence
+numbers from ``deployments.log_seq``, so readers page with a keyset on
+``(deployment_id, seq)`` instead of offsets, and appending a line costs
+the same no matter how long the log already is.
+"""
+from datetime import date, datetime
+from typing import List, Optional, Sequence
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import DeploymentEvent
+
+EVENT_LEVELS = ("debug", "info", "warning", "error")
+
+# Upper bound for a single page of events
+MAX_EVENTS_PAGE = 1000
+
+
+def _month_start(day: date, offset: int = 0) -> date:
+    """First day of the month ``offset`` months after ``day``'s month."""
+    month_index = day.year * 12 + (day.month - 1) + offset
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the monthly partition holding ``month``."""
+    return f"deployment_events_{month.year:04d}_{month.month:02d}"
+
+
+DEFAULT_PARTITION = "deployment_events_default"
+
+
+def partition_ddl(month: date) -> List[str]:
+    """Statements creating the monthly partition starting at ``month``.
+
+    ``CREATE TABLE ... PARTITION OF`` fails once the default partition
+    holds rows in the new range (written while the month was missing), so
+    the partition is built standalone, those rows are moved into it, and it
+    is attached. The default partition is locked first so no row can land
+    there between the move and the attach.
+    """
+    start = _month_start(month)
+    end = _month_start(month, 1)
+    name = partition_name(start)
+    in_range = f"created_at >= '{start.isoformat()}' AND created_at < '{end.isoformat()}'"
+    return [
+        f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE",
+        f"CREATE TABLE {name} (LIKE deployment_events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        f"ALTER TABLE deployment_events ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')",
+    ]
+
+
+async def ensure_event_partitions(
+    session: AsyncSession,
+    months_ahead: int = 2,
+    today: Optional[date] = None
+) -> List[str]:
+    """Create the current and upcoming monthly partitions if missing.
+
+    Rows outside every monthly range land in the default partition, so a
+    missed run only costs pruning, not writes; they are moved out when
+    their month is created. Each month is created in its own transaction,
+    so one failure doesn't undo or block the others.
+
+    Args:
+        session: Database session (committed by this call)
+        months_ahead: Number of future months to prepare
+        today: Reference day (defaults to the current UTC date)
+
+    Returns:
+        Names of the partitions that now exist for the window
+
+    Raises:
+        Exception: The first failure, once every month has been tried
+    """
+    today = today or datetime.utcnow().date()
+    names = []
+    error: Optional[Exception] = None
+    for offset in range(months_ahead + 1):
+        month = _month_start(today, offset)
+        name = partition_name(month)
+        exists = await session.scalar(select(func.to_regclass(name)))
+        await session.commit()
+        if exists is None:
+            try:
+                for statement in partition_ddl(month):
+                    await session.execute(text(statement))
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                error = error or e
+                continue
+        names.append(name)
+    if error is not None:
+        raise error
+    return names
+
+
+async def events_after(
+    session: AsyncSession,
+    deployment_id,
+    after_seq: int = 0,
+    limit: int = 100
+) -> Sequence[DeploymentEvent]:
+    """Events with ``seq > after_seq``, oldest first (keyset page)."""
+    result = await session.execute(
+        select(DeploymentEvent)
+        .where(
+            DeploymentEvent.deployment_id == deployment_id,
+            DeploymentEvent.seq > after_seq
+        )
+        .order_by(DeploymentEvent.seq)
+        .limit(min(limit, MAX_EVENTS_PAGE))
+    )
+    return result.scalars().all()
+
+
+async def events_tail(
+    session: AsyncSession,
+    deployment_id,
+    limit: int = 100
+) -> Sequence[DeploymentEvent]:
+    """Last ``limit`` events, oldest first."""
+    result = await session.execute(
+        select(DeploymentEvent)
+        .where(DeploymentEvent.deployment_id == deployment_id)
+        .order_by(DeploymentEvent.seq.desc())
+        .limit(min(limit, MAX_EVENTS_PAGE))
+    )
+    return list(reversed(result.scalars().all()))
+
+
+def format_events(events: Sequence[DeploymentEvent]) -> str:
+    """Render events as plain log text."""
+    return "".join(
+        f"{event.created_at.isoformat(timespec='seconds')} [{event.worker_id}] {event.message}\n"
+        for event in events
+    )
@@ -0,0 +1,216 @@
+"""Garbage collection for dprod images and containers."""
+
+import asyncio
+import logging
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Containers in these states still reference their image
+LIVE_CONTAINER_STATES = {"created", "running", "restarting", "paused"}
+
+
+def _parse_docker_time(value: Optional[str]) -> float:
+    """Parse a Docker RFC3339 timestamp into a POSIX timestamp (0 if unset)."""
+    if not value or value.startswith("0001-01-01"):
+        return 0.0
+    # Docker reports nanoseconds; datetime only understands microseconds
+    value = value.rstrip("Z")
+    if "." in value:
+        head, fraction = value.split(".", 1)
+        fraction = "".join(ch for ch in fraction if ch.isdigit())[:6]
+        value = f"{head}.{fraction}"
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class DockerGarbageCollector:
+    """Prune dprod images and exited containers on a Docker host.
+
+    Retention policy:
+    - the last ``keep_last`` images of every project are kept for instant rollback
+    - images referenced by a live container are never removed
+    - remaining images are evicted least-recently-used first, but only while
+      disk usage is above ``high_water_mark`` (down to ``low_water_mark``)
+    - exited ``dprod=true`` containers are removed once older than ``container_ttl``
+
+    Disk usage is measured on the daemon side: the images, containers,
+    volumes and build cache reported by ``docker system df`` against
+    ``disk_budget_gb``. Alternatively ``disk_path`` names the daemon's data
+    directory as mounted into this container (``GC_DOCKER_ROOT``), and the
+    real filesystem usage of that mount is used instead.
+    """
+
+    def __init__(
+        self,
+        client,
+        keep_last: int = int(os.getenv("GC_KEEP_IMAGES", "3")),
+        high_water_mark: float = float(os.getenv("GC_DISK_HIGH_WATER", "0.85")),
+        low_water_mark: float = float(os.getenv("GC_DISK_LOW_WATER", "0.75")),
+        container_ttl: int = int(os.getenv("GC_CONTAINER_TTL", "3600")),
+        interval: int = int(os.getenv("GC_INTERVAL", "600")),
+        disk_budget_gb: float = float(os.getenv("GC_DISK_BUDGET_GB", "20")),
+        disk_path: Optional[str] = os.getenv("GC_DOCKER_ROOT")
+    ):
+        """Initialize garbage collector.
+
+        Args:
+            client: Docker client (shared with DockerManager / DockerExecutor)
+            keep_last: Images retained per project regardless of disk usage
+            high_water_mark: Disk usage ratio that triggers image eviction
+            low_water_mark: Disk usage ratio eviction stops at
+            container_ttl: Seconds an exited container is kept around
+            interval: Seconds between collection passes
+            disk_budget_gb: Docker disk usage counted as 100% (daemon-side mode)
+            disk_path: Mounted Docker data directory to measure instead
+
+        Raises:
+            ValueError: If ``disk_path`` is set but not mounted here
+        """
+        self.client = client
+        self.keep_last = keep_last
+        self.high_water_mark = high_water_mark
+        self.low_water_mark = low_water_mark
+        self.container_ttl = container_ttl
+        self.interval = interval
+        self.disk_budget = disk_budget_gb * 1024 ** 3
+        self.disk_path = disk_path
+        if disk_path and not os.path.isdir(disk_path):
+            raise ValueError(
+                f"GC_DOCKER_ROOT={disk_path} is not mounted in this container; "
+                "mount the Docker data directory or unset it to use daemon-side usage"
+            )
+        if not disk_path and self.disk_budget <= 0:
+            raise ValueError("GC_DISK_BUDGET_GB must be positive")
+
+    async def run_forever(self) -> None:
+        """Run collection passes until cancelled."""
+        while True:
+            try:
+                await asyncio.to_thread(self.collect)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Docker GC pass failed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def collect(self) -> Dict[str, Any]:
+        """Run one collection pass.
+
+        Returns:
+            Summary of removed containers and images
+        """
+        now = datetime.now(timezone.utc).timestamp()
+        containers = self.client.containers.list(all=True, filters={"label": "dprod=true"})
+
+        removed_containers = self._remove_expired_containers(containers, now)
+
+        live_images: Set[str] = set()
+        last_used: Dict[str, float] = {}
+        for container in containers:
+            if container.id in removed_containers:
+                continue
+            image_id = container.attrs.get("Image")
+            if not image_id:
+                continue
+            if container.status in LIVE_CONTAINER_STATES:
+                live_images.add(image_id)
+            used_at = max(
+                _parse_docker_time(container.attrs.get("Created")),
+                _parse_docker_time(container.attrs.get("State", {}).get("FinishedAt"))
+            )
+            last_used[image_id] = max(last_used.get(image_id, 0.0), used_at)
+
+        removed_images = self._evict_images(live_images, last_used)
+
+        if removed_containers or removed_images:
+            logger.info(
+                f"🧹 Docker GC removed {len(removed_containers)} container(s), "
+                f"{len(removed_images)} image(s)"
+            )
+        return {"containers": removed_containers, "images": removed_images}
+
+    def _remove_expired_containers(self, containers: List[Any], now: float) -> List[str]:
+        """Remove exited/dead containers whose TTL has elapsed."""
+        removed = []
+        for container in containers:
+            if container.status not in ("exited", "dead"):
+                continue
+            finished_at = _parse_docker_time(container.attrs.get("State", {}).get("FinishedAt"))
+            if finished_at and now - finished_at < self.container_ttl:
+                continue
+            try:
+                container.remove(force=True)
+                removed.append(container.id)
+            except Exception as e:
+                logger.warning(f"⚠️  Failed to remove container {container.name}: {e}")
+        return removed
+
+    def _evict_images(self, live_images: Set[str], last_used: Dict[str, float]) -> List[str]:
+        """Evict unprotected images LRU-first while above the high-water mark."""
+        images = self.client.images.list(filters={"label": "dprod=true"})
+
+        # Group by project, newest first, and protect the last K per project
+        by_project: Dict[str, List[Any]] = {}
+        for image in images:
+            labels = image.labels or {}
+            project = labels.get("project_id") or labels.get("project") or image.id
+            by_project.setdefault(project, []).append(image)
+
+        protected = set(live_images)
+        candidates = []
+        for project_images in by_project.values():
+            project_images.sort(
+                key=lambda image: _parse_docker_time(image.attrs.get("Created")),
+                reverse=True
+            )
+            protected.update(image.id for image in project_images[:self.keep_last])
+            candidates.extend(project_images[self.keep_last:])
+
+        candidates = [image for image in candidates if image.id not in protected]
+        if not candidates:
+            return []
+        usage = self._disk_usage()
+        if usage < self.high_water_mark:
+            return []
+
+        candidates.sort(key=lambda image: last_used.get(
+            image.id, _parse_docker_time(image.attrs.get("Created"))
+        ))
+
+        removed = []
+        for image in candidates:
+            if usage < self.low_water_mark:
+                break
+            try:
+                self.client.images.remove(image.id, force=False, noprune=False)
+                removed.append(image.id)
+                if self.disk_path:
+                    usage = self._disk_usage()
+                else:
+                    # df is expensive; estimate until the next pass re-measures
+                    usage -= (image.attrs.get("Size") or 0) / self.disk_budget
+            except Exception as e:
+                logger.warning(f"⚠️  Failed to remove image {image.id[:19]}: {e}")
+        return removed
+
+    def _disk_usage(self) -> float:
+        """Return the used ratio of Docker's disk (mounted data dir or budget)."""
+        if self.disk_path:
+            usage = shutil.disk_usage(self.disk_path)
+            return usage.used / usage.total if usage.total else 0.0
+
+        df = self.client.df()
+        used = df.get("LayersSize") or 0
+        used += sum(c.get("SizeRw") or 0 for c in df.get("Containers") or [])
+        used += sum(
+            max(0, (v.get("UsageData") or {}).get("Size") or 0)
+            for v in df.get("Volumes") or []
+        )
+        used += sum(b.get("Size") or 0 for b in df.get("BuildCache") or [])
+        return used / self.disk_budget
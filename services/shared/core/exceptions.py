@@ -44,3 +44,8 @@ class NotFoundError(DprodException):
 class DeploymentError(DprodException):
     """Deployment process error."""
     pass
+
+
+class RollbackUnavailableError(DeploymentError):
+    """The image to roll back to cannot be reached (its worker is gone)."""
+    pass
@@ -0,0 +1,513 @@
+"""Pluggable job queue backends with SQS receive/ack/visibility semantics.
+
+Every backend delivers messages at least once: a received message stays
+hidden for its visibility timeout and reappears unless it is acknowledged
+first. Queues are addressed by the same strings the SQS configuration
+uses (``SQS_QUEUE_URL`` etc.); for the Redis and in-memory backends those
+strings are simply queue names.
+
+Select a backend with ``QUEUE_BACKEND``:
+- ``sqs`` (default): Amazon SQS, ``SQS_ENDPOINT_URL`` for a local stand-in
+- ``redis``: Redis Streams at ``REDIS_URL`` (one consumer group per stream)
+- ``memory``: process-local, for tests and single-process benchmarks
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+DEFAULT_VISIBILITY_TIMEOUT = 900
+# SQS limits, enforced by every backend so they behave the same
+MAX_DELAY_SECONDS = 900
+MAX_VISIBILITY_TIMEOUT = 43200
+
+
+@dataclass
+class QueueMessage:
+    """A received message and the handle needed to acknowledge it."""
+    id: str
+    body: str
+    queue: str
+    receipt: str
+    receive_count: int = 1
+    sent_at: Optional[float] = None
+    attributes: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class QueueDepth:
+    """Approximate message counts of a queue."""
+    visible: int
+    in_flight: int
+    delayed: int = 0
+
+
+class JobQueue(ABC):
+    """Interface shared by all queue backends."""
+
+    @abstractmethod
+    async def send(
+        self,
+        queue: str,
+        body: str,
+        delay_seconds: int = 0,
+        attributes: Optional[Dict[str, str]] = None
+    ) -> str:
+        """Enqueue a message.
+
+        Args:
+            queue: Queue URL or name
+            body: Message body
+            delay_seconds: Seconds before the message becomes visible
+            attributes: String attributes delivered with the message
+
+        Returns:
+            Message ID
+        """
+        pass
+
+    @abstractmethod
+    async def receive(
+        self,
+        queue: str,
+        max_messages: int = 1,
+        wait_seconds: int = 0,
+        visibility_timeout: int = DEFAULT_VISIBILITY_TIMEOUT
+    ) -> List[QueueMessage]:
+        """Receive up to ``max_messages``, waiting up to ``wait_seconds`` for one."""
+        pass
+
+    @abstractmethod
+    async def ack(self, message: QueueMessage) -> None:
+        """Delete a processed message."""
+        pass
+
+    @abstractmethod
+    async def extend_visibility(self, message: QueueMessage, timeout: int) -> None:
+        """Hide a received message for ``timeout`` more seconds (0 makes it visible now)."""
+        pass
+
+    @abstractmethod
+    async def depth(self, queue: str) -> QueueDepth:
+        """Approximate backlog of a queue."""
+        pass
+
+    async def close(self) -> None:
+        """Release connections."""
+
+
+class SQSJobQueue(JobQueue):
+    """Amazon SQS (or an SQS-compatible stand-in such as ElasticMQ)."""
+
+    def __init__(self, region: Optional[str] = None, endpoint_url: Optional[str] = None):
+        import boto3
+
+        self.sqs = boto3.client('sqs', region_name=region, endpoint_url=endpoint_url)
+
+    async def send(self, queue, body, delay_seconds=0, attributes=None) -> str:
+        response = await asyncio.to_thread(
+            self.sqs.send_message,
+            QueueUrl=queue,
+            MessageBody=body,
+            DelaySeconds=min(delay_seconds, MAX_DELAY_SECONDS),
+            MessageAttributes={
+                name: {'StringValue': value, 'DataType': 'String'}
+                for name, value in (attributes or {}).items()
+            }
+        )
+        return response['MessageId']
+
+    async def receive(self, queue, max_messages=1, wait_seconds=0,
+                      visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT) -> List[QueueMessage]:
+        response = await asyncio.to_thread(
+            self.sqs.receive_message,
+            QueueUrl=queue,
+            MaxNumberOfMessages=min(max_messages, 10),
+            WaitTimeSeconds=min(wait_seconds, 20),
+            VisibilityTimeout=visibility_timeout,
+            AttributeNames=['All'],
+            MessageAttributeNames=['All']
+        )
+        messages = []
+        for message in response.get('Messages', []):
+            system = message.get('Attributes', {})
+            sent_at = system.get('SentTimestamp')
+            messages.append(QueueMessage(
+                id=message['MessageId'],
+                body=message['Body'],
+                queue=queue,
+                receipt=message['ReceiptHandle'],
+                receive_count=int(system.get('ApproximateReceiveCount', 1)),
+                sent_at=int(sent_at) / 1000 if sent_at else None,
+                attributes={
+                    name: value['StringValue']
+                    for name, value in message.get('MessageAttributes', {}).items()
+                    if 'StringValue' in value
+                }
+            ))
+        return messages
+
+    async def ack(self, message: QueueMessage) -> None:
+        await asyncio.to_thread(
+            self.sqs.delete_message,
+            QueueUrl=message.queue,
+            ReceiptHandle=message.receipt
+        )
+
+    async def extend_visibility(self, message: QueueMessage, timeout: int) -> None:
+        await asyncio.to_thread(
+            self.sqs.change_message_visibility,
+            QueueUrl=message.queue,
+            ReceiptHandle=message.receipt,
+            VisibilityTimeout=min(timeout, MAX_VISIBILITY_TIMEOUT)
+        )
+
+    async def depth(self, queue: str) -> QueueDepth:
+        response = await asyncio.to_thread(
+            self.sqs.get_queue_attributes,
+            QueueUrl=queue,
+            AttributeNames=[
+                'ApproximateNumberOfMessages',
+                'ApproximateNumberOfMessagesNotVisible',
+                'ApproximateNumberOfMessagesDelayed',
+            ]
+        )
+        attributes = response.get('Attributes', {})
+        return QueueDepth(
+            visible=int(attributes.get('ApproximateNumberOfMessages', 0)),
+            in_flight=int(attributes.get('ApproximateNumberOfMessagesNotVisible', 0)),
+            delayed=int(attributes.get('ApproximateNumberOfMessagesDelayed', 0))
+        )
+
+
+class RedisStreamJobQueue(JobQueue):
+    """Redis Streams with one consumer group per queue.
+
+    Every delivered entry has a deadline in the ``<queue>:visible`` sorted
+    set (entry id -> time it becomes visible again), set from the receive's
+    visibility timeout and moved by extend_visibility, so a heartbeat can
+    keep a long job hidden indefinitely, as on SQS. Entries past their
+    deadline are reclaimed with XCLAIM by whichever consumer removes them
+    from the set first. XAUTOCLAIM after MAX_VISIBILITY_TIMEOUT of idle time
+    only recovers entries that lost their deadline (a consumer died between
+    the two steps). Delayed messages wait in another sorted set and are
+    moved onto the stream once due.
+    """
+
+    GROUP = "dprod-workers"
+
+    def __init__(self, url: str, visibility_timeout: int = DEFAULT_VISIBILITY_TIMEOUT, consumer: Optional[str] = None):
+        """
+        Args:
+            url: Redis URL
+            visibility_timeout: Default seconds a received message stays hidden
+            consumer: Consumer name within the group (defaults to a random one)
+        """
+        import redis.asyncio as aioredis
+
+        self.redis = aioredis.from_url(url, decode_responses=True)
+        self.visibility_timeout = visibility_timeout
+        self.consumer = consumer or os.getenv("WORKER_ID") or uuid.uuid4().hex
+        self._groups = set()
+
+    async def _ensure_group(self, stream: str) -> None:
+        if stream in self._groups:
+            return
+        try:
+            await self.redis.xgroup_create(stream, self.GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups.add(stream)
+
+    async def send(self, queue, body, delay_seconds=0, attributes=None) -> str:
+        fields = {"body": body, "attributes": json.dumps(attributes or {}), "sent_at": str(time.time())}
+        if delay_seconds > 0:
+            message_id = uuid.uuid4().hex
+            fields["delayed_id"] = message_id
+            await self.redis.zadd(
+                f"{queue}:delayed",
+                {json.dumps(fields): time.time() + min(delay_seconds, MAX_DELAY_SECONDS)}
+            )
+            return message_id
+        await self._ensure_group(queue)
+        return await self.redis.xadd(queue, fields)
+
+    async def _promote_delayed(self, queue: str) -> None:
+        """Move due delayed messages onto the stream."""
+        due = await self.redis.zrangebyscore(f"{queue}:delayed", 0, time.time(), start=0, num=100)
+        for member in due:
+            # Only the client that removes the entry re-adds it
+            if await self.redis.zrem(f"{queue}:delayed", member):
+                await self.redis.xadd(queue, json.loads(member))
+
+    async def _reclaim_expired(self, queue: str, count: int) -> List[Any]:
+        """Claim delivered entries whose visibility deadline has passed."""
+        entries = []
+        expired = await self.redis.zrangebyscore(f"{queue}:visible", 0, time.time(), start=0, num=count)
+        for entry_id in expired:
+            # Only the client that removes the deadline redelivers the entry
+            if await self.redis.zrem(f"{queue}:visible", entry_id):
+                entries.extend(await self.redis.xclaim(
+                    queue, self.GROUP, self.consumer,
+                    min_idle_time=0,
+                    message_ids=[entry_id]
+                ))
+
+        if len(entries) < count:
+            # Entries whose deadline was lost; live ones are touched by every extend
+            _, orphans, *_ = await self.redis.xautoclaim(
+                queue, self.GROUP, self.consumer,
+                min_idle_time=MAX_VISIBILITY_TIMEOUT * 1000,
+                start_id="0-0",
+                count=count - len(entries)
+            )
+            entries.extend(orphans)
+        return entries
+
+    async def receive(self, queue, max_messages=1, wait_seconds=0,
+                      visibility_timeout=None) -> List[QueueMessage]:
+        await self._ensure_group(queue)
+        await self._promote_delayed(queue)
+        if visibility_timeout is None:
+            visibility_timeout = self.visibility_timeout
+        visible_at = time.time() + min(visibility_timeout, MAX_VISIBILITY_TIMEOUT)
+
+        # Redeliver entries whose visibility expired
+        entries = await self._reclaim_expired(queue, max_messages)
+        if len(entries) < max_messages:
+            response = await self.redis.xreadgroup(
+                self.GROUP, self.consumer, {queue: ">"},
+                count=max_messages - len(entries),
+                block=wait_seconds * 1000 if wait_seconds and not entries else None
+            )
+            for _, stream_entries in response or []:
+                entries.extend(stream_entries)
+
+        messages = []
+        for entry_id, fields in entries:
+            if not fields:
+                # Deleted while pending
+                await self.redis.xack(queue, self.GROUP, entry_id)
+                continue
+            await self.redis.zadd(f"{queue}:visible", {entry_id: visible_at})
+            pending = await self.redis.xpending_range(queue, self.GROUP, min=entry_id, max=entry_id, count=1)
+            sent_at = fields.get("sent_at")
+            messages.append(QueueMessage(
+                id=fields.get("delayed_id") or entry_id,
+                body=fields["body"],
+                queue=queue,
+                receipt=entry_id,
+                receive_count=pending[0]["times_delivered"] if pending else 1,
+                sent_at=float(sent_at) if sent_at else None,
+                attributes=json.loads(fields.get("attributes") or "{}")
+            ))
+        return messages
+
+    async def ack(self, message: QueueMessage) -> None:
+        await self.redis.xack(message.queue, self.GROUP, message.receipt)
+        await self.redis.xdel(message.queue, message.receipt)
+        await self.redis.zrem(f"{message.queue}:visible", message.receipt)
+
+    async def extend_visibility(self, message: QueueMessage, timeout: int) -> None:
+        # Entry ids survive redelivery, so a receipt is only valid while the
+        # entry is still pending on this consumer for the same delivery
+        pending = await self.redis.xpending_range(
+            message.queue, self.GROUP, min=message.receipt, max=message.receipt, count=1
+        )
+        if not pending or pending[0]["consumer"] != self.consumer or \
+                pending[0]["times_delivered"] != message.receive_count:
+            raise ValueError(f"Receipt for message {message.id} is no longer valid")
+        # Reset idle time so the entry stays clear of the orphan reclaim
+        await self.redis.xclaim(
+            message.queue, self.GROUP, self.consumer,
+            min_idle_time=0,
+            message_ids=[message.receipt],
+            idle=0,
+            justid=True
+        )
+        await self.redis.zadd(
+            f"{message.queue}:visible",
+            {message.receipt: time.time() + min(timeout, MAX_VISIBILITY_TIMEOUT)}
+        )
+
+    async def depth(self, queue: str) -> QueueDepth:
+        await self._ensure_group(queue)
+        groups = await self.redis.xinfo_groups(queue)
+        group = next((g for g in groups if g["name"] == self.GROUP), {})
+        return QueueDepth(
+            visible=int(group.get("lag") or 0),
+            in_flight=int(group.get("pending") or 0),
+            delayed=await self.redis.zcard(f"{queue}:delayed")
+        )
+
+    async def close(self) -> None:
+        await self.redis.close()
+
+
+@dataclass(order=True)
+class _MemoryEntry:
+    visible_at: float
+    seq: int
+    id: str = field(compare=False)
+    body: str = field(compare=False)
+    sent_at: float = field(compare=False)
+    attributes: Dict[str, str] = field(compare=False, default_factory=dict)
+    receive_count: int = field(compare=False, default=0)
+    receipt: Optional[str] = field(compare=False, default=None)
+
+
+class InMemoryJobQueue(JobQueue):
+    """Process-local queue with SQS semantics, for tests and benchmarks.
+
+    Each queue is a heap ordered by the time its entries become visible;
+    delayed and in-flight entries simply carry a future ``visible_at``. A
+    new receipt is issued on every delivery, so acknowledging with a stale
+    receipt (after the message was redelivered) is a no-op, as on SQS.
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, List[_MemoryEntry]] = {}
+        self._entries: Dict[str, _MemoryEntry] = {}
+        self._seq = itertools.count()
+        self._changed = asyncio.Condition()
+
+    def _heap(self, queue: str) -> List[_MemoryEntry]:
+        return self._queues.setdefault(queue, [])
+
+    async def send(self, queue, body, delay_seconds=0, attributes=None) -> str:
+        now = time.time()
+        entry = _MemoryEntry(
+            visible_at=now + min(delay_seconds, MAX_DELAY_SECONDS),
+            seq=next(self._seq),
+            id=uuid.uuid4().hex,
+            body=body,
+            sent_at=now,
+            attributes=dict(attributes or {})
+        )
+        heapq.heappush(self._heap(queue), entry)
+        self._entries[entry.id] = entry
+        async with self._changed:
+            self._changed.notify_all()
+        return entry.id
+
+    def _take(self, queue: str, max_messages: int, visibility_timeout: int) -> List[QueueMessage]:
+        heap = self._heap(queue)
+        now = time.time()
+        taken = []
+        while heap and len(taken) < max_messages and heap[0].visible_at <= now:
+            entry = heapq.heappop(heap)
+            if entry.id not in self._entries:
+                continue  # acknowledged
+            entry.receive_count += 1
+            entry.receipt = uuid.uuid4().hex
+            entry.visible_at = now + visibility_timeout
+            entry.seq = next(self._seq)
+            taken.append(entry)
+        for entry in taken:
+            heapq.heappush(heap, entry)
+        return [
+            QueueMessage(
+                id=entry.id,
+                body=entry.body,
+                queue=queue,
+                receipt=entry.receipt,
+                receive_count=entry.receive_count,
+                sent_at=entry.sent_at,
+                attributes=dict(entry.attributes)
+            )
+            for entry in taken
+        ]
+
+    async def receive(self, queue, max_messages=1, wait_seconds=0,
+                      visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT) -> List[QueueMessage]:
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            messages = self._take(queue, max_messages, visibility_timeout)
+            remaining = deadline - time.monotonic()
+            if messages or remaining <= 0:
+                return messages
+            # Wake on new messages, or when the next hidden entry may become visible
+            heap = self._heap(queue)
+            timeout = remaining
+            if heap:
+                timeout = min(timeout, max(0.0, heap[0].visible_at - time.time()))
+            async with self._changed:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=max(timeout, 0.01))
+                except asyncio.TimeoutError:
+                    pass
+
+    def _lookup(self, message: QueueMessage) -> Optional[_MemoryEntry]:
+        entry = self._entries.get(message.id)
+        return entry if entry is not None and entry.receipt == message.receipt else None
+
+    async def ack(self, message: QueueMessage) -> None:
+        if self._lookup(message) is not None:
+            # The heap entry is skipped lazily once popped
+            del self._entries[message.id]
+
+    async def extend_visibility(self, message: QueueMessage, timeout: int) -> None:
+        entry = self._lookup(message)
+        if entry is None:
+            raise ValueError(f"Receipt for message {message.id} is no longer valid")
+        heap = self._heap(message.queue)
+        entry.visible_at = time.time() + min(timeout, MAX_VISIBILITY_TIMEOUT)
+        heapq.heapify(heap)
+        if timeout == 0:
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def depth(self, queue: str) -> QueueDepth:
+        now = time.time()
+        visible = in_flight = delayed = 0
+        for entry in self._heap(queue):
+            if entry.id not in self._entries:
+                continue
+            if entry.visible_at <= now:
+                visible += 1
+            elif entry.receive_count:
+                in_flight += 1
+            else:
+                delayed += 1
+        return QueueDepth(visible=visible, in_flight=in_flight, delayed=delayed)
+
+
+_memory_queue: Optional[InMemoryJobQueue] = None
+
+
+def get_job_queue(backend: Optional[str] = None) -> JobQueue:
+    """Create the configured queue backend.
+
+    The in-memory backend is a process-wide singleton so producers and
+    consumers in the same process share it.
+
+    Args:
+        backend: ``sqs``, ``redis`` or ``memory`` (defaults to QUEUE_BACKEND)
+    """
+    global _memory_queue
+
+    backend = (backend or os.getenv("QUEUE_BACKEND", "sqs")).lower()
+    if backend == "sqs":
+        return SQSJobQueue(
+            region=os.getenv("AWS_REGION", "us-east-1"),
+            endpoint_url=os.getenv("SQS_ENDPOINT_URL") or None
+        )
+    if backend == "redis":
+        return RedisStreamJobQueue(
+            os.getenv("REDIS_URL", "redis://localhost:6379"),
+            visibility_timeout=int(os.getenv("MESSAGE_VISIBILITY_TIMEOUT", str(DEFAULT_VISIBILITY_TIMEOUT)))
+        )
+    if backend == "memory":
+        if _memory_queue is None:
+            _memory_queue = InMemoryJobQueue()
+        return _memory_queue
+
+    raise ValueError(f"Unsupported queue backend: {backend}")
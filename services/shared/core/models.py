@@ -4,7 +4,7 @@ from datetime import datetime
 from enum import Enum
 from uuid import uuid4
 
-from sqlalchemy import Column, DateTime, String, Text, Integer, Boolean, Numeric, Date
+from sqlalchemy import Column, DateTime, String, Text, Integer, BigInteger, Boolean, Numeric, Date, Index, LargeBinary
 from sqlalchemy.dialects.postgresql import UUID as SQLUUID, JSONB
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -24,6 +24,7 @@ class ProjectType(str, Enum):
 class DeploymentStatus(str, Enum):
     """Deployment status states."""
     CREATED = "created"
+    QUEUED = "queued"
     BUILDING = "building"
     DEPLOYING = "deploying"
     LIVE = "live"
@@ -31,6 +32,14 @@ class DeploymentStatus(str, Enum):
     STOPPED = "stopped"
 
 
+class CommandStatus(str, Enum):
+    """Worker control command states."""
+    PENDING = "pending"
+    CLAIMED = "claimed"
+    DONE = "done"
+    FAILED = "failed"
+
+
 class UserStatus(str, Enum):
     """User account status."""
     ACTIVE = "active"
@@ -55,6 +64,13 @@ class User(Base):
 class Project(Base):
     """Project database model."""
     __tablename__ = "projects"
+    __table_args__ = (
+        # Prefix LIKE lookups for subdomain allocation, independent of collation
+        Index(
+            "ix_projects_subdomain_pattern", "subdomain",
+            postgresql_ops={"subdomain": "varchar_pattern_ops"}
+        ),
+    )
 
     id = Column(SQLUUID(as_uuid=True), primary_key=True, default=uuid4)
     user_id = Column(SQLUUID(as_uuid=True), nullable=False, index=True)
@@ -78,10 +94,68 @@ class Deployment(Base):
     logs = Column(Text, nullable=True)
     url = Column(String(255), nullable=True)
     container_id = Column(String(64), nullable=True)
+    image_id = Column(String(128), nullable=True)
+    worker_id = Column(String(100), nullable=True, index=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    build_started_at = Column(DateTime, nullable=True)
+    deployed_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
+    # ProjectConfig the container was started with (environment, port), reused on rollback
+    run_config = Column(JSONB, nullable=True)
+    # Last sequence number handed out to this deployment's events
+    log_seq = Column(BigInteger, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
 
+class DeploymentEvent(Base):
+    """Append-only build/deploy log line of a deployment.
+
+    Range-partitioned by month on created_at (see the migration), so the
+    partition key is part of the primary key.
+    """
+    __tablename__ = "deployment_events"
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    deployment_id = Column(SQLUUID(as_uuid=True), primary_key=True)
+    seq = Column(BigInteger, primary_key=True)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+    level = Column(String(10), default="info", nullable=False)
+    message = Column(Text, nullable=False)
+    worker_id = Column(String(100), nullable=True)
+
+
+class DeploymentCommand(Base):
+    """Control command (stop, restart, logs) for the worker owning a deployment."""
+    __tablename__ = "deployment_commands"
+    __table_args__ = (
+        Index("ix_deployment_commands_worker_status", "worker_id", "status", "created_at"),
+    )
+
+    id = Column(SQLUUID(as_uuid=True), primary_key=True, default=uuid4)
+    deployment_id = Column(SQLUUID(as_uuid=True), nullable=False, index=True)
+    worker_id = Column(String(100), nullable=False)
+    command = Column(String(20), nullable=False)
+    payload = Column(JSONB, nullable=True)
+    status = Column(String(20), default=CommandStatus.PENDING.value, nullable=False)
+    result = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+
+
+class WorkerCache(Base):
+    """Summary of a worker's Docker layer cache, used for build routing."""
+    __tablename__ = "worker_cache"
+
+    worker_id = Column(String(100), primary_key=True)
+    queue_url = Column(String(512), nullable=True)
+    bloom = Column(LargeBinary, nullable=False)
+    key_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
 # AI Agent Models
 class AIAgentDecision(Base):
     """AI Agent Decision tracking model."""
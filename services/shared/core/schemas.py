@@ -1,7 +1,7 @@
 """Pydantic schemas for API validation and serialization."""
 
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field
@@ -76,6 +76,10 @@ class DeploymentResponse(DeploymentBase):
     project_id: UUID
     logs: Optional[str] = None
     url: Optional[str] = None
+    image_id: Optional[str] = None
+    error: Optional[str] = None
+    build_started_at: Optional[datetime] = None
+    deployed_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
@@ -83,6 +87,30 @@ class DeploymentResponse(DeploymentBase):
         from_attributes = True
 
 
+class DeploymentAccepted(DeploymentResponse):
+    """Deployment accepted for background processing."""
+    status_url: str = Field(..., description="Poll or stream this deployment's status here")
+
+
+class DeploymentEventResponse(BaseModel):
+    """Deployment event (log line) response model."""
+    seq: int
+    level: str
+    message: str
+    worker_id: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class DeploymentEventPage(BaseModel):
+    """Page of deployment events with the cursor for the next page."""
+    deployment_id: UUID
+    events: List[DeploymentEventResponse]
+    next_seq: Optional[int] = Field(None, description="Pass as after_seq to fetch the next page")
+
+
 # Configuration Schemas
 class ProjectConfig(BaseModel):
     """Project configuration for deployment."""
@@ -0,0 +1,54 @@
+"""Deployment status change notifications over Postgres LISTEN/NOTIFY.
+
+Every status write issues ``pg_notify`` on a per-deployment channel inside
+the same transaction, so listeners only hear about committed changes. The
+payload is a small JSON snapshot; listeners that need more re-read the row.
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+CHANNEL_PREFIX = "deployment_"
+
+# Statuses after which a deployment's status no longer changes on its own
+FINAL_STATUSES = {"live", "error", "stopped"}
+
+
+def status_channel(deployment_id) -> str:
+    """NOTIFY channel of one deployment (a valid unquoted identifier)."""
+    return f"{CHANNEL_PREFIX}{UUID(str(deployment_id)).hex}"
+
+
+def status_payload(
+    deployment_id,
+    status: str,
+    updated_at: Optional[datetime] = None,
+    **extra: Any
+) -> Dict[str, Any]:
+    """Snapshot sent to subscribers."""
+    payload = {
+        "deployment_id": str(deployment_id),
+        "status": status,
+        "updated_at": (updated_at or datetime.utcnow()).isoformat(),
+    }
+    payload.update({k: v for k, v in extra.items() if v is not None})
+    return payload
+
+
+async def notify_status(
+    session: AsyncSession,
+    deployment_id,
+    status: str,
+    **extra: Any
+) -> None:
+    """Queue a status notification; Postgres delivers it on commit."""
+    if session.get_bind().dialect.name != "postgresql":
+        return
+    payload = status_payload(deployment_id, status, **extra)
+    await session.execute(
+        select(func.pg_notify(status_channel(deployment_id), json.dumps(payload, default=str)))
+    )
@@ -0,0 +1,86 @@
+"""Project subdomain allocation.
+
+A project named ``app`` gets ``app``, or ``app-<n>`` with the lowest free
+``n`` when that is taken. All candidates are read in one prefix query
+(served by the ``varchar_pattern_ops`` index on projects.subdomain) instead
+of probing one name per round trip. Two concurrent creates can still pick
+the same name; the unique index rejects the loser, which allocates again.
+"""
+import re
+from typing import Iterable
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Project
+
+MAX_SUBDOMAIN_LENGTH = 63  # DNS label limit, and projects.subdomain length
+MAX_BASE_LENGTH = MAX_SUBDOMAIN_LENGTH - 7  # leaves room for "-999999"
+
+# Names used by the platform itself; projects get a numbered variant instead
+RESERVED_SUBDOMAINS = frozenset({
+    "www",
+    "api",
+    "app",
+    "admin",
+    "dashboard",
+    "console",
+    "docs",
+    "status",
+    "mail",
+    "smtp",
+    "ftp",
+    "cdn",
+    "static",
+    "assets",
+    "auth",
+    "login",
+    "traefik",
+    "registry",
+    "metrics",
+    "grafana",
+    "prometheus",
+    "localhost",
+})
+
+
+def subdomain_base(name: str) -> str:
+    """DNS-safe subdomain derived from a project name."""
+    base = re.sub(r'[^a-z0-9-]', '-', name.lower())
+    base = re.sub(r'-+', '-', base).strip('-')
+    base = base[:MAX_BASE_LENGTH].rstrip('-')
+    return base or "project"
+
+
+def first_free_subdomain(base: str, taken: Iterable[str]) -> str:
+    """Lowest free of ``base``, ``base-1``, ``base-2``... given the taken names."""
+    prefix = f"{base}-"
+    used = set()
+    for subdomain in taken:
+        if subdomain == base:
+            used.add(0)
+        elif subdomain.startswith(prefix) and subdomain[len(prefix):].isdigit():
+            used.add(int(subdomain[len(prefix):]))
+
+    if base in RESERVED_SUBDOMAINS:
+        used.add(0)
+
+    counter = 0
+    while counter in used:
+        counter += 1
+    return base if counter == 0 else f"{prefix}{counter}"
+
+
+async def allocate_subdomain(session: AsyncSession, name: str) -> str:
+    """Pick a free subdomain for a project name with a single query.
+
+    The result is not reserved; insert it and retry on IntegrityError.
+    """
+    base = subdomain_base(name)
+    # base only contains [a-z0-9-], so it needs no LIKE escaping
+    result = await session.execute(
+        select(Project.subdomain).where(
+            or_(Project.subdomain == base, Project.subdomain.like(f"{base}-%"))
+        )
+    )
+    return first_free_subdomain(base, result.scalars().all())
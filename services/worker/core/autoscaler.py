@@ -0,0 +1,162 @@
+"""Compute the desired worker count from deployment queue depth."""
+import asyncio
+import logging
+import math
+import os
+import sys
+import time
+from typing import List, Optional
+
+import boto3
+
+# Import shared modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from services.shared.core.job_queue import get_job_queue, QueueDepth
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+
+def desired_workers(
+    snapshot: QueueDepth,
+    current: int,
+    slots_per_worker: int,
+    avg_job_seconds: float,
+    drain_seconds: float,
+    min_workers: int = 1,
+    max_workers: int = 10
+) -> int:
+    """Worker count needed to drain the backlog within ``drain_seconds``.
+
+    Each worker completes ``slots_per_worker * drain_seconds / avg_job_seconds``
+    jobs per drain window. Jobs already in flight keep their slots, so the
+    fleet never shrinks below what is currently running. Scale-in removes at
+    most one worker per evaluation to avoid flapping on bursty queues.
+
+    Args:
+        snapshot: Current queue backlog
+        current: Current worker count
+        slots_per_worker: MAX_CONCURRENT_JOBS of each worker
+        avg_job_seconds: Observed mean job duration
+        drain_seconds: Target time to clear the visible backlog
+        min_workers: Lower bound
+        max_workers: Upper bound
+
+    Returns:
+        Desired worker count
+    """
+    jobs_per_worker = slots_per_worker * max(1.0, drain_seconds / max(avg_job_seconds, 1.0))
+    needed = math.ceil(snapshot.in_flight / slots_per_worker) + math.ceil(
+        snapshot.visible / jobs_per_worker
+    )
+    desired = max(min_workers, min(max_workers, needed))
+
+    if desired < current:
+        desired = max(desired, current - 1)
+    return desired
+
+
+class Autoscaler:
+    """Poll queue depth and publish the desired worker count.
+
+    Reads the backlog of every deployment queue through the configured
+    queue backend, so it can run against a local SQS stand-in
+    (``SQS_ENDPOINT_URL``), Redis or the in-memory queue. Set
+    ``AUTOSCALING_GROUP_NAME`` to apply the result to an EC2 Auto Scaling
+    group, otherwise it is only logged.
+    """
+
+    def __init__(
+        self,
+        queue_urls: Optional[List[str]] = None,
+        job_queue=None,
+        group_name: Optional[str] = None
+    ):
+        """Initialize autoscaler.
+
+        Args:
+            queue_urls: Queues to measure (defaults to the configured deployment queues)
+            job_queue: Queue backend (defaults to get_job_queue())
+            group_name: Auto Scaling group to resize
+        """
+        self.queue_urls = queue_urls or [
+            url for url in (
+                config.SQS_HIGH_PRIORITY_QUEUE_URL,
+                config.SQS_QUEUE_URL,
+                config.SQS_LOW_PRIORITY_QUEUE_URL,
+            ) if url
+        ]
+        self.job_queue = job_queue or get_job_queue(config.QUEUE_BACKEND)
+        self.group_name = group_name or os.getenv("AUTOSCALING_GROUP_NAME")
+        self.autoscaling = boto3.client('autoscaling', region_name=config.AWS_REGION) if self.group_name else None
+
+        self.min_workers = int(os.getenv("AUTOSCALER_MIN_WORKERS", "1"))
+        self.max_workers = int(os.getenv("AUTOSCALER_MAX_WORKERS", "10"))
+        self.avg_job_seconds = float(os.getenv("AUTOSCALER_AVG_JOB_SECONDS", "120"))
+        self.drain_seconds = float(os.getenv("AUTOSCALER_DRAIN_SECONDS", "300"))
+        self.interval = int(os.getenv("AUTOSCALER_INTERVAL", "60"))
+        self.current = self.min_workers
+
+    async def snapshot(self) -> QueueDepth:
+        """Sum backlog across queues."""
+        total = QueueDepth(visible=0, in_flight=0, delayed=0)
+        for url in self.queue_urls:
+            depth = await self.job_queue.depth(url)
+            total.visible += depth.visible
+            total.in_flight += depth.in_flight
+            total.delayed += depth.delayed
+        return total
+
+    async def evaluate(self) -> int:
+        """Run one evaluation and apply it if an Auto Scaling group is configured."""
+        snapshot = await self.snapshot()
+        if self.autoscaling:
+            response = await asyncio.to_thread(
+                self.autoscaling.describe_auto_scaling_groups,
+                AutoScalingGroupNames=[self.group_name]
+            )
+            groups = response.get('AutoScalingGroups', [])
+            if groups:
+                self.current = groups[0]['DesiredCapacity']
+        
+        desired = desired_workers(
+            snapshot,
+            current=self.current,
+            slots_per_worker=config.MAX_CONCURRENT_JOBS,
+            avg_job_seconds=self.avg_job_seconds,
+            drain_seconds=self.drain_seconds,
+            min_workers=self.min_workers,
+            max_workers=self.max_workers
+        )
+        logger.info(
+            f"📊 visible={snapshot.visible} in_flight={snapshot.in_flight} "
+            f"delayed={snapshot.delayed} -> desired workers {desired} (current {self.current})"
+        )
+
+        if desired != self.current and self.autoscaling:
+            await asyncio.to_thread(
+                self.autoscaling.set_desired_capacity,
+                AutoScalingGroupName=self.group_name,
+                DesiredCapacity=desired,
+                HonorCooldown=False
+            )
+        self.current = desired
+        return desired
+
+    async def run_forever(self) -> None:
+        """Evaluate every ``interval`` seconds until cancelled."""
+        while True:
+            started = time.monotonic()
+            try:
+                await self.evaluate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Autoscaler evaluation failed: {e}")
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=getattr(logging, config.LOG_LEVEL), stream=sys.stdout)
+    asyncio.run(Autoscaler().run_forever())
@@ -0,0 +1,88 @@
+"""Publish this worker's layer cache summary for cache-affinity routing."""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Set
+
+from sqlalchemy.dialects.postgresql import insert
+
+# Import shared modules
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from services.shared.core.models import WorkerCache
+from services.shared.core.build_cache import BloomFilter
+
+from .config import config
+from .docker_executor import DockerExecutor, CACHE_KEYS_LABEL
+
+logger = logging.getLogger(__name__)
+
+
+class CachePublisher:
+    """Periodically upsert a Bloom filter of cached images into worker_cache.
+
+    The filter holds a ``base:<image:tag>`` key for every tagged image on
+    the host and the ``deps:`` keys recorded on dprod-built images, so the
+    API can route a build to the worker most likely to hit its layers.
+    """
+
+    def __init__(self, session_factory, docker_executor: DockerExecutor):
+        """Initialize cache publisher.
+
+        Args:
+            session_factory: Async session factory (shared with StatusUpdater)
+            docker_executor: Docker executor owning this worker's images
+        """
+        self.session_factory = session_factory
+        self.docker_executor = docker_executor
+
+    async def run_forever(self) -> None:
+        """Publish until cancelled."""
+        while True:
+            try:
+                await self.publish()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Failed to publish cache summary: {e}")
+            await asyncio.sleep(config.CACHE_PUBLISH_INTERVAL)
+
+    async def publish(self) -> int:
+        """Publish the current cache summary.
+
+        Returns:
+            Number of keys in the summary
+        """
+        keys = await asyncio.to_thread(self._collect_keys)
+        bloom = BloomFilter.from_keys(keys)
+        now = datetime.utcnow()
+
+        values = {
+            "queue_url": config.WORKER_QUEUE_URL or None,
+            "bloom": bloom.to_bytes(),
+            "key_count": len(keys),
+            "updated_at": now,
+        }
+        async with self.session_factory() as session:
+            await session.execute(
+                insert(WorkerCache)
+                .values(worker_id=config.WORKER_ID, **values)
+                .on_conflict_do_update(index_elements=[WorkerCache.worker_id], set_=values)
+            )
+            await session.commit()
+
+        logger.debug(f"🗂️  Published cache summary with {len(keys)} key(s)")
+        return len(keys)
+
+    def _collect_keys(self) -> Set[str]:
+        """Collect cache keys from the images present on this host."""
+        keys: Set[str] = set()
+        for image in self.docker_executor.client.images.list():
+            for tag in image.tags:
+                keys.add(f"base:{tag}")
+            labels = image.labels or {}
+            for key in labels.get(CACHE_KEYS_LABEL, "").split(","):
+                if key:
+                    keys.add(key)
+        return keys
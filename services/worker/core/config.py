@@ -1,6 +1,6 @@
 """Configuration for worker service."""
 import os
-from typing import Optional
+from typing import Dict
 
 
 class WorkerConfig:
@@ -8,7 +8,17 @@ class WorkerConfig:
     
     # AWS Configuration
     AWS_REGION: str = os.getenv("AWS_REGION", "us-east-1")
+    # Queue backend: sqs, redis (Redis Streams at REDIS_URL) or memory.
+    # With redis/memory the *_QUEUE_URL settings are plain queue names.
+    QUEUE_BACKEND: str = os.getenv("QUEUE_BACKEND", "sqs")
     SQS_QUEUE_URL: str = os.getenv("SQS_QUEUE_URL", "")
+    # Optional priority queues polled alongside SQS_QUEUE_URL (the normal queue)
+    SQS_HIGH_PRIORITY_QUEUE_URL: str = os.getenv("SQS_HIGH_PRIORITY_QUEUE_URL", "")
+    SQS_LOW_PRIORITY_QUEUE_URL: str = os.getenv("SQS_LOW_PRIORITY_QUEUE_URL", "")
+    # This worker's own queue for builds routed to it by cache affinity
+    WORKER_QUEUE_URL: str = os.getenv("WORKER_QUEUE_URL", "")
+    # Share of receives each priority gets while all queues have work
+    QUEUE_WEIGHTS: str = os.getenv("QUEUE_WEIGHTS", "affinity=10,high=6,normal=3,low=1")
     
     # Database Configuration
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
@@ -18,14 +28,54 @@ class WorkerConfig:
     MAX_CONCURRENT_JOBS: int = int(os.getenv("MAX_CONCURRENT_JOBS", "3"))
     POLL_INTERVAL: int = int(os.getenv("POLL_INTERVAL", "5"))  # seconds
     MESSAGE_VISIBILITY_TIMEOUT: int = int(os.getenv("MESSAGE_VISIBILITY_TIMEOUT", "900"))  # 15 minutes
+    # Extend visibility of in-flight messages this often while a job runs
+    VISIBILITY_HEARTBEAT_INTERVAL: int = int(
+        os.getenv("VISIBILITY_HEARTBEAT_INTERVAL", str(max(10, MESSAGE_VISIBILITY_TIMEOUT // 3)))
+    )
+    # A claimed deployment is reclaimable once its worker stops renewing the lease
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+    LEASE_RENEW_INTERVAL: int = int(os.getenv("LEASE_RENEW_INTERVAL", str(max(10, JOB_LEASE_SECONDS // 3))))
+    # Transient failures are retried with exponential backoff, then dead-lettered
+    MAX_JOB_ATTEMPTS: int = int(os.getenv("MAX_JOB_ATTEMPTS", "5"))
+    RETRY_BASE_DELAY: int = int(os.getenv("RETRY_BASE_DELAY", "15"))  # seconds
+    RETRY_MAX_DELAY: int = int(os.getenv("RETRY_MAX_DELAY", "600"))  # seconds
+    DEAD_LETTER_QUEUE_URL: str = os.getenv("DEAD_LETTER_QUEUE_URL", "")
+    # Per-user cap on concurrently building deployments across all workers (0 = unlimited)
+    MAX_JOBS_PER_USER: int = int(os.getenv("MAX_JOBS_PER_USER", "2"))
+    USER_THROTTLE_DELAY: int = int(os.getenv("USER_THROTTLE_DELAY", "30"))  # seconds
+    # Write-behind buffer for status transitions and build logs
+    STATUS_FLUSH_INTERVAL: float = float(os.getenv("STATUS_FLUSH_INTERVAL", "1.0"))  # seconds
+    STATUS_FLUSH_MAX_LINES: int = int(os.getenv("STATUS_FLUSH_MAX_LINES", "50"))
+    # How often deployment_events partitions for the coming months are ensured
+    EVENT_PARTITION_INTERVAL: int = int(os.getenv("EVENT_PARTITION_INTERVAL", "3600"))  # seconds
+    COMMAND_POLL_INTERVAL: int = int(os.getenv("COMMAND_POLL_INTERVAL", "2"))  # seconds
+    
+    # Artifact store holding source archives (s3://bucket/prefix or file:///path)
+    ARTIFACT_STORE_URL: str = os.getenv("ARTIFACT_STORE_URL", "file:///tmp/dprod/artifacts")
+    
+    # How often this worker publishes its layer cache summary
+    CACHE_PUBLISH_INTERVAL: int = int(os.getenv("CACHE_PUBLISH_INTERVAL", "60"))  # seconds
     
     # Docker Configuration
     DOCKER_SOCKET: str = os.getenv("DOCKER_SOCKET", "/var/run/docker.sock")
     CONTAINER_NETWORK: str = os.getenv("CONTAINER_NETWORK", "dprod-network")
     
+    # Prometheus /metrics endpoint (0 disables)
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "9100"))
+    
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     
+    @classmethod
+    def queue_weights(cls) -> Dict[str, int]:
+        """Parse QUEUE_WEIGHTS into a priority -> weight mapping."""
+        weights = {"affinity": 10, "high": 6, "normal": 3, "low": 1}
+        for item in cls.QUEUE_WEIGHTS.split(","):
+            name, _, weight = item.partition("=")
+            if name.strip() and weight.strip():
+                weights[name.strip()] = max(1, int(weight))
+        return weights
+    
     @classmethod
     def validate(cls) -> None:
         """Validate required configuration."""
@@ -0,0 +1,128 @@
+"""Control channel carrying stop/restart/log-tail commands to this worker."""
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, update
+
+# Import shared models
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from services.shared.core.models import Deployment, DeploymentCommand, DeploymentStatus, CommandStatus
+
+from .config import config
+from .docker_executor import DockerExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ControlChannel:
+    """Execute commands queued in the deployment_commands table.
+
+    The API inserts a row addressed to the worker that owns the container;
+    this worker claims pending rows, runs them against Docker and writes the
+    outcome back, so the API never waits on a worker round trip.
+    """
+
+    def __init__(self, session_factory, docker_executor: DockerExecutor, batch_size: int = 10):
+        """Initialize control channel.
+
+        Args:
+            session_factory: Async session factory (shared with StatusUpdater)
+            docker_executor: Docker executor owning this worker's containers
+            batch_size: Maximum commands claimed per poll
+        """
+        self.session_factory = session_factory
+        self.docker_executor = docker_executor
+        self.batch_size = batch_size
+
+    async def poll(self) -> int:
+        """Claim and execute pending commands for this worker.
+
+        Returns:
+            Number of commands executed
+        """
+        async with self.session_factory() as session:
+            pending = (
+                select(DeploymentCommand.id)
+                .where(
+                    DeploymentCommand.worker_id == config.WORKER_ID,
+                    DeploymentCommand.status == CommandStatus.PENDING.value
+                )
+                .order_by(DeploymentCommand.created_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await session.execute(
+                update(DeploymentCommand)
+                .where(DeploymentCommand.id.in_(pending))
+                .values(status=CommandStatus.CLAIMED.value)
+                .returning(
+                    DeploymentCommand.id,
+                    DeploymentCommand.deployment_id,
+                    DeploymentCommand.command,
+                    DeploymentCommand.payload
+                )
+            )
+            commands = result.all()
+            await session.commit()
+
+        for command in commands:
+            await self._execute(command)
+
+        return len(commands)
+
+    async def _execute(self, command) -> None:
+        """Run a single claimed command and record its outcome."""
+        logger.info(f"📨 Executing {command.command} for deployment {command.deployment_id}")
+
+        output: Optional[str] = None
+        try:
+            async with self.session_factory() as session:
+                result = await session.execute(
+                    select(Deployment.container_id).where(Deployment.id == command.deployment_id)
+                )
+                container_id = result.scalar_one_or_none()
+
+            if not container_id:
+                raise ValueError("Deployment has no container")
+
+            if command.command == "stop":
+                success = await self.docker_executor.stop_container(container_id)
+                if success:
+                    await self._set_deployment_status(command.deployment_id, DeploymentStatus.STOPPED.value)
+            elif command.command == "restart":
+                success = await self.docker_executor.restart_container(container_id)
+            elif command.command == "logs":
+                tail = int((command.payload or {}).get("tail", 100))
+                output = await self.docker_executor.get_container_logs(container_id, tail=tail)
+                success = output is not None
+            else:
+                raise ValueError(f"Unknown command: {command.command}")
+
+            status = CommandStatus.DONE.value if success else CommandStatus.FAILED.value
+
+        except Exception as e:
+            logger.error(f"❌ Command {command.command} failed: {e}")
+            status = CommandStatus.FAILED.value
+            output = str(e)
+
+        async with self.session_factory() as session:
+            await session.execute(
+                update(DeploymentCommand)
+                .where(DeploymentCommand.id == command.id)
+                .values(status=status, result=output, completed_at=datetime.utcnow())
+            )
+            await session.commit()
+
+    async def _set_deployment_status(self, deployment_id, status: str) -> None:
+        """Record the effect of a command on the deployment row."""
+        async with self.session_factory() as session:
+            await session.execute(
+                update(Deployment)
+                .where(Deployment.id == deployment_id)
+                .values(status=status, updated_at=datetime.utcnow())
+            )
+            await session.commit()
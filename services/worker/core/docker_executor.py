@@ -7,11 +7,28 @@ from typing import Optional, Dict, Any, AsyncIterator
 import tempfile
 import os
 import base64
+import io
+import sys
+import tarfile
+import uuid
+from pathlib import Path
+
+# Import shared modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from services.shared.core.docker_gc import DockerGarbageCollector
+from services.shared.core.artifact_store import (
+    get_artifact_store, safe_extract, HashingReader, UnsafeArchiveError, CHUNK_SIZE
+)
+from services.shared.core.build_cache import dependency_keys
 
 from .config import config
+from .errors import PermanentJobError
 
 logger = logging.getLogger(__name__)
 
+# Image label listing the dependency cache keys an image's layers were built from
+CACHE_KEYS_LABEL = "dprod.cache_keys"
+
 
 class DockerExecutor:
     """Execute Docker builds and container runs."""
@@ -21,26 +38,42 @@ class DockerExecutor:
         try:
             self.client = docker.DockerClient(base_url=f'unix://{config.DOCKER_SOCKET}')
             self.client.ping()
+            self.artifact_store = get_artifact_store(config.ARTIFACT_STORE_URL)
             logger.info("✅ Docker client initialized")
         except DockerException as e:
             logger.error(f"❌ Failed to initialize Docker client: {e}")
             raise
+        
+        try:
+            self.gc: Optional[DockerGarbageCollector] = DockerGarbageCollector(self.client)
+        except ValueError as e:
+            logger.warning(f"⚠️  Image GC disabled: {e}")
+            self.gc = None
     
     async def build_image(
         self,
         deployment_id: str,
-        project_files: Dict[str, str],
-        dockerfile_content: Optional[str] = None
+        project_files: Optional[Dict[str, str]] = None,
+        dockerfile_content: Optional[str] = None,
+        project_id: Optional[str] = None,
+        artifact_uri: Optional[str] = None,
+        artifact_sha256: Optional[str] = None
     ) -> Optional[str]:
-        """Build Docker image from project files.
+        """Build Docker image from a source artifact or inline project files.
         
         Args:
             deployment_id: Deployment ID
-            project_files: Dictionary of filename -> base64 content
+            project_files: Dictionary of filename -> base64 content (legacy messages)
             dockerfile_content: Optional Dockerfile content
+            project_id: Project ID (used for per-project image retention)
+            artifact_uri: URI of the source archive in the artifact store
+            artifact_sha256: Expected SHA-256 of the source archive
             
         Returns:
-            Image ID if successful, None otherwise
+            Image ID
+            
+        Raises:
+            PermanentJobError: If the Dockerfile fails to build
         """
         temp_dir = None
         try:
@@ -48,15 +81,24 @@ class DockerExecutor:
             temp_dir = tempfile.mkdtemp(prefix=f"dprod-{deployment_id}-")
             logger.info(f"📁 Build context: {temp_dir}")
             
-            # Write project files
-            for filename, content_b64 in project_files.items():
-                file_path = os.path.join(temp_dir, filename)
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                
-                # Decode base64 content
-                content = base64.b64decode(content_b64)
-                with open(file_path, 'wb') as f:
-                    f.write(content)
+            if artifact_uri:
+                # Stream the archive straight into the build context
+                await asyncio.to_thread(
+                    self._fetch_artifact,
+                    artifact_uri,
+                    artifact_sha256,
+                    temp_dir
+                )
+            else:
+                # Write project files
+                for filename, content_b64 in (project_files or {}).items():
+                    file_path = os.path.join(temp_dir, filename)
+                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                    
+                    # Decode base64 content
+                    content = base64.b64decode(content_b64)
+                    with open(file_path, 'wb') as f:
+                        f.write(content)
             
             # Write Dockerfile if provided
             if dockerfile_content:
@@ -72,7 +114,13 @@ class DockerExecutor:
                 path=temp_dir,
                 tag=tag,
                 rm=True,
-                forcerm=True
+                forcerm=True,
+                labels={
+                    "dprod": "true",
+                    "project_id": project_id or deployment_id,
+                    # Advertised by CachePublisher for cache-affinity routing
+                    CACHE_KEYS_LABEL: ",".join(dependency_keys(Path(temp_dir)))
+                }
             )
             
             # Log build output
@@ -85,14 +133,16 @@ class DockerExecutor:
             
         except BuildError as e:
             logger.error(f"❌ Build failed: {e}")
-            for log in e.build_log:
-                if 'stream' in log:
-                    logger.error(log['stream'].strip())
-            return None
+            output = [log['stream'].strip() for log in e.build_log if 'stream' in log]
+            for line in output:
+                logger.error(line)
+            # Rebuilding the same source fails the same way; keep the tail for the dead letter
+            tail = "\n".join(line for line in output[-20:] if line)
+            raise PermanentJobError(f"Build failed: {e}\n{tail}".rstrip()) from e
             
         except Exception as e:
             logger.error(f"❌ Error building image: {e}", exc_info=True)
-            return None
+            raise
             
         finally:
             # Cleanup temp directory
@@ -100,12 +150,43 @@ class DockerExecutor:
                 import shutil
                 shutil.rmtree(temp_dir, ignore_errors=True)
     
+    def _fetch_artifact(
+        self,
+        artifact_uri: str,
+        artifact_sha256: Optional[str],
+        target_dir: str
+    ) -> None:
+        """Stream-extract a source archive and verify its checksum.
+        
+        Every member is validated before it is written, since the checksum
+        can only be checked once the whole stream has been read.
+        
+        Args:
+            artifact_uri: URI of the source archive
+            artifact_sha256: Expected SHA-256 (skipped if None)
+            target_dir: Directory to extract into
+        """
+        logger.info(f"📥 Fetching artifact: {artifact_uri}")
+        reader = HashingReader(self.artifact_store.open(artifact_uri))
+        try:
+            with tarfile.open(fileobj=io.BufferedReader(reader, CHUNK_SIZE), mode='r|gz') as tar:
+                safe_extract(tar, target_dir)
+            
+            if artifact_sha256 and reader.hexdigest() != artifact_sha256:
+                raise ValueError(f"Artifact checksum mismatch: {artifact_uri}")
+        except UnsafeArchiveError as e:
+            # The same archive is rejected on every retry
+            raise PermanentJobError(str(e)) from e
+        finally:
+            reader.close()
+    
     async def run_container(
         self,
         image_id: str,
         deployment_id: str,
         env_vars: Optional[Dict[str, str]] = None,
-        ports: Optional[Dict[str, int]] = None
+        ports: Optional[Dict[str, Optional[int]]] = None,
+        project_id: Optional[str] = None
     ) -> Optional[str]:
         """Run a container from an image.
         
@@ -113,19 +194,22 @@ class DockerExecutor:
             image_id: Docker image ID
             deployment_id: Deployment ID
             env_vars: Environment variables
-            ports: Port mappings (container_port -> host_port)
+            ports: Container ports to publish (keys); host ports are always
+                random so the old container keeps its port during the swap
+            project_id: Project ID
             
         Returns:
-            Container ID if successful
+            Container ID
         """
         try:
-            container_name = f"dprod-{deployment_id}"
+            # Unique name so the previous container keeps serving until the swap
+            container_name = f"dprod-{deployment_id}-{uuid.uuid4().hex[:8]}"
             
-            # Prepare port bindings
+            # Prepare port bindings (fixed host ports from older job messages are ignored)
             port_bindings = {}
             if ports:
-                for container_port, host_port in ports.items():
-                    port_bindings[f'{container_port}/tcp'] = host_port
+                for container_port in ports:
+                    port_bindings[f'{container_port}/tcp'] = None
             
             logger.info(f"🚀 Starting container: {container_name}")
             
@@ -138,7 +222,8 @@ class DockerExecutor:
                 detach=True,
                 remove=False,
                 network=config.CONTAINER_NETWORK,
-                restart_policy={"Name": "unless-stopped"}
+                restart_policy={"Name": "unless-stopped"},
+                labels={"dprod": "true", "project_id": project_id or deployment_id}
             )
             
             logger.info(f"✅ Container started: {container.id}")
@@ -146,11 +231,66 @@ class DockerExecutor:
             
         except APIError as e:
             logger.error(f"❌ Error starting container: {e}")
-            return None
+            raise
             
         except Exception as e:
             logger.error(f"❌ Unexpected error: {e}", exc_info=True)
-            return None
+            raise
+    
+    async def get_image_ports(self, image_id: str) -> Dict[str, Optional[int]]:
+        """Get the image's exposed ports mapped to random host ports.
+        
+        Args:
+            image_id: Docker image ID
+            
+        Returns:
+            Port mappings (container_port -> None)
+        """
+        image = await asyncio.to_thread(self.client.images.get, image_id)
+        exposed = (image.attrs.get('Config') or {}).get('ExposedPorts') or {}
+        return {port.split('/')[0]: None for port in exposed}
+    
+    async def swap_containers(
+        self,
+        project_id: str,
+        container_id: str,
+        timeout: int = 30
+    ) -> int:
+        """Blue/green swap: retire the project's other containers once the new one runs.
+        
+        Args:
+            project_id: Project ID label of the containers
+            container_id: ID of the newly started container
+            timeout: Seconds to wait for the new container to be running
+            
+        Returns:
+            Number of retired containers
+        """
+        container = self.client.containers.get(container_id)
+        for _ in range(timeout):
+            await asyncio.to_thread(container.reload)
+            if container.status == 'running':
+                break
+            if container.status in ('exited', 'dead'):
+                raise RuntimeError(f"New container exited during start: {container_id[:12]}")
+            await asyncio.sleep(1)
+        else:
+            raise RuntimeError(f"New container not running after {timeout}s: {container_id[:12]}")
+        
+        previous = await asyncio.to_thread(
+            self.client.containers.list,
+            filters={'label': f'project_id={project_id}'}
+        )
+        retired = 0
+        for old in previous:
+            if old.id == container.id:
+                continue
+            if await self.stop_container(old.id) and await self.remove_container(old.id):
+                retired += 1
+        
+        if retired:
+            logger.info(f"🔁 Swapped {project_id} to {container_id[:12]}, retired {retired} container(s)")
+        return retired
     
     async def get_container_info(self, container_id: str) -> Optional[Dict[str, Any]]:
         """Get container information.
@@ -252,6 +392,30 @@ class DockerExecutor:
             logger.error(f"❌ Error stopping container: {e}")
             return False
     
+    async def restart_container(self, container_id: str, timeout: int = 10) -> bool:
+        """Restart a container.
+        
+        Args:
+            container_id: Container ID
+            timeout: Seconds to wait for stop before killing
+            
+        Returns:
+            True if successful
+        """
+        try:
+            container = self.client.containers.get(container_id)
+            await asyncio.to_thread(container.restart, timeout=timeout)
+            logger.info(f"🔄 Container restarted: {container_id}")
+            return True
+            
+        except docker.errors.NotFound:
+            logger.warning(f"⚠️  Container not found: {container_id}")
+            return False
+            
+        except Exception as e:
+            logger.error(f"❌ Error restarting container: {e}")
+            return False
+    
     async def remove_container(self, container_id: str, force: bool = False) -> bool:
         """Remove a container.
         
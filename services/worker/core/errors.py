@@ -0,0 +1,90 @@
+"""Failure classification for deployment jobs."""
+import asyncio
+from typing import Optional
+
+import requests
+from botocore.exceptions import ClientError, EndpointConnectionError
+from docker.errors import APIError, BuildError, ImageNotFound, NotFound
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+
+# AWS error codes that clear up on their own
+TRANSIENT_AWS_ERRORS = {
+    "Throttling",
+    "ThrottlingException",
+    "RequestTimeout",
+    "ServiceUnavailable",
+    "InternalError",
+    "SlowDown",
+}
+
+
+class JobError(Exception):
+    """Base class for classified job failures."""
+
+
+class TransientJobError(JobError):
+    """Failure expected to succeed on retry (Docker daemon, database, network)."""
+
+    def __init__(self, message: str, retry_after: Optional[int] = None):
+        """
+        Args:
+            message: Failure description
+            retry_after: Minimum seconds before the job may be retried
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PermanentJobError(JobError):
+    """Failure that will repeat on every retry (bad source, failing build)."""
+
+
+class DeferJobError(JobError):
+    """Job cannot start yet (its owner is at the concurrency cap); not a failure."""
+
+    def __init__(self, message: str, delay: int):
+        """
+        Args:
+            message: Reason the job was deferred
+            delay: Seconds to wait before offering the job again
+        """
+        super().__init__(message)
+        self.delay = delay
+
+
+def is_transient(error: BaseException) -> bool:
+    """Decide whether a failed job is worth retrying.
+
+    Unknown errors are treated as permanent so a poison message is
+    dead-lettered instead of cycling through the queue.
+
+    Args:
+        error: Exception raised while processing the job
+
+    Returns:
+        True if the job should be retried
+    """
+    if isinstance(error, JobError):
+        return isinstance(error, TransientJobError)
+
+    # Build failures and missing images are caused by the job itself
+    if isinstance(error, (BuildError, ImageNotFound, NotFound)):
+        return False
+    if isinstance(error, APIError):
+        return error.status_code is None or error.status_code >= 500
+
+    # Docker daemon or artifact store unreachable
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, EndpointConnectionError):
+        return True
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in TRANSIENT_AWS_ERRORS
+
+    # Database connection dropped or failed over
+    if isinstance(error, (OperationalError, InterfaceError)):
+        return True
+    if isinstance(error, DBAPIError):
+        return bool(error.connection_invalidated)
+
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError, TimeoutError))
@@ -3,12 +3,17 @@ import asyncio
 import logging
 import signal
 import sys
+import time
 from typing import Dict, Any
 
 from .config import config
 from .sqs_poller import SQSPoller
 from .docker_executor import DockerExecutor
-from .status_updater import StatusUpdater
+from .status_updater import StatusUpdater, ClaimResult
+from .control_channel import ControlChannel
+from .cache_publisher import CachePublisher
+from . import metrics
+from .errors import TransientJobError, PermanentJobError, DeferJobError, is_transient
 
 # Configure logging
 logging.basicConfig(
@@ -31,23 +36,52 @@ class DeploymentWorker:
         self.sqs_poller = SQSPoller()
         self.docker_executor = DockerExecutor()
         self.status_updater = StatusUpdater()
+        self.control_channel = ControlChannel(
+            self.status_updater.async_session,
+            self.docker_executor
+        )
+        self.cache_publisher = CachePublisher(
+            self.status_updater.async_session,
+            self.docker_executor
+        )
         self.running = False
+        self.gc_task = None
+        self.cache_task = None
     
     async def handle_deployment_job(self, job: Dict[str, Any]) -> bool:
         """Handle a deployment job from SQS.
         
         Args:
-            job: Job data from SQS message
+            job: Job data from SQS message (``attempt`` is set by the poller)
             
         Returns:
-            True if successful, False otherwise
+            True if the job is done (or was already handled), False if it is malformed
+            
+        Raises:
+            DeferJobError: If the owning user is at the concurrency cap
+            TransientJobError: If the job failed but should be retried
+            PermanentJobError: If the job failed for good (deployment marked failed)
         """
         deployment_id = job.get('deployment_id')
         if not deployment_id:
             logger.error("❌ No deployment_id in job")
             return False
+        project_id = job.get('project_id', deployment_id)
+        
+        user_id = job.get('user_id')
+        claim = await self.status_updater.claim_deployment(deployment_id, user_id=user_id)
+        if claim == ClaimResult.THROTTLED:
+            raise DeferJobError(
+                f"User {user_id} already has {config.MAX_JOBS_PER_USER} deployment(s) building",
+                delay=config.USER_THROTTLE_DELAY
+            )
+        # Redelivered or duplicated messages are acknowledged without touching Docker
+        if claim != ClaimResult.CLAIMED:
+            logger.info(f"⏭️  Deployment {deployment_id} already claimed or finished, skipping")
+            return True
         
         logger.info(f"🚀 Processing deployment: {deployment_id}")
+        lease_task = asyncio.create_task(self._renew_lease(deployment_id))
         
         try:
             # Update status to building
@@ -59,37 +93,53 @@ class DeploymentWorker:
             
             # Extract job data
             project_files = job.get('project_files', {})
+            artifact_uri = job.get('artifact_uri')
             dockerfile_content = job.get('dockerfile_content')
             env_vars = job.get('environment', {})
             ports = job.get('ports', {})
+            image_id = job.get('image_id')
             
-            if not project_files:
-                raise ValueError("No project files provided")
-            
-            # Build Docker image
-            logger.info(f"🔨 Building image for {deployment_id}")
-            await self.status_updater.add_build_log(
-                deployment_id,
-                "Building Docker image..."
-            )
-            
-            image_id = await self.docker_executor.build_image(
-                deployment_id,
-                project_files,
-                dockerfile_content
-            )
-            
-            if not image_id:
-                raise RuntimeError("Image build failed")
-            
-            await self.status_updater.update_build_completed(
-                deployment_id,
-                image_id
-            )
-            await self.status_updater.add_build_log(
-                deployment_id,
-                f"Image built successfully: {image_id[:12]}"
-            )
+            if image_id:
+                # Rollback: start from the retained image, skip the build entirely
+                await self.status_updater.add_build_log(
+                    deployment_id,
+                    f"Rolling back to image {image_id[:19]}, skipping build"
+                )
+                if not ports:
+                    ports = await self.docker_executor.get_image_ports(image_id)
+            else:
+                if not project_files and not artifact_uri:
+                    raise ValueError("No project files provided")
+                
+                # Build Docker image
+                logger.info(f"🔨 Building image for {deployment_id}")
+                await self.status_updater.add_build_log(
+                    deployment_id,
+                    "Building Docker image..."
+                )
+                
+                build_started = time.monotonic()
+                image_id = await self.docker_executor.build_image(
+                    deployment_id,
+                    project_files,
+                    dockerfile_content,
+                    project_id=project_id,
+                    artifact_uri=artifact_uri,
+                    artifact_sha256=job.get('artifact_sha256')
+                )
+                metrics.BUILD_DURATION.observe(time.monotonic() - build_started)
+                
+                if not image_id:
+                    raise RuntimeError("Image build failed")
+                
+                await self.status_updater.update_build_completed(
+                    deployment_id,
+                    image_id
+                )
+                await self.status_updater.add_build_log(
+                    deployment_id,
+                    f"Image built successfully: {image_id[:12]}"
+                )
             
             # Run container
             logger.info(f"🚀 Starting container for {deployment_id}")
@@ -98,16 +148,22 @@ class DeploymentWorker:
                 "Starting container..."
             )
             
+            container_started = time.monotonic()
             container_id = await self.docker_executor.run_container(
                 image_id,
                 deployment_id,
                 env_vars,
-                ports
+                ports,
+                project_id=project_id
             )
             
             if not container_id:
                 raise RuntimeError("Container start failed")
             
+            # Blue/green: retire previous containers once the new one is up
+            await self.docker_executor.swap_containers(project_id, container_id)
+            metrics.START_DURATION.observe(time.monotonic() - container_started)
+            
             # Get container info
             container_info = await self.docker_executor.get_container_info(container_id)
             
@@ -143,6 +199,24 @@ class DeploymentWorker:
             
         except Exception as e:
             error_msg = str(e)
+            attempt = int(job.get('attempt', 1))
+            
+            if is_transient(e) and attempt < config.MAX_JOB_ATTEMPTS:
+                logger.warning(
+                    f"⚠️  Deployment {deployment_id} attempt {attempt} failed, will retry: {error_msg}"
+                )
+                await self.status_updater.add_build_log(
+                    deployment_id,
+                    f"⚠️  Attempt {attempt}/{config.MAX_JOB_ATTEMPTS} failed, retrying: {error_msg}",
+                    level='warning'
+                )
+                # Hand the claim back; if that fails too, wait out the lease instead
+                released = await self.status_updater.release_deployment(deployment_id)
+                raise TransientJobError(
+                    error_msg,
+                    retry_after=None if released else config.JOB_LEASE_SECONDS
+                ) from e
+            
             logger.error(f"❌ Deployment failed: {deployment_id} - {error_msg}", exc_info=True)
             
             await self.status_updater.update_deployment_failed(
@@ -151,10 +225,22 @@ class DeploymentWorker:
             )
             await self.status_updater.add_build_log(
                 deployment_id,
-                f"❌ Deployment failed: {error_msg}"
+                f"❌ Deployment failed after {attempt} attempt(s): {error_msg}",
+                level='error'
             )
             
-            return False
+            raise PermanentJobError(error_msg) from e
+        
+        finally:
+            lease_task.cancel()
+    
+    async def _renew_lease(self, deployment_id: str) -> None:
+        """Keep this worker's claim on a deployment alive while it is processed."""
+        while True:
+            await asyncio.sleep(config.LEASE_RENEW_INTERVAL)
+            if not await self.status_updater.renew_lease(deployment_id):
+                logger.warning(f"⚠️  Lost lease on deployment {deployment_id}")
+                return
     
     async def start(self):
         """Start the worker."""
@@ -174,9 +260,21 @@ class DeploymentWorker:
             logger.error(f"❌ Configuration error: {e}")
             return
         
+        metrics.start_metrics_server()
+        self.status_updater.start()
+        
+        # Prune old images and exited containers in the background
+        if self.docker_executor.gc:
+            self.gc_task = asyncio.create_task(self.docker_executor.gc.run_forever())
+        # Advertise cached layers so the API can route builds here
+        self.cache_task = asyncio.create_task(self.cache_publisher.run_forever())
+        
         # Start polling
         try:
-            await self.sqs_poller.start(self.handle_deployment_job)
+            await self.sqs_poller.start(
+                self.handle_deployment_job,
+                command_handler=self.control_channel.poll
+            )
         except KeyboardInterrupt:
             logger.info("⌨️  Received keyboard interrupt")
         except Exception as e:
@@ -195,6 +293,11 @@ class DeploymentWorker:
         # Stop SQS poller
         await self.sqs_poller.stop()
         
+        if self.gc_task:
+            self.gc_task.cancel()
+        if self.cache_task:
+            self.cache_task.cancel()
+        
         # Cleanup
         self.docker_executor.cleanup()
         await self.status_updater.cleanup()
@@ -0,0 +1,55 @@
+"""Prometheus metrics exported by the worker."""
+import logging
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+# Builds range from seconds (warm cache) to tens of minutes
+DURATION_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, float("inf"))
+
+SLOTS = Gauge(
+    "dprod_worker_slots",
+    "Maximum number of jobs this worker runs concurrently"
+)
+JOBS_IN_FLIGHT = Gauge(
+    "dprod_worker_jobs_in_flight",
+    "Jobs currently being processed"
+)
+JOBS = Counter(
+    "dprod_worker_jobs_total",
+    "Jobs finished, by outcome and failure reason",
+    ["outcome", "reason"]
+)
+QUEUE_WAIT = Histogram(
+    "dprod_worker_queue_wait_seconds",
+    "Time from a job being enqueued to a worker starting it",
+    ["queue"],
+    buckets=DURATION_BUCKETS
+)
+BUILD_DURATION = Histogram(
+    "dprod_worker_build_duration_seconds",
+    "Docker image build duration",
+    buckets=DURATION_BUCKETS
+)
+START_DURATION = Histogram(
+    "dprod_worker_start_duration_seconds",
+    "Container start and blue/green swap duration",
+    buckets=DURATION_BUCKETS
+)
+
+
+def failure_reason(error: BaseException) -> str:
+    """Label value for a failed job: the underlying exception type."""
+    return type(error.__cause__ or error).__name__
+
+
+def start_metrics_server() -> None:
+    """Serve /metrics on METRICS_PORT (disabled when 0)."""
+    SLOTS.set(config.MAX_CONCURRENT_JOBS)
+    if not config.METRICS_PORT:
+        return
+    start_http_server(config.METRICS_PORT)
+    logger.info(f"📈 Metrics available on :{config.METRICS_PORT}/metrics")
@@ -1,137 +1,431 @@
-"""SQS message poller for deployment jobs."""
+"""Queue poller for deployment jobs (SQS, Redis Streams or in-memory)."""
 import asyncio
 import json
 import logging
-from typing import Optional, Dict, Any, List
-import boto3
-from botocore.exceptions import ClientError
+import random
+import time
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Set, Tuple
+
+# Import shared modules
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
+from services.shared.core.job_queue import get_job_queue, QueueMessage
 
 from .config import config
+from .errors import TransientJobError, DeferJobError, is_transient
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
+# SQS returns at most 10 messages per ReceiveMessage call
+SQS_MAX_BATCH = 10
+
 
 class SQSPoller:
-    """Poll SQS queue for deployment jobs."""
+    """Poll the deployment queues for jobs.
+    
+    Talks to the backend selected by QUEUE_BACKEND through the shared
+    JobQueue interface, so the same scheduling, retry and dead-letter
+    logic runs against SQS, Redis Streams or an in-memory queue.
+    """
     
-    def __init__(self):
-        """Initialize SQS client."""
-        self.sqs = boto3.client('sqs', region_name=config.AWS_REGION)
+    def __init__(self, job_queue=None):
+        """Initialize poller.
+        
+        Args:
+            job_queue: Queue backend (defaults to get_job_queue())
+        """
+        self.job_queue = job_queue or get_job_queue(config.QUEUE_BACKEND)
         self.queue_url = config.SQS_QUEUE_URL
+        
+        # (priority, url, weight), highest priority first
+        weights = config.queue_weights()
+        self.queues: List[Tuple[str, str, int]] = []
+        for priority, url in (
+            ("affinity", config.WORKER_QUEUE_URL),
+            ("high", config.SQS_HIGH_PRIORITY_QUEUE_URL),
+            ("normal", config.SQS_QUEUE_URL),
+            ("low", config.SQS_LOW_PRIORITY_QUEUE_URL),
+        ):
+            if url and url not in {queue[1] for queue in self.queues}:
+                self.queues.append((priority, url, weights.get(priority, 1)))
+        self._credits: Dict[str, int] = {priority: 0 for priority, _, _ in self.queues}
+        self._queue_names: Dict[str, str] = {url: priority for priority, url, _ in self.queues}
+        # Long-polled when everything is empty: the highest shared queue, since
+        # only this worker's affinity queue would never see urgent work
+        shared = [url for priority, url, _ in self.queues if priority != "affinity"]
+        self._wait_queue = shared[0] if shared else self.queues[0][1]
+        
         self.running = False
+        self._stopped = asyncio.Event()
+        self.command_task: Optional[asyncio.Task] = None
         
-    async def start(self, message_handler):
+    async def start(self, message_handler, command_handler=None):
         """Start polling for messages.
         
         Args:
             message_handler: Async function to handle messages
+            command_handler: Optional async function polling the control channel
         """
         self.running = True
-        logger.info(f"🚀 Worker {config.WORKER_ID} starting SQS poller...")
-        logger.info(f"📥 Polling queue: {self.queue_url}")
+        self._stopped.clear()
+        logger.info(f"🚀 Worker {config.WORKER_ID} starting {config.QUEUE_BACKEND} poller...")
+        for priority, url, weight in self.queues:
+            logger.info(f"📥 Polling {priority} queue (weight {weight}): {url}")
+        
+        # Control commands are polled independently so builds never delay them
+        if command_handler:
+            self.command_task = asyncio.create_task(self._poll_commands(command_handler))
+        
+        # Slot scheduler: keep MAX_CONCURRENT_JOBS jobs in flight and refill a
+        # slot as soon as a job finishes, instead of waiting for the whole batch
+        jobs: Set[asyncio.Task] = set()
+        receives: Dict[asyncio.Task, int] = {}
+        stop_waiter = asyncio.create_task(self._stopped.wait())
         
         while self.running:
-            try:
-                # Poll for messages
-                messages = await self._receive_messages()
-                
-                if messages:
-                    logger.info(f"📬 Received {len(messages)} message(s)")
-                    
-                    # Process messages concurrently (up to MAX_CONCURRENT_JOBS)
-                    tasks = []
-                    for message in messages[:config.MAX_CONCURRENT_JOBS]:
-                        task = asyncio.create_task(
+            free_slots = config.MAX_CONCURRENT_JOBS - len(jobs) - sum(receives.values())
+            if free_slots > 0:
+                # Long-poll only for the capacity that is actually free
+                count = min(free_slots, SQS_MAX_BATCH)
+                receives[asyncio.create_task(self._receive_messages(count))] = count
+            
+            done, _ = await asyncio.wait(
+                jobs | set(receives) | {stop_waiter},
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            
+            for task in done:
+                if task in receives:
+                    del receives[task]
+                    messages = task.result()
+                    if messages:
+                        logger.info(f"📬 Received {len(messages)} message(s)")
+                    for message in messages:
+                        jobs.add(asyncio.create_task(
                             self._process_message(message, message_handler)
-                        )
-                        tasks.append(task)
-                    
-                    # Wait for all tasks to complete
-                    if tasks:
-                        await asyncio.gather(*tasks, return_exceptions=True)
-                else:
-                    # No messages, wait before polling again
-                    await asyncio.sleep(config.POLL_INTERVAL)
-                    
-            except Exception as e:
-                logger.error(f"❌ Error in polling loop: {e}", exc_info=True)
-                await asyncio.sleep(config.POLL_INTERVAL)
+                        ))
+                elif task in jobs:
+                    jobs.discard(task)
+        
+        # Shutdown: stop receiving, let in-flight jobs finish
+        for task in receives:
+            task.cancel()
+        if jobs:
+            logger.info(f"⏳ Waiting for {len(jobs)} in-flight job(s) to finish...")
+            await asyncio.gather(*jobs, return_exceptions=True)
     
     async def stop(self):
         """Stop polling."""
-        logger.info("🛑 Stopping SQS poller...")
+        logger.info("🛑 Stopping queue poller...")
         self.running = False
+        self._stopped.set()
+        if self.command_task:
+            self.command_task.cancel()
     
-    async def _receive_messages(self) -> List[Dict[str, Any]]:
-        """Receive messages from SQS.
+    async def _poll_commands(self, command_handler):
+        """Poll the control channel until stopped.
         
+        Args:
+            command_handler: Async function executing pending commands
+        """
+        while self.running:
+            try:
+                executed = await command_handler()
+                if executed:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error polling control commands: {e}", exc_info=True)
+            await asyncio.sleep(config.COMMAND_POLL_INTERVAL)
+    
+    def _next_queue(self) -> Tuple[str, str, int]:
+        """Pick the queue to receive from next (smooth weighted round-robin).
+        
+        Over any window each queue gets receives in proportion to its weight,
+        interleaved rather than in bursts, so low-priority work still drains
+        while high-priority work is flowing.
+        """
+        total = 0
+        best = None
+        for queue in self.queues:
+            priority, _, weight = queue
+            self._credits[priority] += weight
+            total += weight
+            if best is None or self._credits[priority] > self._credits[best[0]]:
+                best = queue
+        self._credits[best[0]] -= total
+        return best
+    
+    async def _receive_messages(self, max_messages: int) -> List[QueueMessage]:
+        """Receive messages from the deployment queues.
+        
+        With a single queue this is a plain long poll. With priority queues
+        the weighted pick is tried first, then the remaining queues in
+        priority order, without waiting; when all are empty the highest
+        priority shared queue (not the affinity queue) is long-polled briefly
+        so new urgent work is seen first.
+        
+        Args:
+            max_messages: Number of free slots to fill (1-10)
+            
         Returns:
             List of messages
         """
         try:
-            response = await asyncio.to_thread(
-                self.sqs.receive_message,
-                QueueUrl=self.queue_url,
-                MaxNumberOfMessages=config.MAX_CONCURRENT_JOBS,
-                WaitTimeSeconds=20,  # Long polling
-                VisibilityTimeout=config.MESSAGE_VISIBILITY_TIMEOUT,
-                AttributeNames=['All'],
-                MessageAttributeNames=['All']
-            )
+            if len(self.queues) == 1:
+                return await self._receive_from(self.queues[0][1], max_messages, wait_seconds=20)
             
-            return response.get('Messages', [])
+            first = self._next_queue()
+            for _, url, _ in [first] + [queue for queue in self.queues if queue is not first]:
+                messages = await self._receive_from(url, max_messages, wait_seconds=0)
+                if messages:
+                    return messages
             
-        except ClientError as e:
+            return await self._receive_from(
+                self._wait_queue,
+                max_messages,
+                wait_seconds=min(20, config.POLL_INTERVAL)
+            )
+            
+        except Exception as e:
             logger.error(f"❌ Error receiving messages: {e}")
+            await asyncio.sleep(config.POLL_INTERVAL)
             return []
     
-    async def _process_message(self, message: Dict[str, Any], handler):
+    async def _receive_from(
+        self,
+        queue_url: str,
+        max_messages: int,
+        wait_seconds: int
+    ) -> List[QueueMessage]:
+        """Receive messages from one queue."""
+        return await self.job_queue.receive(
+            queue_url,
+            max_messages=max_messages,
+            wait_seconds=wait_seconds,
+            visibility_timeout=config.MESSAGE_VISIBILITY_TIMEOUT
+        )
+    
+    async def _process_message(self, message: QueueMessage, handler):
         """Process a single message.
         
+        Successful jobs are deleted. Transient failures are retried with
+        exponential backoff by shortening the message's visibility; permanent
+        failures, malformed messages and jobs out of attempts are moved to the
+        dead-letter queue so they stop cycling through the main queue.
+        
         Args:
-            message: SQS message
+            message: Received message
             handler: Message handler function
         """
-        receipt_handle = message['ReceiptHandle']
-        message_id = message['MessageId']
+        message_id = message.id
+        attempt = message.receive_count
+        body: Optional[Dict[str, Any]] = None
+        
+        # Keep the message hidden for as long as the job actually runs
+        heartbeat = asyncio.create_task(self._heartbeat(message))
+        metrics.JOBS_IN_FLIGHT.inc()
+        
+        if message.sent_at:
+            metrics.QUEUE_WAIT.labels(
+                queue=self._queue_names.get(message.queue, "unknown")
+            ).observe(max(0.0, time.time() - message.sent_at))
         
         try:
             # Parse message body
-            body = json.loads(message['Body'])
-            logger.info(f"🔄 Processing job: {body.get('deployment_id', 'unknown')}")
+            body = json.loads(message.body)
+            # Deferred jobs are re-sent, which resets SQS's receive count
+            attempt += int(body.pop('previous_attempts', 0))
+            body['attempt'] = attempt
+            logger.info(f"🔄 Processing job: {body.get('deployment_id', 'unknown')} (attempt {attempt})")
             
             # Handle the message
-            success = await handler(body)
+            try:
+                success = await handler(body)
+            finally:
+                heartbeat.cancel()
             
             if success:
                 # Delete message from queue
-                await self._delete_message(receipt_handle)
+                await self._delete_message(message)
                 logger.info(f"✅ Job completed: {message_id}")
+                metrics.JOBS.labels(outcome="completed", reason="").inc()
             else:
-                logger.warning(f"⚠️  Job failed, message will be retried: {message_id}")
+                await self._dead_letter(message, body, "Job rejected by handler", attempt)
+                metrics.JOBS.labels(outcome="failed", reason="Rejected").inc()
                 
         except json.JSONDecodeError as e:
             logger.error(f"❌ Invalid JSON in message {message_id}: {e}")
-            # Delete invalid messages
-            await self._delete_message(receipt_handle)
+            await self._dead_letter(message, body, e, attempt)
+            metrics.JOBS.labels(outcome="failed", reason="InvalidMessage").inc()
+            
+        except DeferJobError as e:
+            logger.info(f"⏸️  Deferring {message_id} for {e.delay}s: {e}")
+            await self._defer(message, body, attempt, e.delay)
+            metrics.JOBS.labels(outcome="deferred", reason="UserConcurrencyCap").inc()
             
         except Exception as e:
-            logger.error(f"❌ Error processing message {message_id}: {e}", exc_info=True)
-            # Message will become visible again after visibility timeout
+            if is_transient(e) and attempt < config.MAX_JOB_ATTEMPTS:
+                retry_after = e.retry_after if isinstance(e, TransientJobError) else None
+                await self._retry_later(message, attempt, retry_after)
+                metrics.JOBS.labels(outcome="retried", reason=metrics.failure_reason(e)).inc()
+            else:
+                logger.error(f"❌ Job failed permanently {message_id}: {e}")
+                await self._dead_letter(message, body, e, attempt)
+                metrics.JOBS.labels(outcome="failed", reason=metrics.failure_reason(e)).inc()
+            
+        finally:
+            heartbeat.cancel()
+            metrics.JOBS_IN_FLIGHT.dec()
     
-    async def _delete_message(self, receipt_handle: str):
-        """Delete message from queue.
+    async def _retry_later(
+        self,
+        message: QueueMessage,
+        attempt: int,
+        retry_after: Optional[int] = None
+    ):
+        """Make a failed message visible again after an exponential backoff.
         
         Args:
-            receipt_handle: Message receipt handle
+            message: Received message
+            attempt: Number of times the message has been received
+            retry_after: Minimum delay requested by the handler
         """
+        delay = min(config.RETRY_MAX_DELAY, config.RETRY_BASE_DELAY * 2 ** (attempt - 1))
+        # Jitter spreads retries of jobs that failed together (e.g. a Docker restart)
+        delay = random.randint(delay // 2, delay)
+        if retry_after:
+            delay = max(delay, retry_after)
+        
+        await self._change_visibility(message, delay)
+        logger.warning(f"🔁 Job {message.id} failed (attempt {attempt}), retrying in {delay}s")
+    
+    async def _defer(
+        self,
+        message: QueueMessage,
+        body: Dict[str, Any],
+        attempt: int,
+        delay: int
+    ):
+        """Put a job that could not start yet back on its queue.
+        
+        The job is re-sent with a delay instead of hidden, so waiting for a
+        slot does not count towards MAX_JOB_ATTEMPTS.
+        
+        Args:
+            message: Received message
+            body: Parsed message body
+            attempt: Attempt number of this delivery
+            delay: Seconds before the job is offered again
+        """
+        job = {key: value for key, value in body.items() if key != 'attempt'}
+        job['previous_attempts'] = attempt - 1
+        
         try:
-            await asyncio.to_thread(
-                self.sqs.delete_message,
-                QueueUrl=self.queue_url,
-                ReceiptHandle=receipt_handle
+            await self.job_queue.send(
+                message.queue,
+                json.dumps(job),
+                delay_seconds=delay,
+                attributes=message.attributes
             )
-        except ClientError as e:
+        except Exception as e:
+            logger.error(f"❌ Error re-queueing {message.id}, hiding it instead: {e}")
+            await self._change_visibility(message, delay)
+            return
+        
+        await self._delete_message(message)
+    
+    async def _change_visibility(self, message: QueueMessage, timeout: int):
+        """Set how long until a message becomes visible again."""
+        try:
+            await self.job_queue.extend_visibility(message, timeout)
+        except Exception as e:
+            logger.error(f"❌ Error changing visibility of {message.id}: {e}")
+    
+    async def _dead_letter(
+        self,
+        message: QueueMessage,
+        body: Optional[Dict[str, Any]],
+        error,
+        attempt: int
+    ):
+        """Move a message to the dead-letter queue with its failure context.
+        
+        The original message is only deleted once the dead letter is stored
+        (or when no dead-letter queue is configured), so nothing is lost if
+        the dead-letter queue is briefly unavailable.
+        
+        Args:
+            message: Received message
+            body: Parsed message body (None if it could not be parsed)
+            error: Exception or description of the failure
+            attempt: Number of times the message has been received
+        """
+        if config.DEAD_LETTER_QUEUE_URL:
+            dead_letter = {
+                "job": body if body is not None else message.body,
+                "failure": {
+                    "error": str(error),
+                    "error_type": type(error).__name__ if isinstance(error, BaseException) else None,
+                    "attempts": attempt,
+                    "worker_id": config.WORKER_ID,
+                    "source_queue": message.queue,
+                    "message_id": message.id,
+                    "failed_at": datetime.utcnow().isoformat()
+                }
+            }
+            try:
+                await self.job_queue.send(
+                    config.DEAD_LETTER_QUEUE_URL,
+                    json.dumps(dead_letter, default=str)
+                )
+                logger.warning(f"🪦 Moved {message.id} to dead-letter queue after {attempt} attempt(s)")
+            except Exception as e:
+                logger.error(f"❌ Error dead-lettering {message.id}, leaving it on the queue: {e}")
+                return
+        else:
+            logger.error(f"🪦 No dead-letter queue configured, dropping {message.id}: {error}")
+        
+        await self._delete_message(message)
+    
+    async def _heartbeat(self, message: QueueMessage):
+        """Periodically extend a message's visibility while its job runs.
+        
+        Stops when cancelled (job finished), when the worker is shutting down
+        (the last extension still covers the drain), or when the queue reports
+        the receipt is no longer valid.
+        
+        Args:
+            message: Received message
+        """
+        try:
+            while True:
+                await asyncio.sleep(config.VISIBILITY_HEARTBEAT_INTERVAL)
+                if not self.running:
+                    logger.info(f"💤 Shutting down, no longer extending {message.id}")
+                    return
+                
+                await self.job_queue.extend_visibility(message, config.MESSAGE_VISIBILITY_TIMEOUT)
+                logger.debug(f"💓 Extended visibility of {message.id}")
+                
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️  Stopped visibility heartbeat for {message.id}: {e}")
+    
+    async def _delete_message(self, message: QueueMessage):
+        """Acknowledge a message on the queue it was received from.
+        
+        Args:
+            message: Received message
+        """
+        try:
+            await self.job_queue.ack(message)
+        except Exception as e:
             logger.error(f"❌ Error deleting message: {e}")
     
     async def send_message(self, message: Dict[str, Any]) -> Optional[str]:
@@ -144,13 +438,7 @@ class SQSPoller:
             Message ID if successful
         """
         try:
-            response = await asyncio.to_thread(
-                self.sqs.send_message,
-                QueueUrl=self.queue_url,
-                MessageBody=json.dumps(message)
-            )
-            return response.get('MessageId')
-            
-        except ClientError as e:
+            return await self.job_queue.send(self.queue_url, json.dumps(message))
+        except Exception as e:
             logger.error(f"❌ Error sending message: {e}")
             return None
@@ -1,24 +1,96 @@
 """Database status updater for deployment jobs."""
+import asyncio
 import logging
-from typing import Optional, Dict, Any
-from datetime import datetime
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import datetime, timedelta
+from uuid import UUID
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import select, update
+from sqlalchemy import select, update, insert, func, or_, and_
 
 # Import shared models
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
-from services.shared.core.models import Deployment
+from services.shared.core.models import Deployment, DeploymentCommand, DeploymentEvent, DeploymentStatus, Project
+from services.shared.core.deployment_events import ensure_event_partitions, EVENT_LEVELS
+from services.shared.core.status_events import notify_status
 
 from .config import config
 
 logger = logging.getLogger(__name__)
 
 
+class ClaimResult(str, Enum):
+    """Outcome of trying to claim a deployment."""
+    CLAIMED = "claimed"
+    TAKEN = "taken"  # Claimed by another worker or already finished
+    THROTTLED = "throttled"  # Owner is at MAX_JOBS_PER_USER
+
+
+# Statuses after which nothing more is written for a job; flushed immediately
+TERMINAL_STATUSES = {DeploymentStatus.LIVE.value, DeploymentStatus.ERROR.value}
+
+# Statuses a deployment may be in when it moves to the key. Checked in the
+# UPDATE itself so a late or replayed write can't move a job backwards.
+TRANSITIONS = {
+    DeploymentStatus.BUILDING.value: (
+        DeploymentStatus.CREATED.value,
+        DeploymentStatus.QUEUED.value,
+        DeploymentStatus.BUILDING.value,
+    ),
+    DeploymentStatus.DEPLOYING.value: (
+        DeploymentStatus.BUILDING.value,
+        DeploymentStatus.DEPLOYING.value,
+    ),
+    # Rollbacks go straight from building to live
+    DeploymentStatus.LIVE.value: (
+        DeploymentStatus.BUILDING.value,
+        DeploymentStatus.DEPLOYING.value,
+    ),
+    DeploymentStatus.ERROR.value: (
+        DeploymentStatus.CREATED.value,
+        DeploymentStatus.QUEUED.value,
+        DeploymentStatus.BUILDING.value,
+        DeploymentStatus.DEPLOYING.value,
+    ),
+}
+
+
+@dataclass
+class _PendingWrite:
+    """Buffered changes for one deployment."""
+    status: Optional[str] = None
+    values: Dict[str, Any] = field(default_factory=dict)
+    lines: List[Tuple[datetime, str, str]] = field(default_factory=list)  # (created_at, level, message)
+    
+    def merge(self, newer: "_PendingWrite") -> "_PendingWrite":
+        """Apply changes buffered after this one on top of it."""
+        return _PendingWrite(
+            status=newer.status or self.status,
+            values={**self.values, **newer.values},
+            lines=self.lines + newer.lines
+        )
+
+
 class StatusUpdater:
-    """Update deployment status in database."""
+    """Update deployment status in database.
+    
+    Status transitions and build log lines go through a write-behind
+    buffer: changes are coalesced per deployment and written with one
+    UPDATE per deployment every STATUS_FLUSH_INTERVAL seconds (sooner once
+    STATUS_FLUSH_MAX_LINES log lines are pending). Terminal states are
+    flushed immediately. Claims and lease changes bypass the buffer.
+    
+    Each flush is a single guarded UPDATE ... RETURNING per deployment: a
+    transition only applies while this worker holds the deployment and it
+    is in one of the TRANSITIONS source states. Log lines are appended to
+    deployment_events; the same UPDATE reserves their sequence numbers by
+    bumping deployments.log_seq. Applied transitions are announced with
+    NOTIFY (see services.shared.core.status_events).
+    """
     
     def __init__(self):
         """Initialize database connection."""
@@ -34,55 +106,405 @@ class StatusUpdater:
             class_=AsyncSession,
             expire_on_commit=False
         )
+        
+        self._pending: Dict[str, _PendingWrite] = {}
+        self._pending_lines = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_wanted = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._partition_task: Optional[asyncio.Task] = None
     
-    async def update_status(
+    def start(self) -> None:
+        """Start the background flush and partition maintenance loops."""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+        if self._partition_task is None:
+            self._partition_task = asyncio.create_task(self._partition_loop())
+    
+    async def _partition_loop(self) -> None:
+        """Keep monthly deployment_events partitions ahead of the clock."""
+        while True:
+            try:
+                async with self.async_session() as session:
+                    await ensure_event_partitions(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Failed to ensure event partitions: {e}")
+            await asyncio.sleep(config.EVENT_PARTITION_INTERVAL)
+    
+    async def _flush_loop(self) -> None:
+        """Flush on the interval, or early when the size threshold is hit."""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wanted.wait(), timeout=config.STATUS_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wanted.clear()
+            await self.flush()
+    
+    def _buffer(
         self,
         deployment_id: str,
-        status: str,
-        additional_data: Optional[Dict[str, Any]] = None
-    ) -> bool:
-        """Update deployment status.
+        status: Optional[str] = None,
+        values: Optional[Dict[str, Any]] = None,
+        line: Optional[Tuple[datetime, str, str]] = None
+    ) -> None:
+        """Queue a change for the next flush."""
+        pending = self._pending.setdefault(str(deployment_id), _PendingWrite())
+        if status:
+            pending.status = status
+        if values:
+            # Columns this schema doesn't have are dropped, as before
+            pending.values.update({k: v for k, v in values.items() if hasattr(Deployment, k)})
+        if line is not None:
+            pending.lines.append(line)
+            self._pending_lines += 1
+            if self._pending_lines >= config.STATUS_FLUSH_MAX_LINES:
+                self._flush_wanted.set()
+    
+    async def flush(self, deployment_id: Optional[str] = None) -> bool:
+        """Write buffered changes.
+        
+        Args:
+            deployment_id: Only flush this deployment (default: all)
+            
+        Returns:
+            True if the buffered changes were written
+        """
+        async with self._flush_lock:
+            if deployment_id is None:
+                batch, self._pending = self._pending, {}
+            else:
+                pending = self._pending.pop(str(deployment_id), None)
+                batch = {str(deployment_id): pending} if pending else {}
+            if not batch:
+                return True
+            self._pending_lines -= sum(len(pending.lines) for pending in batch.values())
+            
+            now = datetime.utcnow()
+            try:
+                applied = []
+                async with self.async_session() as session:
+                    for dep_id, pending in batch.items():
+                        status = await self._write(session, dep_id, pending, now)
+                        if status:
+                            applied.append((dep_id, status))
+                    await session.commit()
+                for dep_id, status in applied:
+                    logger.info(f"✅ Status updated: {dep_id} -> {status}")
+                logger.debug(f"💾 Flushed {len(batch)} deployment(s)")
+                return True
+                
+            except Exception as e:
+                logger.error(f"❌ Error flushing status updates, will retry: {e}")
+                # Keep the batch ahead of anything buffered while we were writing
+                for dep_id, pending in batch.items():
+                    newer = self._pending.get(dep_id)
+                    self._pending[dep_id] = pending.merge(newer) if newer else pending
+                    self._pending_lines += len(pending.lines)
+                return False
+    
+    async def _write(
+        self,
+        session: AsyncSession,
+        deployment_id: str,
+        pending: _PendingWrite,
+        now: datetime
+    ) -> Optional[str]:
+        """Apply one deployment's buffered changes inside ``session``.
+        
+        Returns:
+            The status written, or None if there was no transition or it was rejected
+        """
+        count = len(pending.lines)
+        values: Dict[str, Any] = {'updated_at': now}
+        if count:
+            # Reserve a contiguous block of sequence numbers for the lines
+            values['log_seq'] = Deployment.log_seq + count
+        
+        row = None
+        applied = None
+        if pending.status:
+            stmt = (
+                update(Deployment)
+                .where(
+                    Deployment.id == deployment_id,
+                    Deployment.worker_id == config.WORKER_ID
+                )
+                .values(status=pending.status, **pending.values, **values)
+                .returning(Deployment.status, Deployment.log_seq, Deployment.project_id)
+            )
+            if pending.status in TRANSITIONS:
+                stmt = stmt.where(Deployment.status.in_(TRANSITIONS[pending.status]))
+            row = (await session.execute(stmt)).one_or_none()
+            if row is not None:
+                applied = row.status
+                error = pending.values.get('error')
+                await notify_status(
+                    session,
+                    deployment_id,
+                    row.status,
+                    updated_at=now,
+                    url=pending.values.get('url'),
+                    error=error[:500] if error else None
+                )
+                if row.status == DeploymentStatus.LIVE.value:
+                    await self._retire_previous(session, deployment_id, row.project_id, now)
+            else:
+                logger.warning(
+                    f"⚠️  Ignoring transition of {deployment_id} to {pending.status}: "
+                    f"not held by this worker or already past it"
+                )
+        
+        if row is None and (count or not pending.status):
+            # Log lines are kept even when their transition was rejected
+            extra = {} if pending.status else pending.values
+            row = (await session.execute(
+                update(Deployment)
+                .where(Deployment.id == deployment_id)
+                .values(**extra, **values)
+                .returning(Deployment.status, Deployment.log_seq)
+            )).one_or_none()
+        
+        if not count:
+            return applied
+        if row is None:
+            logger.warning(f"⚠️  Dropping {count} log line(s) for unknown deployment {deployment_id}")
+            return applied
+        
+        last_seq = row.log_seq
+        await session.execute(
+            insert(DeploymentEvent),
+            [
+                {
+                    'deployment_id': UUID(deployment_id),
+                    'seq': last_seq - count + offset + 1,
+                    'created_at': created_at,
+                    'level': level,
+                    'message': message,
+                    'worker_id': config.WORKER_ID,
+                }
+                for offset, (created_at, level, message) in enumerate(pending.lines)
+            ]
+        )
+        return applied
+    
+    async def _retire_previous(
+        self,
+        session: AsyncSession,
+        deployment_id: str,
+        project_id: UUID,
+        now: datetime
+    ) -> None:
+        """Stop the project's other live deployments in the transaction that set ``deployment_id`` live.
+        
+        Containers on this host are removed by ``swap_containers``; a
+        deployment served by another worker gets a stop command on the
+        control channel, addressed to that worker.
+        """
+        result = await session.execute(
+            update(Deployment)
+            .where(
+                Deployment.project_id == project_id,
+                Deployment.status == DeploymentStatus.LIVE.value,
+                Deployment.id != deployment_id
+            )
+            .values(status=DeploymentStatus.STOPPED.value, updated_at=now)
+            .returning(Deployment.id, Deployment.worker_id, Deployment.container_id)
+        )
+        for previous in result.all():
+            await notify_status(session, previous.id, DeploymentStatus.STOPPED.value, updated_at=now)
+            if previous.container_id and previous.worker_id and previous.worker_id != config.WORKER_ID:
+                session.add(DeploymentCommand(
+                    deployment_id=previous.id,
+                    worker_id=previous.worker_id,
+                    command="stop"
+                ))
+                logger.info(f"📨 Asked worker {previous.worker_id} to stop deployment {previous.id}")
+    
+    async def claim_deployment(
+        self,
+        deployment_id: str,
+        user_id: Optional[str] = None
+    ) -> ClaimResult:
+        """Claim a deployment for this worker.
+        
+        SQS delivers at least once, so the same job can reach several
+        workers. The claim is a single conditional UPDATE: it only succeeds
+        while the deployment is unclaimed, or when the worker holding it
+        stopped renewing its lease (crashed mid-build).
+        
+        When the owning user is known, the claim also enforces
+        MAX_JOBS_PER_USER across all workers. Claims for the same user are
+        serialized with a transaction-scoped advisory lock so two workers
+        cannot both take the last slot.
         
         Args:
             deployment_id: Deployment ID
-            status: New status
-            additional_data: Additional data to update
+            user_id: ID of the user owning the deployment
             
         Returns:
-            True if successful
+            Outcome of the claim
+            
+        Raises:
+            SQLAlchemyError: If the database is unreachable (the job is retried)
+        """
+        now = datetime.utcnow()
+        async with self.async_session() as session:
+            if user_id and config.MAX_JOBS_PER_USER > 0:
+                await session.execute(select(func.pg_advisory_xact_lock(func.hashtext(user_id))))
+                result = await session.execute(
+                    select(func.count(Deployment.id))
+                    .join(Project, Deployment.project_id == Project.id)
+                    .where(
+                        Project.user_id == user_id,
+                        Deployment.id != deployment_id,
+                        Deployment.status.in_([
+                            DeploymentStatus.BUILDING.value,
+                            DeploymentStatus.DEPLOYING.value
+                        ]),
+                        Deployment.lease_expires_at > now
+                    )
+                )
+                if result.scalar_one() >= config.MAX_JOBS_PER_USER:
+                    await session.rollback()
+                    return ClaimResult.THROTTLED
+            
+            result = await session.execute(
+                update(Deployment)
+                .where(
+                    Deployment.id == deployment_id,
+                    or_(
+                        Deployment.status.in_([
+                            DeploymentStatus.CREATED.value,
+                            DeploymentStatus.QUEUED.value
+                        ]),
+                        and_(
+                            Deployment.status.in_([
+                                DeploymentStatus.BUILDING.value,
+                                DeploymentStatus.DEPLOYING.value
+                            ]),
+                            or_(
+                                Deployment.lease_expires_at.is_(None),
+                                Deployment.lease_expires_at < now
+                            )
+                        )
+                    )
+                )
+                .values(
+                    status=DeploymentStatus.BUILDING.value,
+                    worker_id=config.WORKER_ID,
+                    lease_expires_at=now + timedelta(seconds=config.JOB_LEASE_SECONDS),
+                    updated_at=now
+                )
+                .returning(Deployment.id)
+            )
+            claimed = result.scalar_one_or_none() is not None
+            if claimed:
+                await notify_status(session, deployment_id, DeploymentStatus.BUILDING.value, updated_at=now)
+            await session.commit()
+            
+        if not claimed:
+            return ClaimResult.TAKEN
+        logger.info(f"🔒 Claimed deployment {deployment_id}")
+        return ClaimResult.CLAIMED
+    
+    async def release_deployment(self, deployment_id: str) -> bool:
+        """Hand a deployment back to the queue so a retry can claim it.
+        
+        Args:
+            deployment_id: Deployment ID
+            
+        Returns:
+            True if this worker held the claim
         """
+        # Buffered transitions must land before the status is reset
+        await self.flush(deployment_id)
         try:
             async with self.async_session() as session:
-                # Get deployment
                 result = await session.execute(
-                    select(Deployment).where(Deployment.id == deployment_id)
+                    update(Deployment)
+                    .where(
+                        Deployment.id == deployment_id,
+                        Deployment.worker_id == config.WORKER_ID
+                    )
+                    .values(
+                        status=DeploymentStatus.QUEUED.value,
+                        lease_expires_at=None,
+                        updated_at=datetime.utcnow()
+                    )
+                    .returning(Deployment.id)
                 )
-                deployment = result.scalar_one_or_none()
-                
-                if not deployment:
-                    logger.error(f"❌ Deployment not found: {deployment_id}")
-                    return False
-                
-                # Update status
-                deployment.status = status
-                deployment.updated_at = datetime.utcnow()
-                
-                # Update additional data
-                if additional_data:
-                    for key, value in additional_data.items():
-                        if hasattr(deployment, key):
-                            setattr(deployment, key, value)
+                released = result.scalar_one_or_none() is not None
+                if released:
+                    await notify_status(session, deployment_id, DeploymentStatus.QUEUED.value)
+                await session.commit()
+                return released
                 
+        except Exception as e:
+            logger.error(f"❌ Error releasing deployment: {e}")
+            return False
+    
+    async def renew_lease(self, deployment_id: str) -> bool:
+        """Extend this worker's lease on a deployment it is processing.
+        
+        Args:
+            deployment_id: Deployment ID
+            
+        Returns:
+            True if the lease is still held by this worker
+        """
+        try:
+            async with self.async_session() as session:
+                result = await session.execute(
+                    update(Deployment)
+                    .where(
+                        Deployment.id == deployment_id,
+                        Deployment.worker_id == config.WORKER_ID
+                    )
+                    .values(
+                        lease_expires_at=datetime.utcnow() + timedelta(seconds=config.JOB_LEASE_SECONDS)
+                    )
+                    .returning(Deployment.id)
+                )
+                renewed = result.scalar_one_or_none() is not None
                 await session.commit()
-                logger.info(f"✅ Status updated: {deployment_id} -> {status}")
-                return True
+                return renewed
                 
         except Exception as e:
-            logger.error(f"❌ Error updating status: {e}", exc_info=True)
+            logger.error(f"❌ Error renewing lease: {e}")
             return False
     
+    async def update_status(
+        self,
+        deployment_id: str,
+        status: str,
+        additional_data: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Update deployment status.
+        
+        Non-terminal transitions are buffered; terminal ones are written
+        together with everything buffered before them. The write is guarded
+        by TRANSITIONS, so an out-of-order transition is ignored.
+        
+        Args:
+            deployment_id: Deployment ID
+            status: New status
+            additional_data: Additional data to update
+            
+        Returns:
+            True if buffered (or, for terminal states, written)
+        """
+        self._buffer(deployment_id, status=status, values=additional_data)
+        logger.info(f"📝 Status queued: {deployment_id} -> {status}")
+        
+        if status in TERMINAL_STATUSES:
+            return await self.flush(deployment_id)
+        return True
+    
     async def update_build_started(self, deployment_id: str) -> bool:
-        """Mark deployment as building.
+        """Mark deployment as building (created/queued/building -> building).
         
         Args:
             deployment_id: Deployment ID
@@ -92,7 +514,7 @@ class StatusUpdater:
         """
         return await self.update_status(
             deployment_id,
-            'building',
+            DeploymentStatus.BUILDING.value,
             {'build_started_at': datetime.utcnow()}
         )
     
@@ -101,7 +523,7 @@ class StatusUpdater:
         deployment_id: str,
         image_id: str
     ) -> bool:
-        """Mark build as completed.
+        """Mark build as completed (building -> deploying).
         
         Args:
             deployment_id: Deployment ID
@@ -112,11 +534,8 @@ class StatusUpdater:
         """
         return await self.update_status(
             deployment_id,
-            'deploying',
-            {
-                'image_id': image_id,
-                'build_completed_at': datetime.utcnow()
-            }
+            DeploymentStatus.DEPLOYING.value,
+            {'image_id': image_id}
         )
     
     async def update_deployment_running(
@@ -125,7 +544,7 @@ class StatusUpdater:
         container_id: str,
         url: Optional[str] = None
     ) -> bool:
-        """Mark deployment as running.
+        """Mark deployment as live (building/deploying -> live).
         
         Args:
             deployment_id: Deployment ID
@@ -137,19 +556,20 @@ class StatusUpdater:
         """
         data = {
             'container_id': container_id,
+            'worker_id': config.WORKER_ID,
             'deployed_at': datetime.utcnow()
         }
         if url:
             data['url'] = url
         
-        return await self.update_status(deployment_id, 'running', data)
+        return await self.update_status(deployment_id, DeploymentStatus.LIVE.value, data)
     
     async def update_deployment_failed(
         self,
         deployment_id: str,
         error_message: str
     ) -> bool:
-        """Mark deployment as failed.
+        """Mark deployment as failed (any in-flight status -> error).
         
         Args:
             deployment_id: Deployment ID
@@ -160,54 +580,38 @@ class StatusUpdater:
         """
         return await self.update_status(
             deployment_id,
-            'failed',
-            {
-                'error': error_message,
-                'failed_at': datetime.utcnow()
-            }
+            DeploymentStatus.ERROR.value,
+            {'error': error_message}
         )
     
     async def add_build_log(
         self,
         deployment_id: str,
-        log_message: str
+        log_message: str,
+        level: str = 'info'
     ) -> bool:
-        """Add build log entry.
+        """Add build log entry (buffered).
         
         Args:
             deployment_id: Deployment ID
             log_message: Log message
+            level: One of EVENT_LEVELS
             
         Returns:
-            True if successful
+            True once buffered
         """
-        try:
-            async with self.async_session() as session:
-                result = await session.execute(
-                    select(Deployment).where(Deployment.id == deployment_id)
-                )
-                deployment = result.scalar_one_or_none()
-                
-                if not deployment:
-                    return False
-                
-                # Append to build logs
-                if not deployment.build_logs:
-                    deployment.build_logs = []
-                
-                deployment.build_logs.append({
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'message': log_message,
-                    'worker_id': config.WORKER_ID
-                })
-                
-                await session.commit()
-                return True
-                
-        except Exception as e:
-            logger.error(f"❌ Error adding build log: {e}")
-            return False
+        if level not in EVENT_LEVELS:
+            level = 'info'
+        self._buffer(deployment_id, line=(datetime.utcnow(), level, log_message))
+        return True
     
     async def cleanup(self):
-        """Cleanup database connections."""
+        """Flush buffered writes and cleanup database connections."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if self._partition_task:
+            self._partition_task.cancel()
+            self._partition_task = None
+        await self.flush()
         await self.engine.dispose()